@@ -0,0 +1,111 @@
+# benchmarks/bench_dispatch.py
+"""on_message のコマンド解決にかかる時間を旧方式 (本文の書き換え + process_commands) と比較する
+
+コマンド本体は実行せず、bot.invoke に渡るまでを計測する。
+使い方: python -m benchmarks.bench_dispatch
+"""
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+from discord.ext import commands
+from core.config import DUMMY_PREFIX
+from core.state import state
+from bot import SugiyamaBot
+
+CHANNEL_ID = 1
+MESSAGES = 200_000
+
+# 実際の Bot と同程度の数のコマンドとエイリアスを登録する
+COMMAND_NAMES = [
+    "othello", "leave", "point", "connectfour", "janken", "gamble", "bet", "login", "give", "highlow",
+    "text", "text2", "text3", "text4", "text5", "watermark", "gaming", "5000", "voice",
+    "tenki", "rate", "time", "info", "totusi", "ping", "setchannel", "schedule", "sync",
+]
+SAMPLE_CONTENTS = [
+    "おはよう", "それな", "今日の天気どう？", "草", "w", "これ見て https://example.com",
+    "point", "othello point", "othello leave", "bet 10", "text こんにちは square",
+    "tenki 東京", "rate 100 usd", "othello <@123> 8", "gamble", "ping",
+]
+
+def _make_bot() -> SugiyamaBot:
+    bot = SugiyamaBot()
+    bot._connection.user = SimpleNamespace(id=0)
+
+    async def noop(ctx, *, rest: str = ""):
+        pass
+    for name in COMMAND_NAMES:
+        bot.add_command(commands.Command(noop, name=name, aliases=[f"{name}_alias"]))
+    return bot
+
+def _make_messages(n: int) -> list:
+    author = SimpleNamespace(id=42, bot=False)
+    channel = SimpleNamespace(id=CHANNEL_ID)
+    guild = SimpleNamespace(id=1)
+    return [
+        SimpleNamespace(content=random.choice(SAMPLE_CONTENTS), author=author, channel=channel, guild=guild, _state=None)
+        for _ in range(n)
+    ]
+
+async def legacy_on_message(bot, message):
+    """変更前の SugiyamaBot.on_message と同じ処理"""
+    if message.author.bot or not message.guild:
+        return
+    content = message.content.strip()
+    if not content:
+        return
+    if content.lower().startswith("setchannel"):
+        message.content = f"{DUMMY_PREFIX}{content}"
+        await bot.process_commands(message)
+        return
+    if message.channel.id not in state.allowed_channels:
+        return
+    parts = content.split(" ", 1)
+    cmd_name = parts[0].lower()
+    is_special = False
+    if cmd_name == "othello" and len(parts) > 1:
+        sub = parts[1].split(" ", 1)[0].lower()
+        if sub == "leave":
+            cmd_name = "leave"
+            is_special = True
+        elif sub in ["point", "points"]:
+            cmd_name = "point"
+            is_special = True
+    command_obj = bot.get_command(cmd_name)
+    if command_obj:
+        if is_special:
+            extra = content.split(" ", 2)[2] if len(content.split(" ", 2)) > 2 else ""
+            message.content = f"{DUMMY_PREFIX}{cmd_name} {extra}"
+        else:
+            message.content = f"{DUMMY_PREFIX}{content}"
+        await bot.process_commands(message)
+
+async def _measure(name: str, handler, messages: list) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        await handler(message)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<11} {len(messages) / elapsed:>12,.0f} messages/s")
+    return elapsed
+
+async def main():
+    random.seed(0)
+    state.allowed_channels = {CHANNEL_ID}
+    bot = _make_bot()
+    bot.dispatcher.build(bot)
+
+    # コマンドの実行そのものは計測対象外
+    invoked = []
+    async def fake_invoke(ctx):
+        invoked.append(ctx.command.name)
+    bot.invoke = fake_invoke
+
+    messages = _make_messages(MESSAGES)
+    legacy = await _measure("legacy", lambda m: legacy_on_message(bot, m), [SimpleNamespace(**vars(m)) for m in messages])
+    legacy_invoked, invoked[:] = list(invoked), []
+    current = await _measure("dispatcher", bot.on_message, messages)
+    assert invoked == legacy_invoked, "解決されたコマンドが旧方式と一致しません"
+    print(f"speedup     {legacy / current:>12.2f}x  ({len(invoked)} commands resolved)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
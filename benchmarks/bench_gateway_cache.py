@@ -0,0 +1,53 @@
+# benchmarks/bench_gateway_cache.py
+"""ギルド参加時のキャッシュのメモリ量を、通常モードとメモリ節約モードで比較する
+
+GUILD_CREATE 相当のデータを直接読み込ませるので、Discord への接続は不要。
+使い方: python -m benchmarks.bench_gateway_cache
+"""
+import gc
+import tracemalloc
+import discord
+from bot import SugiyamaBot
+
+GUILD_COUNTS = [10, 100]
+MEMBERS_PER_GUILD = 500
+
+def _guild_payload(guild_id: int, members: int) -> dict:
+    return {
+        "id": str(guild_id), "name": f"guild-{guild_id}", "member_count": members,
+        "roles": [], "channels": [], "emojis": [], "stickers": [], "features": [],
+        "members": [
+            {
+                "user": {"id": str(10**17 + guild_id * 100_000 + i), "username": f"user{i}", "discriminator": "0", "avatar": None, "global_name": None},
+                "roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0,
+            }
+            for i in range(members)
+        ],
+    }
+
+def _measure(memory_budget: bool, guilds: int) -> tuple:
+    bot = SugiyamaBot(memory_budget=memory_budget)
+    connection = bot._connection
+    connection.user = discord.ClientUser(state=connection, data={"id": "1", "username": "bot", "discriminator": "0", "avatar": None})
+    payloads = [_guild_payload(g + 1, MEMBERS_PER_GUILD) for g in range(guilds)]
+
+    gc.collect()
+    tracemalloc.start()
+    for payload in payloads:
+        connection._add_guild_from_data(payload)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    members = sum(len(g.members) for g in bot.guilds)
+    return current, members, len(bot.users)
+
+def main():
+    for guilds in GUILD_COUNTS:
+        for memory_budget in (False, True):
+            size, members, users = _measure(memory_budget, guilds)
+            mode = "budget" if memory_budget else "default"
+            print(f"{mode:<8} guilds={guilds:>4}  members/guild={MEMBERS_PER_GUILD}  "
+                  f"cache={size / (1024 * 1024):>8.2f}MB  cached_members={members:>6}  cached_users={users:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_gif.py
+"""アニメーション GIF のエンコードを、PIL の save_all (optimize=True) と
+共通パレット + フレーム差分の encode_gif で比べる (所要時間と出力サイズ)
+
+誤差は書き出した GIF を読み戻し、元のフレームの不透明な画素との差を1チャンネルあたりで平均したもの。
+
+使い方: python -m benchmarks.bench_gif
+"""
+import io
+import time
+import numpy as np
+from PIL import Image, ImageDraw, ImageSequence
+from services.image.gaming_gif import hue_cycle_frames
+from services.image.gif_encoder import encode_gif
+
+def _photo(w: int, h: int, seed: int = 0) -> Image.Image:
+    """なめらかな模様に細かいノイズを重ね、四隅を透明にした RGBA 画像"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, (h // 32 + 1, w // 32 + 1, 3), dtype=np.uint8)
+    base = np.asarray(Image.fromarray(coarse).resize((w, h), Image.BICUBIC), dtype=np.int16)
+    rgb = np.clip(base + rng.integers(-8, 9, (h, w, 3)), 0, 255).astype(np.uint8)
+    yy, xx = np.mgrid[0:h, 0:w]
+    alpha = np.where((xx - w / 2) ** 2 / (w / 2) ** 2 + (yy - h / 2) ** 2 / (h / 2) ** 2 <= 1, 255, 0).astype(np.uint8)
+    return Image.fromarray(np.dstack([rgb, alpha]), "RGBA")
+
+def _logo(size: int) -> Image.Image:
+    """ベタ塗りの図形だけの RGBA 画像 (絵文字やロゴのような入力)"""
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((size // 16, size // 16, size - size // 16, size - size // 16), fill=(230, 40, 40, 255))
+    draw.rectangle((size // 4, size // 4, size * 3 // 4, size * 3 // 4), fill=(40, 90, 220, 255))
+    draw.polygon([(size // 2, size // 8), (size * 4 // 5, size * 4 // 5), (size // 5, size * 4 // 5)], fill=(250, 210, 30, 255))
+    return img
+
+def _sprite_animation(w: int, h: int, count: int) -> list:
+    """止まった背景の上を小さな物体が動くアニメーション (差分が小さい例)"""
+    background = np.asarray(_photo(w, h, seed=1).convert("RGB"))
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = int((w - 40) * i / max(1, count - 1))
+        frame[h // 2 - 20:h // 2 + 20, x:x + 40] = (255, 40, 40)
+        frames.append(Image.fromarray(frame, "RGB").convert("RGBA"))
+    return frames
+
+def _pil_save(frames, duration) -> io.BytesIO:
+    buf = io.BytesIO()
+    frames[0].save(buf, format="GIF", save_all=True, append_images=frames[1:], duration=duration, loop=0, disposal=2, optimize=True)
+    return buf
+
+def _error(frames: list, buf: io.BytesIO) -> tuple[int, float]:
+    """(読み戻したフレーム数, 平均誤差)"""
+    buf.seek(0)
+    with Image.open(buf) as img:
+        decoded = [np.asarray(frame.convert("RGBA"), dtype=np.int16) for frame in ImageSequence.Iterator(img)]
+    errors = []
+    for frame, out in zip(frames, decoded):
+        src = np.asarray(frame.convert("RGBA"), dtype=np.int16)
+        opaque = src[..., 3] >= 128
+        errors.append(np.abs(src[..., :3][opaque] - out[..., :3][opaque]).mean() if opaque.any() else 0.0)
+    return len(decoded), float(np.mean(errors))
+
+def _bench(label: str, frames: list, duration: int, repeat: int = 3):
+    print(f"{label}  ({len(frames)} frames, {frames[0].width}x{frames[0].height})")
+    for name, encode in (("PIL save_all", _pil_save), ("encode_gif", encode_gif)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            buf = encode(frames, duration)
+        elapsed = (time.perf_counter() - start) / repeat
+        count, error = _error(frames, buf)
+        print(f"  {name:<13} {elapsed * 1000:>8.1f}ms  {len(buf.getvalue()) / 1024:>8.1f}KB  {count} frames  error {error:.2f}")
+
+def main():
+    _bench("gaming logo 256px", hue_cycle_frames(_logo(256)), 50)
+    for size in (256, 512):
+        _bench(f"gaming {size}px", hue_cycle_frames(_photo(size, size)), 50)
+    _bench("sprite 480x270", _sprite_animation(480, 270, 30), 40)
+
+if __name__ == "__main__":
+    main()
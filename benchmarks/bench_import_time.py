@@ -0,0 +1,80 @@
+# benchmarks/bench_import_time.py
+"""起動時の import にかかる時間を `python -X importtime` で計測し、予算を超えたら失敗する
+
+main.start_up が読み込むモジュール (bot とユーザーデータ) と全 Cog を読み込むところまでを
+別プロセスで計測する (Discord には接続しない)。
+データファイルは一時ディレクトリに作られる。
+使い方: python -m benchmarks.bench_import_time [--budget-ms 800] [--runs 3]
+予算は環境変数 IMPORT_BUDGET_MS でも指定できる。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# main はモジュールの先頭では bot などを読み込まない (start_up の中で読み込む) ので、
+# start_up の冒頭と同じものを並べて、起動時に実際に払う分を計測する
+STARTUP_IMPORTS = ("import main, bot, data.settings_manager, data.points_manager, data.persistence, core.scheduler, "
+                   "data.weather_cache, services.image.job_service, cogs.economy, cogs.games, cogs.media, cogs.utility, cogs.system")
+# 起動時には読み込まれていてほしくないモジュール (初めて使う時に読み込む)
+DEFERRED_MODULES = ["numpy", "PIL", "services.image.base_worker", "services.image.gaming_gif", "services.ai.deepseek"]
+
+def _parse_importtime(stderr: str) -> list:
+    """(モジュール名, 自身のµs, 累積µs, 深さ) のリスト"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2 - 1
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def measure_once(data_dir: str) -> list:
+    env = dict(os.environ, DATA_DIR=data_dir)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_IMPORTS],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import に失敗しました:\n{result.stderr[-2000:]}")
+    return _parse_importtime(result.stderr)
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "800")))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    best = None
+    with tempfile.TemporaryDirectory() as data_dir:
+        for _ in range(args.runs):
+            rows = measure_once(data_dir)
+            total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+            if best is None or total_us < best[0]:
+                best = (total_us, rows)
+
+    total_us, rows = best
+    print(f"startup imports: {total_us / 1000:.1f}ms (best of {args.runs}, budget {args.budget_ms:.0f}ms)")
+    print("slowest top-level imports:")
+    for name, _, cumulative, depth in sorted((r for r in rows if r[3] <= 1), key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f}ms  {'  ' * depth}{name}")
+
+    imported = {name for name, *_ in rows}
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+    failed = False
+    if eager:
+        print(f"NG: 遅延読み込みのはずのモジュールが起動時に読み込まれています: {', '.join(eager)}")
+        failed = True
+    if total_us / 1000 > args.budget_ms:
+        print(f"NG: 予算 {args.budget_ms:.0f}ms を {total_us / 1000 - args.budget_ms:.1f}ms 超えています")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+# benchmarks/bench_outline.py
+"""縁取りの太らせを、PIL の MaxFilter と outline.max_filter で比べる (所要時間と結果の一致)
+
+text の square モードは最大 55x55、text4 は 25x25 の窓を使う。
+使い方: python -m benchmarks.bench_outline
+"""
+import time
+import numpy as np
+from PIL import Image, ImageFilter
+from services.image.outline import max_filter
+
+# 文字のマスクに近い大きさ (幅, 高さ) と窓の大きさ
+CASES = [((1400, 200), 15), ((1400, 200), 25), ((560, 560), 55), ((500, 500), 25), ((500, 500), 101)]
+
+def _mask(w: int, h: int, seed: int = 0) -> Image.Image:
+    """文字の形の代わりに、ぼかした乱数を2値化したマスク"""
+    rng = np.random.default_rng(seed)
+    coarse = Image.fromarray(rng.integers(0, 256, (h // 8 + 1, w // 8 + 1), dtype=np.uint8))
+    return coarse.resize((w, h), Image.BICUBIC).point(lambda v: 255 if v > 160 else 0)
+
+def main():
+    for (w, h), size in CASES:
+        img = _mask(w, h)
+        start = time.perf_counter()
+        expected = img.filter(ImageFilter.MaxFilter(size))
+        pil_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        result = max_filter(img, size)
+        fast_ms = (time.perf_counter() - start) * 1000
+        same = expected.tobytes() == result.tobytes()
+        print(f"{w}x{h} size={size:<3}  MaxFilter {pil_ms:>8.0f}ms  max_filter {fast_ms:>6.1f}ms  identical={same}")
+
+if __name__ == "__main__":
+    main()
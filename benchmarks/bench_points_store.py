@@ -0,0 +1,74 @@
+# benchmarks/bench_points_store.py
+"""旧 JSON 全書き換え方式と SQLite (WAL) 行単位更新の書き込み性能を比較する
+
+使い方: python -m benchmarks.bench_points_store
+"""
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from data.points_store import PointsStore
+
+USER_COUNTS = [1_000, 10_000, 100_000]
+
+def _make_data(n: int):
+    base = 10**17
+    game_points = {str(base + i): random.randint(-500, 5000) for i in range(n)}
+    login_data = {str(base + i): {"last_login": "2024-01-01", "consecutive_days": random.randint(1, 10)} for i in range(n)}
+    return game_points, login_data
+
+def _p99(samples: list) -> float:
+    return statistics.quantiles(samples, n=100)[98] if len(samples) >= 2 else samples[0]
+
+def bench_json(tmp: str, game_points: dict, login_data: dict, ops: int) -> list:
+    """旧 PointsManager.update_points と同じく毎回両ファイルを indent=4 で書き直す"""
+    points_path = os.path.join(tmp, "game_points.json")
+    login_path = os.path.join(tmp, "login_bonus_data.json")
+    uids = list(game_points)
+    samples = []
+    for _ in range(ops):
+        uid = random.choice(uids)
+        start = time.perf_counter()
+        game_points[uid] = game_points[uid] + 1
+        with open(points_path, 'w', encoding='utf-8') as f:
+            json.dump(game_points, f, indent=4, ensure_ascii=False)
+        with open(login_path, 'w', encoding='utf-8') as f:
+            json.dump(login_data, f, indent=4, ensure_ascii=False)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_sqlite(tmp: str, game_points: dict, login_data: dict, ops: int) -> list:
+    store = PointsStore(os.path.join(tmp, "game_points.db"))
+    rows = {int(uid): (pts, login_data[uid]["last_login"], login_data[uid]["consecutive_days"], None, 0) for uid, pts in game_points.items()}
+    store.write_users(rows)
+    uids = list(rows)
+    samples = []
+    for _ in range(ops):
+        uid = random.choice(uids)
+        start = time.perf_counter()
+        values = rows[uid]
+        rows[uid] = (values[0] + 1, *values[1:])
+        store.set_user(uid, rows[uid])
+        samples.append(time.perf_counter() - start)
+    store.close()
+    return samples
+
+def _report(name: str, n: int, samples: list):
+    total = sum(samples)
+    print(f"{name:<7} users={n:>7}  ops={len(samples):>5}  "
+          f"writes/s={len(samples) / total:>10.1f}  p99={_p99(samples) * 1000:>9.3f}ms")
+
+def main():
+    for n in USER_COUNTS:
+        game_points, login_data = _make_data(n)
+        # JSON は1回あたりのコストがユーザー数に比例するので回数を絞る
+        json_ops = max(10, 200_000 // n)
+        with tempfile.TemporaryDirectory() as tmp:
+            _report("json", n, bench_json(tmp, dict(game_points), login_data, json_ops))
+        with tempfile.TemporaryDirectory() as tmp:
+            _report("sqlite", n, bench_sqlite(tmp, dict(game_points), login_data, 2000))
+
+if __name__ == "__main__":
+    main()
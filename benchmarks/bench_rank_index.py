@@ -0,0 +1,52 @@
+# benchmarks/bench_rank_index.py
+"""順位表のポイント更新と順位の取得を、ソート済み list (bisect.insort) と
+RankIndex (SortedList) で比べる (1件あたりの時間)
+
+使い方: python -m benchmarks.bench_rank_index
+"""
+import bisect
+import random
+import time
+from data.rank_index import RankIndex
+
+USER_COUNTS = (10_000, 100_000, 1_000_000)
+OPERATIONS = 20_000
+
+class _ListIndex:
+    """従来の実装 (ソート済みの list を bisect で更新する)"""
+    def __init__(self, points: dict):
+        self._points = dict(points)
+        self._keys = sorted((-pts, uid) for uid, pts in self._points.items())
+
+    def update(self, user_id: int, points: int):
+        old = self._points.get(user_id)
+        if old is not None:
+            if old == points:
+                return
+            del self._keys[bisect.bisect_left(self._keys, (-old, user_id))]
+        bisect.insort(self._keys, (-points, user_id))
+        self._points[user_id] = points
+
+    def rank(self, user_id: int) -> int:
+        return bisect.bisect_left(self._keys, (-self._points[user_id], user_id)) + 1
+
+def _us(fn, ops: list) -> float:
+    start = time.perf_counter()
+    for op in ops:
+        fn(*op)
+    return (time.perf_counter() - start) / len(ops) * 1e6
+
+def main():
+    rng = random.Random(0)
+    for count in USER_COUNTS:
+        points = {uid: rng.randint(0, 1_000_000) for uid in range(count)}
+        updates = [(rng.randrange(count), rng.randint(0, 1_000_000)) for _ in range(OPERATIONS)]
+        ranks = [(rng.randrange(count),) for _ in range(OPERATIONS)]
+        print(f"{count:>9,} users")
+        for name, index in (("list+bisect", _ListIndex(points)), ("SortedList", RankIndex(points))):
+            update = _us(index.update, updates)
+            rank = _us(index.rank, ranks)
+            print(f"  {name:<12} update {update:>7.2f}us  rank {rank:>6.2f}us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_resize.py
+"""resize_if_too_large の旧方式 (0.85 倍ずつ最大7回) と推定方式の所要時間・エンコード回数を比較する
+
+使い方: python -m benchmarks.bench_resize
+"""
+import io
+import math
+import time
+import numpy as np
+from PIL import Image
+from core.config import MAX_FILE_SIZE
+from services.image import base_worker
+
+# (幅, 高さ, 拡大率): 拡大率 > 1 は拡大済みの画像 (縮小してもサイズが減りにくく、旧方式は何度もやり直す)
+CASES = [(3840, 2160, 1), (7680, 4320, 1), (7680, 4320, 4)]
+
+def _make_png(w: int, h: int, upscale: int = 1, seed: int = 0) -> io.BytesIO:
+    """写真に近い圧縮率になるよう、なめらかな模様に細かいノイズを重ねた RGBA 画像"""
+    rng = np.random.default_rng(seed)
+    sw, sh = w // upscale, h // upscale
+    coarse = rng.integers(0, 256, (sh // 64 + 1, sw // 64 + 1, 3), dtype=np.uint8)
+    base = np.asarray(Image.fromarray(coarse).resize((sw, sh), Image.BICUBIC), dtype=np.int16)
+    noise = rng.integers(-12, 13, (sh, sw, 3), dtype=np.int16)
+    rgb = np.clip(base + noise, 0, 255).astype(np.uint8)
+    if upscale > 1:
+        rgb = np.asarray(Image.fromarray(rgb).resize((w, h), Image.BILINEAR))
+    alpha = np.full((h, w, 1), 255, dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(np.concatenate([rgb, alpha], axis=2), "RGBA").save(buf, format="PNG")
+    buf.seek(0)
+    return buf
+
+def legacy_resize(image_fp: io.BytesIO, target_format: str):
+    """変更前の resize_if_too_large (PNG 部分のみ)。エンコード回数も返す"""
+    image_fp.seek(0, io.SEEK_END)
+    current_size = image_fp.tell()
+    image_fp.seek(0)
+    if current_size <= MAX_FILE_SIZE:
+        return image_fp, False, 0
+    current_fp, resized, encodes = image_fp, False, 0
+    for iteration in range(7):
+        current_fp.seek(0)
+        img = Image.open(current_fp)
+        w, h = img.width, img.height
+        if min(w, h) <= 300: break
+        current_fp.seek(0, io.SEEK_END)
+        iter_size = current_fp.tell()
+        factor = 0.85
+        if iteration == 0:
+            factor = max(0.1, min(math.sqrt(MAX_FILE_SIZE / iter_size) * 0.9, 0.95))
+        output_fp = io.BytesIO()
+        resized_img = img.copy()
+        resized_img.thumbnail((int(w * factor), int(h * factor)), Image.LANCZOS)
+        resized_img.save(output_fp, format=target_format, optimize=True, compress_level=7)
+        encodes += 1
+        output_fp.seek(0, io.SEEK_END)
+        if output_fp.tell() <= MAX_FILE_SIZE:
+            return output_fp, True, encodes
+        current_fp, resized = output_fp, True
+    return current_fp, resized, encodes
+
+def _count_encodes(name: str = "_encode_still_scaled"):
+    """base_worker のエンコード関数 (name) の呼び出し回数を数える"""
+    original = getattr(base_worker, name)
+    counter = {"n": 0}
+    def wrapped(*args, **kwargs):
+        counter["n"] += 1
+        return original(*args, **kwargs)
+    setattr(base_worker, name, wrapped)
+    return counter, lambda: setattr(base_worker, name, original)
+
+def _size(fp) -> int:
+    fp.seek(0, io.SEEK_END)
+    return fp.tell()
+
+def main():
+    for w, h, upscale in CASES:
+        src = _make_png(w, h, upscale)
+        print(f"{w}x{h} PNG (x{upscale})  {_size(src) / 1e6:.1f}MB (limit {MAX_FILE_SIZE / 1e6:.1f}MB)")
+
+        start = time.perf_counter()
+        out, _, encodes = legacy_resize(io.BytesIO(src.getvalue()), "PNG")
+        print(f"  legacy     {time.perf_counter() - start:>6.2f}s  encodes={encodes}  output={_size(out) / 1e6:.2f}MB")
+
+        counter, restore = _count_encodes()
+        start = time.perf_counter()
+        out, _ = base_worker.resize_if_too_large(io.BytesIO(src.getvalue()), "PNG")
+        elapsed = time.perf_counter() - start
+        restore()
+        print(f"  targeting  {elapsed:>6.2f}s  encodes={counter['n']} (probe含む)  output={_size(out) / 1e6:.2f}MB")
+
+if __name__ == "__main__":
+    main()
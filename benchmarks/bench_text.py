@@ -0,0 +1,59 @@
+# benchmarks/bench_text.py
+"""文字画像コマンドの文字並べ (1文字ずつ描く部分) を、毎回 truetype で読み込んで
+draw.text で描く従来の方法と、font_cache のマスクを貼る方法で比べる
+
+結果の画素が一致することも確かめる。キャッシュは1回目 (cold) と2回目以降 (warm) を分けて測る。
+使い方: python -m benchmarks.bench_text [フォントファイル]
+"""
+import os
+import sys
+import time
+from PIL import Image, ImageDraw, ImageFont
+from core.config import FONTS_DIR
+from services.image.font_cache import FontCache
+
+TEXTS = ["やまかわサムネ風テキスト", "すぎやまボット", "Typography Wave"]
+# (サイズ, 文字間隔): text / text5 は 110px、text4 は 4倍の 440px で描く
+CASES = [(110, 0), (110, -15), (440, -60)]
+
+def _legacy(font_path: str, size: int, text: str, spacing: int) -> Image.Image:
+    font = ImageFont.truetype(font_path, size)
+    text_w = int(sum(font.getlength(c) for c in text) + max(0, len(text) - 1) * spacing)
+    bbox = font.getbbox(text)
+    mask = Image.new("L", (max(1, text_w), bbox[3] - bbox[1]))
+    draw = ImageDraw.Draw(mask)
+    curr_x = 0
+    for char in text:
+        c_bbox = font.getbbox(char)
+        draw.text((curr_x - c_bbox[0], -bbox[1]), char, font=font, fill=255)
+        curr_x += font.getlength(char) + spacing
+    return mask
+
+def _cached(cache: FontCache, font_path: str, size: int, text: str, spacing: int) -> Image.Image:
+    font = cache.get(font_path, size)
+    bbox = font.font.getbbox(text)
+    mask = Image.new("L", (max(1, font.spaced_width(text, spacing)), bbox[3] - bbox[1]))
+    font.draw_spaced(ImageDraw.Draw(mask), (0, -bbox[1]), text, spacing, fill=255)
+    return mask
+
+def _ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    font_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(FONTS_DIR, "MochiyPopOne-Regular.ttf")
+    print(f"font: {font_path}")
+    for size, spacing in CASES:
+        for text in TEXTS:
+            cache = FontCache()
+            assert _legacy(font_path, size, text, spacing).tobytes() == _cached(cache, font_path, size, text, spacing).tobytes()
+            legacy = _ms(lambda: _legacy(font_path, size, text, spacing), 5)
+            cold = _ms(lambda: _cached(FontCache(), font_path, size, text, spacing), 5)
+            warm = _ms(lambda: _cached(cache, font_path, size, text, spacing), 20)
+            print(f"  {size}px spacing={spacing:<4} {text}: legacy {legacy:>6.1f}ms  cold {cold:>6.1f}ms  warm {warm:>6.2f}ms")
+        print(f"  stats (last cache): {cache.stats()}")
+
+if __name__ == "__main__":
+    main()
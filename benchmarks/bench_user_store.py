@@ -0,0 +1,67 @@
+# benchmarks/bench_user_store.py
+"""旧形式 (文字列キーの入れ子dict) と UserRecord のメモリ量・読み込み時間を比較する
+
+使い方: python -m benchmarks.bench_user_store [ユーザー数]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from data.points_store import PointsStore
+from data.user_store import UserStore
+
+def _measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = (time.perf_counter() - start) * 1000
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    base = 10**17
+    game_points = {str(base + i): random.randint(-500, 5000) for i in range(n)}
+    login_data = {
+        str(base + i): {
+            "last_login": f"2024-01-{random.randint(1, 28):02d}",
+            "consecutive_days": random.randint(1, 10),
+            "gamble_info": {"date": f"2024-01-{random.randint(1, 28):02d}", "count": random.randint(0, 5)},
+        }
+        for i in range(n)
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        points_path = os.path.join(tmp, "game_points.json")
+        login_path = os.path.join(tmp, "login_bonus_data.json")
+        with open(points_path, 'w', encoding='utf-8') as f:
+            json.dump(game_points, f, indent=4)
+        with open(login_path, 'w', encoding='utf-8') as f:
+            json.dump(login_data, f, indent=4)
+        del game_points, login_data
+
+        def load_json():
+            # 旧 PointsManager と同じく2つの JSON をそれぞれ dict として持つ
+            with open(points_path, 'r', encoding='utf-8') as f:
+                points = json.load(f)
+            with open(login_path, 'r', encoding='utf-8') as f:
+                login = json.load(f)
+            return points, login
+
+        db_path = os.path.join(tmp, "game_points.db")
+        PointsStore(db_path).import_json_once(points_path, login_path)
+
+        _, json_bytes, json_ms = _measure(load_json)
+        store, rec_bytes, rec_ms = _measure(lambda: UserStore(db_path))
+
+    print(f"users={n}")
+    print(f"json dict   : {json_bytes / n:>7.1f} B/user  load={json_ms:>8.1f}ms")
+    print(f"UserRecord  : {rec_bytes / n:>7.1f} B/user  load={rec_ms:>8.1f}ms")
+    print(f"memory_report: {store.memory_report()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_watermark.py
+"""watermark の全解像度合成 (max_bytes=None + resize_if_too_large) と、
+サイズ上限から解像度を先に決める合成の所要時間・ピークメモリを比較する
+
+ピークメモリを正しく測るため、1回ずつ別プロセスで実行する。
+テンプレートの展開キャッシュは一時ディレクトリに作り、計測前に用意しておく。
+使い方: python -m benchmarks.bench_watermark
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES = ["ONEPLUS11R5G.png", "NOTHINGPHONE2A.png", "POCO F3.png"]
+SOURCE_SIZE = (4000, 3000)
+
+def _make_jpeg(path: str):
+    """写真に近い圧縮率になるよう、なめらかな模様に細かいノイズを重ねた JPEG"""
+    import numpy as np
+    from PIL import Image
+    w, h = SOURCE_SIZE
+    rng = np.random.default_rng(0)
+    coarse = rng.integers(0, 256, (h // 64 + 1, w // 64 + 1, 3), dtype=np.uint8)
+    base = np.asarray(Image.fromarray(coarse).resize((w, h), Image.BICUBIC), dtype=np.int16)
+    noise = rng.integers(-12, 13, (h, w, 3), dtype=np.int16)
+    Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8)).save(path, quality=92)
+
+def _run_child(mode: str, template: str, source_path: str):
+    from core.constants import TEMPLATES_DATA
+    from core.memory import current_rss_bytes
+    from services.image.base_worker import resize_if_too_large
+    from services.image.watermark import process_and_composite_image
+    tmpl = next(t for t in TEMPLATES_DATA if t["name"] == template)
+    with open(source_path, "rb") as f:
+        data = f.read()
+    # ru_maxrss には import 時のピークも含まれるので、実行中の RSS を 5ms ごとに見て最大値を取る
+    baseline = current_rss_bytes()
+    peak, done = [baseline], threading.Event()
+    def sample():
+        while not done.wait(0.005):
+            peak[0] = max(peak[0], current_rss_bytes())
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    if mode == "full":
+        buf, fmt, _ = process_and_composite_image(data, tmpl, max_bytes=None)
+    else:
+        buf, fmt, _ = process_and_composite_image(data, tmpl)
+    final, _ = resize_if_too_large(buf, fmt)
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    print(json.dumps({"seconds": elapsed, "peak_mb": (peak[0] - baseline) / (1024 * 1024), "bytes": len(final.getvalue()), "format": fmt}))
+
+def _measure(mode: str, template: str, source_path: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_watermark", "--child", mode, template, source_path],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ, DATA_DIR=data_dir)
+        source_path = os.path.join(data_dir, "source.jpg")
+        _make_jpeg(source_path)
+        print(f"source {SOURCE_SIZE[0]}x{SOURCE_SIZE[1]} JPEG  {os.path.getsize(source_path) / 1e6:.1f}MB")
+        for template in TEMPLATES:
+            # 1回目はテンプレートの展開を含むので捨てる
+            _measure("full", template, source_path, env)
+            _measure("budget", template, source_path, env)
+            full = _measure("full", template, source_path, env)
+            budget = _measure("budget", template, source_path, env)
+            print(template)
+            for name, r in (("full", full), ("budget", budget)):
+                print(f"  {name:<7} {r['seconds']:>6.2f}s  peak +{r['peak_mb']:>6.0f}MB  {r['format']:<4} {r['bytes'] / 1e6:.2f}MB")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        _run_child(*sys.argv[2:])
+    else:
+        main()
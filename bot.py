@@ -3,27 +3,57 @@ import discord
 from discord.ext import commands
 import traceback
 import sys
-from core.config import DUMMY_PREFIX
+import json
+import os
+import hashlib
+from core.config import DUMMY_PREFIX, MEMORY_BUDGET_MODE, MAX_CACHED_MESSAGES, COMMAND_SYNC_FILE
 from core.state import state
-from core.constants import MARKERS, HAND_EMOJIS, EMOJI_TO_HAND, CONNECTFOUR_MARKERS
+from core.scheduler import scheduler
+from core.dispatcher import CommandDispatcher
+from core.reactions import reactions
+from core.memory import memory_report
+from core.startup import startup_timer
+from data.persistence import persistence
+from core.constants import MARKERS, HAND_EMOJIS, EMOJI_TO_HAND, CONNECTFOUR_MARKERS, MULTI_WORD_ALIASES
 
 class SugiyamaBot(commands.Bot):
-    def __init__(self):
+    def __init__(self, memory_budget: bool = MEMORY_BUDGET_MODE):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.reactions = True
         intents.members = True
+
+        cache_options = {}
+        if memory_budget:
+            # メンバーは member_resolver で必要な時だけ取得する
+            cache_options = {
+                "max_messages": MAX_CACHED_MESSAGES,
+                "member_cache_flags": discord.MemberCacheFlags.none(),
+                "chunk_guilds_at_startup": False,
+            }
         
         super().__init__(
             command_prefix=self.get_custom_prefix,
             intents=intents,
             help_command=None,
-            case_insensitive=True
+            case_insensitive=True,
+            **cache_options
         )
+        self.dispatcher = CommandDispatcher(MULTI_WORD_ALIASES)
+        self._login_logged = False
 
     async def get_custom_prefix(self, bot, message):
         return DUMMY_PREFIX
 
+    def add_command(self, command):
+        super().add_command(command)
+        self.dispatcher.stale = True
+
+    def remove_command(self, name):
+        command = super().remove_command(name)
+        self.dispatcher.stale = True
+        return command
+
     async def setup_hook(self):
         extensions = [
             "cogs.economy",
@@ -34,79 +64,83 @@ class SugiyamaBot(commands.Bot):
         ]
         for ext in extensions:
             try:
-                await self.load_extension(ext)
+                with startup_timer.phase(ext):
+                    await self.load_extension(ext)
                 print(f"[Extension] {ext} をロードしました。")
             except Exception as e:
                 print(f"[Extension] {ext} のロードに失敗しました: {e}")
                 traceback.print_exc()
+
+        # プレフィックスなしコマンドの表を作成
+        with startup_timer.phase("dispatcher"):
+            self.dispatcher.build(self)
+        print(f"[Dispatcher] {len(self.commands)} 個のコマンドを登録しました。")
+
+        # 各Cogが登録した定時ジョブの実行を開始
+        scheduler.start()
         
-        # スラッシュコマンドをグローバルに同期
-        await self.tree.sync()
+        # スラッシュコマンドは前回の同期から変わった時だけグローバルに同期する
+        with startup_timer.phase("command_sync"):
+            synced = await self.sync_command_tree()
+        print(f"[System] スラッシュコマンド: {'同期しました' if synced is not None else '変更なしのため同期を省略'}")
+
+    def command_tree_hash(self) -> str:
+        """同期対象のスラッシュコマンド定義 (Discord に送る内容) のハッシュ"""
+        commands_data = sorted((cmd.to_dict(self.tree) for cmd in self.tree.get_commands()), key=lambda c: (c.get("type", 1), c["name"]))
+        payload = json.dumps({"application_id": self.application_id, "commands": commands_data}, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _load_synced_hash():
+        if os.path.exists(COMMAND_SYNC_FILE):
+            try:
+                with open(COMMAND_SYNC_FILE, 'r', encoding='utf-8') as f:
+                    return json.load(f).get("hash")
+            except:
+                return None
+        return None
+
+    async def sync_command_tree(self, force: bool = False):
+        """定義が前回の同期から変わっていれば同期して結果を返す。省略した場合は None"""
+        digest = self.command_tree_hash()
+        if not force and digest == self._load_synced_hash():
+            return None
+        synced = await self.tree.sync()
+        persistence.write_json(COMMAND_SYNC_FILE, {"hash": digest})
+        return synced
 
     async def on_ready(self):
         print(f'[System]Login: {self.user.name} ({self.user.id})')
+        if not self._login_logged:
+            self._login_logged = True
+            startup_timer.record("ready", startup_timer.elapsed_ms())
+            print(f"[Startup] {startup_timer.summary()}")
+        print(f"[Memory] {memory_report(self)}")
 
     async def on_message(self, message: discord.Message):
         # Botのメッセージは無視
         if message.author.bot or not message.guild:
             return
 
-        content = message.content.strip()
-        if not content:
+        # プレフィックスなしコマンドの解決 (本文は1回だけ読む)
+        resolved = self.dispatcher.resolve(message.content)
+        if resolved is None:
             return
 
-        # 1. 管理者用: setchannel はチャンネル許可状態に関わらず反応させる
-        if content.lower().startswith("setchannel"):
-            message.content = f"{DUMMY_PREFIX}{content}"
-            await self.process_commands(message)
+        # 管理者用: setchannel はチャンネル許可状態に関わらず反応させる
+        # それ以外は許可されたチャンネルでのみ実行する
+        command = resolved[0]
+        if message.channel.id not in state.allowed_channels and command.name != "setchannel":
             return
 
-        # 2. 許可されたチャンネル以外は無視
-        if message.channel.id not in state.allowed_channels:
-            return
+        await self.dispatcher.invoke(message, resolved)
 
-        # 3. プレフィックスなしコマンドの処理
-        parts = content.split(" ", 1)
-        cmd_name = parts[0].lower()
-
-        is_special = False
-        if cmd_name == "othello" and len(parts) > 1:
-            sub = parts[1].split(" ", 1)[0].lower()
-            if sub == "leave":
-                cmd_name = "leave"
-                is_special = True
-            elif sub in ["point", "points"]:
-                cmd_name = "point"
-                is_special = True
-
-        # コマンドが存在するか確認
-        command_obj = self.get_command(cmd_name)
-        if command_obj:
-            # プレフィックスを内部的に付与して実行
-            if is_special:
-                extra = content.split(" ", 2)[2] if len(content.split(" ", 2)) > 2 else ""
-                message.content = f"{DUMMY_PREFIX}{cmd_name} {extra}"
-            else:
-                message.content = f"{DUMMY_PREFIX}{content}"
-            
-            await self.process_commands(message)
-
-    async def on_reaction_add(self, reaction: discord.Reaction, user: discord.User):
-        if user.bot: return
-        
-        # オセロのリアクション処理
-        if reaction.message.id in state.active_games:
-            from cogs.games import handle_othello_reaction
-            await handle_othello_reaction(reaction, user)
-            
-        # 四目並べのリアクション処理
-        elif reaction.message.id in state.active_connectfour_games:
-            from cogs.games import handle_cf_reaction
-            await handle_cf_reaction(reaction, user)
-
-        # じゃんけんのリアクション処理
-        elif reaction.message.id in state.active_janken_games:
-            from cogs.games import handle_janken_reaction
-            await handle_janken_reaction(reaction, user)
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        # ゲーム盤面へのリアクションは、メッセージがキャッシュになくても処理する
+        if payload.guild_id is None or payload.user_id == self.user.id:
+            return
+        if payload.member and payload.member.bot:
+            return
+        await reactions.dispatch(self, payload)
 
 bot = SugiyamaBot()
\ No newline at end of file
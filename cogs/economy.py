@@ -5,70 +5,77 @@ import random
 import datetime
 import math
 import asyncio
+import time
 from core.config import JST
 from core.constants import BET_DICE_PAYOUTS, STATUS_EMOJIS
 from data.points_manager import points_manager
 from data.login_manager import login_manager
+from data.user_store import user_store
+from data.transactions import points_tx
 from ui.embeds import create_embed
+from services.network.user_resolver import user_resolver
+from services.network.member_resolver import LazyMember
 from ui.views_economy import RankingDetailView, GambleConfirmView, LoginBonusView, GambleResultView, ConfirmGiveView
 
 class Economy(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # ランキング表示のキャッシュ (順位・ポイントが変わらず、名前の解決結果の期限内なら再利用する)
+        self._board_key = None
+        self._board_fields = None
+        self._board_expires = 0.0
+
+    async def _render_leaderboard(self, guild, rich_top10: list, poor_top10: list) -> tuple:
+        """富豪Top5と貧乏Top3の表示テキストを返す"""
+        key = (tuple(rich_top10), tuple(poor_top10))
+        if key == self._board_key and time.monotonic() < self._board_expires:
+            return self._board_fields
+        names = await user_resolver.resolve_many(self.bot, [p[0] for p in rich_top10[:5] + poor_top10[:3]], guild)
+        # 名前を取得できなかった人 (ID:xxx) がいる表示は、user_resolver と同じ短い期限で作り直す
+        unresolved = any(user_resolver.is_unresolved(name, uid) for uid, name in names.items())
+        self._board_expires = time.monotonic() + (user_resolver.miss_ttl if unresolved else user_resolver.ttl)
+        rich_top5_text = []
+        for i, (pid, pval) in enumerate(rich_top10[:5]):
+            medal = "🥇 " if i == 0 else "🥈 " if i == 1 else "🥉 " if i == 2 else ""
+            rich_top5_text.append(f"{medal}{i + 1}位 {names[pid]} - **{pval}pt**")
+        poor_top3_text = [f"{i + 1}位 {names[pid]} - **{pval}pt**" for i, (pid, pval) in enumerate(poor_top10[:3])]
+        self._board_key = key
+        self._board_fields = ("\n".join(rich_top5_text), "\n".join(poor_top3_text))
+        return self._board_fields
 
     @commands.command(name="point", aliases=["othello point", "ポイント"])
     async def point(self, ctx):
-        author_id_str = str(ctx.author.id)
-        human_players_points = {pid: p for pid, p in points_manager.game_points.items() if int(pid) != self.bot.user.id}
-        if not human_players_points:
+        bot_id = self.bot.user.id
+        rich_top10 = points_manager.get_top(10, bot_id)
+        if not rich_top10:
             return await ctx.reply(embed=create_embed("ランキング", "まだポイントを持っているプレイヤーがいません。", status="info"), mention_author=False)
-        rich_sorted = sorted(human_players_points.items(), key=lambda item: item[1], reverse=True)
-        poor_sorted = sorted(human_players_points.items(), key=lambda item: item[1])
+        poor_top10 = [p for p in points_manager.get_bottom(10, bot_id) if p[1] < 0]
         embed = create_embed("ゲームポイントランキング", color=discord.Color.gold(), status="success")
-        rich_top5_text = []
-        for i, (pid, pval) in enumerate(rich_sorted[:5]):
-            medal = "🥇 " if i == 0 else "🥈 " if i == 1 else "🥉 " if i == 2 else ""
-            try: user = await self.bot.fetch_user(int(pid))
-            except: user = None
-            user_display = user.mention if user else f"ID:{pid}"
-            rich_top5_text.append(f"{medal}{i + 1}位 {user_display} - **{pval}pt**")
-        embed.add_field(name="🏆 富豪ランキング Top 5", value="\n".join(rich_top5_text) or "該当者なし", inline=False)
-        poor_top3_text = []
-        poor_players = [p for p in poor_sorted if p[1] < 0]
-        for i, (pid, pval) in enumerate(poor_players[:3]):
-            try: user = await self.bot.fetch_user(int(pid))
-            except: user = None
-            user_display = user.mention if user else f"ID:{pid}"
-            poor_top3_text.append(f"{i + 1}位 {user_display} - **{pval}pt**")
+        rich_top5_text, poor_top3_text = await self._render_leaderboard(ctx.guild, rich_top10, poor_top10)
+        embed.add_field(name="🏆 富豪ランキング Top 5", value=rich_top5_text or "該当者なし", inline=False)
         if poor_top3_text:
-            embed.add_field(name="💸 貧乏ランキング Top 3", value="\n".join(poor_top3_text), inline=False)
+            embed.add_field(name="💸 貧乏ランキング Top 3", value=poor_top3_text, inline=False)
         my_points = points_manager.get_points(ctx.author.id)
         footer_text = f"あなたのポイント: {my_points}pt"
-        my_rich_rank = points_manager.get_rank(ctx.author.id, self.bot.user.id)
+        my_rich_rank = points_manager.get_rank(ctx.author.id, bot_id)
         if my_rich_rank != -1: footer_text += f" | 富豪ランク: {my_rich_rank}位"
         if my_points < 0:
-            my_poor_rank = -1
-            for i, (pid, pval) in enumerate(poor_players):
-                if pid == author_id_str:
-                    my_poor_rank = i + 1
-                    break
+            my_poor_rank = points_manager.get_poor_rank(ctx.author.id, bot_id)
             if my_poor_rank != -1: footer_text += f" | 貧乏ランク: {my_poor_rank}位"
         embed.set_footer(text=footer_text, icon_url=ctx.author.display_avatar.url)
-        rich_10 = "\n".join([f"{i+1}位 <@{p[0]}>: {p[1]}pt" for i, p in enumerate(rich_sorted[:10])])
-        poor_10 = "\n".join([f"{i+1}位 <@{p[0]}>: {p[1]}pt" for i, p in enumerate(poor_sorted[:10]) if p[1] < 0])
+        rich_10 = "\n".join([f"{i+1}位 <@{p[0]}>: {p[1]}pt" for i, p in enumerate(rich_top10)])
+        poor_10 = "\n".join([f"{i+1}位 <@{p[0]}>: {p[1]}pt" for i, p in enumerate(poor_top10)])
         await ctx.reply(embed=embed, view=RankingDetailView(ctx.author.id, rich_10, poor_10), mention_author=False)
 
     @commands.command(name="gamble", aliases=["ギャンブル"])
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def gamble(self, ctx):
         player_id = ctx.author.id
-        user_id_str = str(player_id)
         today_str = datetime.datetime.now(JST).strftime("%Y-%m-%d")
         current_points = points_manager.get_points(player_id)
         GAMBLE_LIMIT = 5
-        user_data = points_manager.login_bonus_data.get(user_id_str, {})
-        g_info = user_data.get("gamble_info", {"date": "2000-01-01", "count": 0})
-        play_count = g_info["count"] if g_info["date"] == today_str else 0
+        record = user_store.get(player_id)
+        play_count = record.gamble_count if record and record.gamble_date == today_str else 0
         if current_points > 0 and play_count >= GAMBLE_LIMIT:
             msg = f"今日のギャンブルは上限の **{GAMBLE_LIMIT}回** に達しました。\n`bet` コマンドの使用を推奨します。"
             return await ctx.reply(embed=create_embed("回数上限", msg, discord.Color.red(), "danger"), mention_author=False)
@@ -80,29 +87,33 @@ class Economy(commands.Cog):
         view.message = confirm_message
         await view.wait()
         if not view.confirmed: return
-        if g_info["date"] != today_str: g_info = {"date": today_str, "count": 1}
-        else: g_info["count"] += 1
-        if user_id_str not in points_manager.login_bonus_data: points_manager.login_bonus_data[user_id_str] = {}
-        points_manager.login_bonus_data[user_id_str]["gamble_info"] = g_info
-        points_manager.save_all()
-        is_whale = current_points >= 20000
-        bet_amount = 0
-        if is_whale: bet_amount = random.randint(current_points // 4, current_points // 2)
-        elif current_points > 0: bet_amount = random.randint(max(1, current_points // 3), current_points)
-        else: bet = 100 if -100 <= current_points <= 0 else random.randint(abs(current_points)//6, abs(current_points)//2)
-        def get_multiplier():
-            roll = random.random()
-            if roll < 0.02: base = random.uniform(5.01, 10.0)
-            elif roll < 0.15: base = random.uniform(3.01, 5.0)
-            else: base = random.uniform(1.51, 3.0)
-            return round(base * random.choice([-1, 1]), 2)
-        multiplier = get_multiplier()
-        if is_whale: multiplier = round(random.uniform(-1.8, -1.5), 2)
-        elif -1.5 <= multiplier <= 1.5 and multiplier != 0: multiplier = get_multiplier()
-        original_multiplier = multiplier
-        profit_loss = int(bet_amount * multiplier)
-        points_change = profit_loss - bet_amount
-        points_manager.update_points(player_id, points_change)
+        async with points_tx.lock(player_id):
+            # 確認待ちの間に残高・回数が変わっている可能性があるので、ロック内で読み直す
+            current_points = points_manager.get_points(player_id)
+            record = user_store.get(player_id)
+            play_count = record.gamble_count if record and record.gamble_date == today_str else 0
+            if current_points > 0 and play_count >= GAMBLE_LIMIT:
+                msg = f"今日のギャンブルは上限の **{GAMBLE_LIMIT}回** に達しました。\n`bet` コマンドの使用を推奨します。"
+                return await confirm_message.edit(embed=create_embed("回数上限", msg, discord.Color.red(), "danger"), view=None)
+            user_store.set_gamble(player_id, today_str, play_count + 1)
+            is_whale = current_points >= 20000
+            bet_amount = 0
+            if is_whale: bet_amount = random.randint(current_points // 4, current_points // 2)
+            elif current_points > 0: bet_amount = random.randint(max(1, current_points // 3), current_points)
+            else: bet = 100 if -100 <= current_points <= 0 else random.randint(abs(current_points)//6, abs(current_points)//2)
+            def get_multiplier():
+                roll = random.random()
+                if roll < 0.02: base = random.uniform(5.01, 10.0)
+                elif roll < 0.15: base = random.uniform(3.01, 5.0)
+                else: base = random.uniform(1.51, 3.0)
+                return round(base * random.choice([-1, 1]), 2)
+            multiplier = get_multiplier()
+            if is_whale: multiplier = round(random.uniform(-1.8, -1.5), 2)
+            elif -1.5 <= multiplier <= 1.5 and multiplier != 0: multiplier = get_multiplier()
+            original_multiplier = multiplier
+            profit_loss = int(bet_amount * multiplier)
+            points_change = profit_loss - bet_amount
+            points_manager.update_points(player_id, points_change)
         details_log = [f"**1. ベット額の決定**", f"▫️ ギャンブル前の所持ポイント: `{current_points}pt`"]
         if is_whale: details_log.append("▫️ **富豪調整が適用されました。**")
         details_log.append(f"▶️ **ベット額: `{bet_amount}pt`**")
@@ -136,15 +147,18 @@ class Economy(commands.Cog):
     async def bet(self, ctx, amount_str: str):
         try: amount = int(amount_str)
         except ValueError: return await ctx.send(embed=create_embed("エラー", "賭け金は整数で指定してください。", discord.Color.orange(), "warning"))
-        current_points = points_manager.get_points(ctx.author.id)
         if amount <= 0: return await ctx.send(embed=create_embed("エラー", "賭け金は1ポイント以上で指定してください。", discord.Color.orange(), "warning"))
-        if current_points < amount: return await ctx.send(embed=create_embed("ポイント不足", f"ポイントが不足しています。\nあなたのポイント: `{current_points}pt`", discord.Color.orange(), "warning"))
+        # 賭け金は先に引き落とし、結果に応じて払い戻す
+        if not await points_tx.try_debit(ctx.author.id, amount):
+            current_points = points_manager.get_points(ctx.author.id)
+            return await ctx.send(embed=create_embed("ポイント不足", f"ポイントが不足しています。\nあなたのポイント: `{current_points}pt`", discord.Color.orange(), "warning"))
+        # 結果は引き落としの直後に反映する (演出や送信が失敗しても賭け金が消えないように)
+        dice_roll = random.randint(1, 6)
+        message, payout_multiplier = BET_DICE_PAYOUTS[dice_roll]
+        points_change = int(amount * payout_multiplier)
+        points_manager.update_points(ctx.author.id, amount + points_change)
         async with ctx.typing():
             await asyncio.sleep(0.8)
-            dice_roll = random.randint(1, 6)
-            message, payout_multiplier = BET_DICE_PAYOUTS[dice_roll]
-            points_change = int(amount * payout_multiplier)
-            points_manager.update_points(ctx.author.id, points_change)
             title = f"ダイスベット結果: {dice_roll}"
             description = f"{ctx.author.mention} が `{amount}pt` をベット！\n\n**結果**\n{message}"
             embed = create_embed(title, description, discord.Color.purple(), "info")
@@ -160,30 +174,15 @@ class Economy(commands.Cog):
     @commands.command(name="login", aliases=["bonus", "daily", "ログイン", "ログボ"])
     @commands.cooldown(1, 3, commands.BucketType.user)
     async def login_bonus_command(self, ctx):
-        user_id_str = str(ctx.author.id)
-        today = datetime.datetime.now(JST)
-        user_data = points_manager.login_bonus_data.get(user_id_str, {})
-        last_login_str = user_data.get("last_login", "2000-01-01")
-        if last_login_str == today.strftime("%Y-%m-%d"):
+        current_rank = points_manager.get_rank(ctx.author.id, self.bot.user.id)
+        bonus = login_manager.check_and_get_bonus(ctx.author.id, current_rank)
+        if bonus is None:
             view = LoginBonusView(ctx.author.id)
             message = await ctx.send(embed=create_embed("ログイン済み", f"{STATUS_EMOJIS['warning']} 今日のログインボーナスは既に受け取っています。\n毎日0時にリセットされます。", discord.Color.orange(), "warning"), view=view)
             view.message = message
             return
-        consecutive_days_val = user_data.get("consecutive_days", 0)
-        last_login_date = datetime.datetime.strptime(last_login_str, "%Y-%m-%d").date()
-        if last_login_date == today.date() - datetime.timedelta(days=1): consecutive_days = (consecutive_days_val % 10) + 1
-        else: consecutive_days = 1
-        current_rank = points_manager.get_rank(ctx.author.id, self.bot.user.id)
-        base_points = 30
-        rank_bonus = 0
-        if current_rank == 1: rank_bonus = 30
-        elif 2 <= current_rank <= 3: rank_bonus = 20
-        elif 4 <= current_rank <= 10: rank_bonus = 10
-        consecutive_bonus = (consecutive_days - 1) * 10
-        points_to_add = max(30, base_points + rank_bonus + consecutive_bonus)
+        consecutive_days, points_to_add = bonus["days"], bonus["points"]
         points_manager.update_points(ctx.author.id, points_to_add)
-        points_manager.login_bonus_data[user_id_str] = {"last_login": today.strftime("%Y-%m-%d"), "consecutive_days": consecutive_days}
-        points_manager.save_all()
         desc = (f"{STATUS_EMOJIS['success']} **{consecutive_days}日目**のログインボーナスです！\n"
                 f"{STATUS_EMOJIS['pending']} `+{points_to_add}pt` を獲得しました！\n\n"
                 "**連続ログイン**や**ランキング順位**でポイントが増減します。")
@@ -196,7 +195,7 @@ class Economy(commands.Cog):
 
     @commands.command(name="give", aliases=["pay", "送金"])
     @commands.cooldown(1, 10, commands.BucketType.user)
-    async def give_command(self, ctx, target: discord.Member, amount_str: str):
+    async def give_command(self, ctx, target: LazyMember, amount_str: str):
         if ctx.author == target or target.bot:
             return await ctx.send(embed=create_embed("エラー", "自分自身またはBotには送金できません。", discord.Color.orange(), "warning"))
         try:
@@ -4,6 +4,7 @@ from discord.ext import commands
 import asyncio
 import random
 from core.state import state
+from core.reactions import reactions
 from core.constants import BLACK, WHITE, EMPTY, MARKERS, CONNECTFOUR_MARKERS, CF_EMPTY, CF_P1_TOKEN, CF_P2_TOKEN, COLS, ROWS, HAND_EMOJIS, EMOJI_TO_HAND, JANKEN_WIN_POINTS, JANKEN_LOSE_POINTS, JANKEN_DRAW_POINTS, CONNECTFOUR_WIN_POINTS, CONNECTFOUR_LOSE_POINTS, CONNECTFOUR_DRAW_POINTS
 from engines.othello import OthelloEngine
 from engines.connect_four import ConnectFourEngine, get_connectfour_bot_move
@@ -14,6 +15,7 @@ from ui.views_highlow import HighLowRecruitmentView # 【修正】募集用View
 from ui.views_common import ConfirmLeaveView
 from ui.embeds import create_embed
 from data.points_manager import points_manager
+from services.network.member_resolver import LazyMember
 from core.config import AFK_TIMEOUT_SECONDS
 
 # --- Helper Functions ---
@@ -57,15 +59,13 @@ async def send_othello_result_message_helper(channel, game_session, original_mes
                 elif game.board_size == 8: win_pt, lose_pt = diff * 3 + 20, max(0, 50 - diff)
                 else: win_pt, lose_pt = diff * 4 + 30, max(0, 60 - diff)
             
-            points_manager.update_points(winner_id, win_pt)
-            points_manager.update_points(loser_id, -lose_pt)
+            points_manager.apply_deltas({winner_id: win_pt, loser_id: -lose_pt})
             points_text = f"▫️ <@{winner_id}>: `+{win_pt}pt`\n▫️ <@{loser_id}>: `{-lose_pt}pt`"
 
     elif game.winner == EMPTY and reason_key == "normal":
         if not is_bot:
             draw_pt = 5
-            points_manager.update_points(p_black, draw_pt)
-            points_manager.update_points(p_white, draw_pt)
+            points_manager.apply_deltas({p_black: draw_pt, p_white: draw_pt})
             points_text = f"▫️ 両者: `+{draw_pt}pt`"
         winner_text = "🤝 引き分け！"
 
@@ -90,11 +90,10 @@ async def send_connectfour_result_message_helper(channel, game, message, reason_
         reason = f"（{reason_key}）" if reason_key != "normal" else ""
         win_txt = f"🏆 {game.winner} <@{wid}> の勝ち！{reason}"
         if not is_bot:
-            points_manager.update_points(wid, CONNECTFOUR_WIN_POINTS)
-            points_manager.update_points(lid, CONNECTFOUR_LOSE_POINTS)
+            points_manager.apply_deltas({wid: CONNECTFOUR_WIN_POINTS, lid: CONNECTFOUR_LOSE_POINTS})
             pt_txt = f"▫️ <@{wid}>: `{CONNECTFOUR_WIN_POINTS:+}pt`\n▫️ <@{lid}>: `{CONNECTFOUR_LOSE_POINTS:+}pt`"
     elif not is_bot:
-        for p in game.players.values(): points_manager.update_points(p, CONNECTFOUR_DRAW_POINTS)
+        points_manager.apply_deltas({p: CONNECTFOUR_DRAW_POINTS for p in game.players.values()})
         pt_txt = f"▫️ 両者: `+{CONNECTFOUR_DRAW_POINTS}pt`"
 
     res_embed.add_field(name="結果", value=win_txt, inline=False)
@@ -133,7 +132,7 @@ async def run_othello_bot_turn(message, session, bot):
         game.check_game_status()
         if game.game_over:
             await send_othello_result_message_helper(message.channel, session, message)
-            if message.id in state.active_games: del state.active_games[message.id]
+            end_othello_session(message.id)
         else:
             await message.edit(embed=build_othello_embed(session))
             await update_othello_reactions(message, game)
@@ -147,7 +146,7 @@ async def run_othello_bot_turn(message, session, bot):
     await message.edit(embed=build_othello_embed(session))
     if game.game_over:
         await send_othello_result_message_helper(message.channel, session, message)
-        if message.id in state.active_games: del state.active_games[message.id]
+        end_othello_session(message.id)
     else:
         bot_id = bot.user.id if hasattr(bot, "user") and bot.user else getattr(bot, "id", None)
         if game.get_current_player_id() == bot_id:
@@ -162,7 +161,7 @@ async def run_connectfour_bot_turn(message, game):
         game.drop_token(bot_col)
         if game.check_win() or game.is_board_full():
             await send_connectfour_result_message_helper(message.channel, game, message)
-            if message.id in state.active_connectfour_games: del state.active_connectfour_games[message.id]
+            end_connectfour_session(message.id)
             return
         game.switch_player()
         await message.edit(embed=create_cf_board_embed(game))
@@ -170,9 +169,13 @@ async def run_connectfour_bot_turn(message, game):
 class Games(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # 盤面メッセージへのリアクションの処理先
+        reactions.register("othello", handle_othello_reaction)
+        reactions.register("connectfour", handle_cf_reaction)
+        reactions.register("janken", handle_janken_reaction)
 
     @commands.command(name="othello", aliases=["オセロ"])
-    async def othello(self, ctx, opponent: discord.Member = None):
+    async def othello(self, ctx, opponent: LazyMember = None):
         if opponent and (opponent == ctx.author or (opponent.bot and opponent.id != self.bot.user.id)):
             return await ctx.send(embed=create_embed("エラー", "不正な対戦相手です。", status="warning"))
         for s in state.active_games.values():
@@ -183,7 +186,7 @@ class Games(commands.Cog):
         await ctx.send(embed=create_embed("オセロ 盤面選択", desc, discord.Color.green(), "info"), view=view)
 
     @commands.command(name="4moku", aliases=["cf", "四目並べ", "4目並べ"])
-    async def connectfour(self, ctx, opponent: discord.Member = None):
+    async def connectfour(self, ctx, opponent: LazyMember = None):
         if opponent and (opponent == ctx.author or (opponent.bot and opponent.id != self.bot.user.id)):
             return await ctx.send(embed=create_embed("エラー", "不正な対戦相手です。", status="warning"))
         desc = f"{ctx.author.mention} が四目並べの対戦相手を募集しています。\nルール: 縦横斜めに4つ揃えたら勝ち。"
@@ -192,7 +195,7 @@ class Games(commands.Cog):
 
     @commands.command(name="highlow", aliases=["hl", "ハイロー"])
     @commands.cooldown(1, 10, commands.BucketType.user)
-    async def highlow(self, ctx, bet_amount_str: str, opponent: discord.Member):
+    async def highlow(self, ctx, bet_amount_str: str, opponent: LazyMember):
         if opponent == ctx.author or opponent.bot:
             return await ctx.send(embed=create_embed("エラー", "対戦相手が不正です。", status="warning"))
         try:
@@ -222,6 +225,7 @@ class Games(commands.Cog):
         view = JankenChoiceView(ctx.author.id)
         msg = await ctx.send(embed=create_embed("じゃんけん", desc, discord.Color.blue(), "pending"), view=view)
         state.active_janken_games[msg.id] = {"host_id": ctx.author.id, "host_hand": None, "message": msg, "game_status": "host_choosing"}
+        reactions.bind(msg.id, "janken")
 
     @commands.command(name="leave", aliases=["退出"])
     async def leave(self, ctx):
@@ -241,88 +245,98 @@ class Games(commands.Cog):
         view = ConfirmLeaveView(ctx.author, target_session, mid, gtype, game_obj)
         await ctx.send(embed=create_embed("確認", f"ゲーム #{game_obj.game_id} から離脱しますか？\n(負け扱いになります)", discord.Color.orange(), "warning"), view=view)
 
+# --- Session Cleanup ---
+def end_othello_session(message_id):
+    state.active_games.pop(message_id, None)
+    reactions.unbind(message_id)
+
+def end_connectfour_session(message_id):
+    state.active_connectfour_games.pop(message_id, None)
+    reactions.unbind(message_id)
+
 # --- Reaction Handlers ---
-async def handle_othello_reaction(reaction, user):
-    session = state.active_games.get(reaction.message.id)
+# payload は RawReactionActionEvent、message は盤面の PartialMessage
+async def handle_othello_reaction(payload, message):
+    session = state.active_games.get(message.id)
     if not session: return
     game = session["game"]
-    if user.id != game.get_current_player_id():
-        try: await reaction.remove(user)
+    if payload.user_id != game.get_current_player_id():
+        try: await message.remove_reaction(payload.emoji, discord.Object(id=payload.user_id))
         except: pass
         return
     chosen = None
     for c, m in game.valid_moves_with_markers.items():
-        if str(reaction.emoji) == m:
+        if str(payload.emoji) == m:
             chosen = c
             break
     if chosen:
-        try: await reaction.remove(user) 
+        try: await message.remove_reaction(payload.emoji, discord.Object(id=payload.user_id))
         except: pass
         game.make_move(chosen[0], chosen[1], game.current_player)
         game.switch_player()
         game.check_game_status()
-        await reaction.message.edit(embed=build_othello_embed(session))
+        await message.edit(embed=build_othello_embed(session))
         if game.game_over:
-            await send_othello_result_message_helper(reaction.message.channel, session, reaction.message)
-            del state.active_games[reaction.message.id]
+            await send_othello_result_message_helper(message.channel, session, message)
+            end_othello_session(message.id)
         else:
-            bot_id = reaction.message.guild.me.id
+            bot_id = message.guild.me.id
             if game.get_current_player_id() == bot_id:
-                asyncio.create_task(run_othello_bot_turn(reaction.message, session, reaction.message.guild.me))
+                asyncio.create_task(run_othello_bot_turn(message, session, message.guild.me))
             else:
-                await update_othello_reactions(reaction.message, game)
+                await update_othello_reactions(message, game)
 
-async def handle_janken_reaction(reaction, user):
-    game_data = state.active_janken_games.get(reaction.message.id)
+async def handle_janken_reaction(payload, message):
+    game_data = state.active_janken_games.get(message.id)
     if not game_data or game_data["game_status"] != "opponent_recruiting": return
-    if user.id == game_data["host_id"]: return
-    op_hand = EMOJI_TO_HAND.get(str(reaction.emoji))
+    if payload.user_id == game_data["host_id"]: return
+    op_hand = EMOJI_TO_HAND.get(str(payload.emoji))
     if not op_hand: return
     host_id = game_data["host_id"]
     host_hand = game_data["host_hand"]
+    op_id = payload.user_id
     res = judge_janken(host_hand, op_hand)
     winner, loser = None, None
-    if res == 1: winner, loser = host_id, user.id
-    elif res == 2: winner, loser = user.id, host_id
+    if res == 1: winner, loser = host_id, op_id
+    elif res == 2: winner, loser = op_id, host_id
     pt_txt = ""
     if winner:
-        points_manager.update_points(winner, JANKEN_WIN_POINTS)
-        points_manager.update_points(loser, JANKEN_LOSE_POINTS)
+        points_manager.apply_deltas({winner: JANKEN_WIN_POINTS, loser: JANKEN_LOSE_POINTS})
         pt_txt = f"<@{winner}>: `{JANKEN_WIN_POINTS:+}pt`\n<@{loser}>: `{JANKEN_LOSE_POINTS:+}pt`"
         res_text = f"🏆 <@{winner}> の勝ち！"
     else:
-        points_manager.update_points(host_id, JANKEN_DRAW_POINTS)
-        points_manager.update_points(user.id, JANKEN_DRAW_POINTS)
+        points_manager.apply_deltas({host_id: JANKEN_DRAW_POINTS, op_id: JANKEN_DRAW_POINTS})
         pt_txt = f"両者: `{JANKEN_DRAW_POINTS:+}pt`"
         res_text = "🤝 引き分け！"
-    msg = game_data["message"]
-    try: await msg.clear_reactions()
+    # 結果が出たら以降のリアクションは受け付けない
+    del state.active_janken_games[message.id]
+    reactions.unbind(message.id)
+    try: await message.clear_reactions()
     except: pass
-    embed = create_embed("じゃんけん 結果", f"<@{host_id}>: {HAND_EMOJIS[host_hand]}\n{user.mention}: {HAND_EMOJIS[op_hand]}\n\n**{res_text}**", discord.Color.gold(), "success")
+    embed = create_embed("じゃんけん 結果", f"<@{host_id}>: {HAND_EMOJIS[host_hand]}\n<@{op_id}>: {HAND_EMOJIS[op_hand]}\n\n**{res_text}**", discord.Color.gold(), "success")
     embed.add_field(name="ポイント", value=pt_txt)
-    await msg.reply(embed=embed, mention_author=False)
-    del state.active_janken_games[reaction.message.id]
+    await message.reply(embed=embed, mention_author=False)
 
-async def handle_cf_reaction(reaction, user):
-    game = state.active_connectfour_games.get(reaction.message.id)
+async def handle_cf_reaction(payload, message):
+    game = state.active_connectfour_games.get(message.id)
     if not game or game.game_over: return
-    if user.id != game.get_current_player_id():
-        try: await reaction.remove(user)
+    if payload.user_id != game.get_current_player_id():
+        try: await message.remove_reaction(payload.emoji, discord.Object(id=payload.user_id))
         except: pass
         return
-    try: col = CONNECTFOUR_MARKERS.index(str(reaction.emoji))
+    try: col = CONNECTFOUR_MARKERS.index(str(payload.emoji))
     except: return
-    try: await reaction.remove(user)
+    try: await message.remove_reaction(payload.emoji, discord.Object(id=payload.user_id))
     except: pass
     if game.drop_token(col):
         if game.check_win() or game.is_board_full():
-            await send_connectfour_result_message_helper(reaction.message.channel, game, reaction.message)
-            del state.active_connectfour_games[reaction.message.id]
+            await send_connectfour_result_message_helper(message.channel, game, message)
+            end_connectfour_session(message.id)
             return
         game.switch_player()
-        await reaction.message.edit(embed=create_cf_board_embed(game))
-        if game.get_current_player_id() == reaction.message.guild.me.id:
-            asyncio.create_task(run_connectfour_bot_turn(reaction.message, game))
+        await message.edit(embed=create_cf_board_embed(game))
+        if game.get_current_player_id() == message.guild.me.id:
+            asyncio.create_task(run_connectfour_bot_turn(message, game))
 
 def judge_janken(h1, h2):
     if h1 == h2: return 0
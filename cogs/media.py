@@ -3,32 +3,63 @@ import discord
 from discord.ext import commands
 import io
 import os
+import asyncio
 import random
 import aiohttp
 import urllib.parse
-from core.config import FONTS_DIR, TEMPLATES_DIR
+from core.config import FONTS_DIR, TEMPLATES_DIR, MAX_FILE_SIZE, WATERMARK_OUTPUT_FORMAT
 from core.constants import TEMPLATES_DATA, STATUS_EMOJIS
-from services.image.base_worker import resize_if_too_large
-from services.image.text_gen import generate_styled_text_image
-from services.image.text_special import generate_text4_hd, generate_text5_gradient
-from services.image.watermark import process_and_composite_image
-from services.image.gaming_gif import create_gaming_gif
 from services.image.choyen import get_5000choyen_url
+from services.image.job_service import image_jobs, ImageJobQueueFull
+from services.image.result_cache import text_cache, text_cache_key, transform_cache, attachment_digest
 from services.ai.voicevox import generate_voicevox_audio
 from ui.embeds import create_embed
 
+# 画像処理 (PIL / numpy) は image_jobs のワーカープロセスで行い、この Cog では結果を待つだけにする
+
+# gaming のフレーム数と最大サイズ (結果キャッシュのキーにも使う)
+GAMING_FRAME_COUNT = 36
+GAMING_MAX_SIZE = (256, 256)
+
+def job_error_embed(error: Exception) -> discord.Embed:
+    if isinstance(error, ImageJobQueueFull):
+        return create_embed("混雑中", "画像処理が混み合っています。しばらくしてからもう一度お試しください。", discord.Color.orange(), "pending")
+    if isinstance(error, asyncio.TimeoutError):
+        return create_embed("タイムアウト", "画像処理に時間がかかりすぎたため中断しました。", discord.Color.red(), "danger")
+    return create_embed("エラー", "画像生成中に予期せぬエラーが発生しました。", discord.Color.red(), "danger")
+
 class Media(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    async def _send_img(self, ctx, img, title, filename="image.png"):
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        buf.seek(0)
-        
-        final_buf, resized = await resize_if_too_large(buf, "PNG")
-        
-        file = discord.File(final_buf, filename=filename)
+    async def _run_cached(self, key, job, args) -> bytes:
+        """同じ入力の結果が残っていればそれを返し、なければジョブを実行して結果を残す"""
+        data = await text_cache.get(key)
+        if data is None:
+            data, _ = await image_jobs.run(job, *args)
+            await text_cache.put(key, data)
+        return data
+
+    async def _run_transform(self, key, job, args):
+        """添付画像の加工。同じ画像・同じ加工の結果が残っていればデコードもせずにそれを返す"""
+        res = await transform_cache.get(key)
+        if res is None:
+            res = await image_jobs.run(job, *args)
+            if res:
+                await transform_cache.put(key, res)
+        return res
+
+    async def _send_job_img(self, ctx, job, args, title, filename="image.png", cache_key=None):
+        try:
+            if cache_key:
+                data = await self._run_cached(cache_key, job, args)
+            else:
+                data, resized = await image_jobs.run(job, *args)
+        except Exception as e:
+            print(f"Image Job Error ({job}): {e}")
+            return await ctx.send(embed=job_error_embed(e))
+
+        file = discord.File(io.BytesIO(data), filename=filename)
         desc = f"{STATUS_EMOJIS['info']} 改行はコンマ`,`区切りで スタンプ化は `square` をつけてください"
         embed = create_embed(title, desc, status="success")
         embed.set_image(url=f"attachment://{filename}")
@@ -55,21 +86,16 @@ class Media(commands.Cog):
         msg = await ctx.send(embed=create_embed("画像生成中...", "テキスト画像を生成しています...", discord.Color.blue(), "pending"))
         
         try:
-            img = generate_styled_text_image(clean_text, font_path, params, is_square)
-            
-            buf = io.BytesIO()
-            img.save(buf, format="PNG")
-            buf.seek(0)
-            
-            final_buf, resized = await resize_if_too_large(buf, "PNG")
-            file = discord.File(final_buf, filename="text.png")
+            key = text_cache_key(ctx.command.name, clean_text, is_square, params, font_path)
+            data = await self._run_cached(key, "styled_text", (clean_text, font_path, params, is_square))
+            file = discord.File(io.BytesIO(data), filename="text.png")
             
             embed = create_embed(title, f"{STATUS_EMOJIS['info']} 改行はコンマ`,`区切りで スタンプ化は `square` をつけてください", color, "success")
             embed.set_image(url="attachment://text.png")
             
             await msg.edit(content=None, embed=embed, attachments=[file])
         except Exception as e:
-            await msg.edit(embed=create_embed("エラー", "画像生成中に予期せぬエラーが発生しました。", discord.Color.red(), "danger"))
+            await msg.edit(embed=job_error_embed(e))
             print(f"Text Gen Error: {e}")
 
     @commands.command(name="text")
@@ -134,8 +160,9 @@ class Media(commands.Cog):
         if not clean_text:
             return await ctx.send(embed=create_embed("引数エラー", "画像にするテキスト内容が空です。", discord.Color.orange(), "warning"))
 
-        img = generate_text4_hd(clean_text, os.path.join(FONTS_DIR, "MochiyPopOne-Regular.ttf"))
-        await self._send_img(ctx, img, "テキスト4 (変形)")
+        font_path = os.path.join(FONTS_DIR, "MochiyPopOne-Regular.ttf")
+        await self._send_job_img(ctx, "text4", (clean_text, font_path), "テキスト4 (変形)",
+                                 cache_key=text_cache_key("text4", clean_text, True, None, font_path))
 
     @text4.error
     async def text4_error(self, ctx, error):
@@ -151,8 +178,9 @@ class Media(commands.Cog):
         if not clean_text:
             return await ctx.send(embed=create_embed("引数エラー", "画像にするテキスト内容が空です。", discord.Color.orange(), "warning"))
 
-        img = generate_text5_gradient(clean_text, os.path.join(FONTS_DIR, "MochiyPopOne-Regular.ttf"))
-        await self._send_img(ctx, img, "テキスト5 (虹色)")
+        font_path = os.path.join(FONTS_DIR, "MochiyPopOne-Regular.ttf")
+        await self._send_job_img(ctx, "text5", (clean_text, font_path), "テキスト5 (虹色)",
+                                 cache_key=text_cache_key("text5", clean_text, True, None, font_path))
 
     @text5.error
     async def text5_error(self, ctx, error):
@@ -169,18 +197,25 @@ class Media(commands.Cog):
         async with ctx.typing():
             image_bytes = await attachment.read()
             selected = random.choice(TEMPLATES_DATA)
-            res = process_and_composite_image(image_bytes, selected)
+            try:
+                digest = await asyncio.to_thread(attachment_digest, image_bytes)
+                # キーは画像とテンプレートの組 (同じ画像に同じテンプレートが選ばれた時だけ使い回す)。
+                # テンプレートを差し替えたら別のキーになるよう、更新時刻も含める
+                tmpl_path = os.path.join(TEMPLATES_DIR, selected['name'])
+                tmpl_mtime = os.stat(tmpl_path).st_mtime_ns if os.path.exists(tmpl_path) else None
+                key = transform_cache.key("watermark", digest, selected, tmpl_mtime, WATERMARK_OUTPUT_FORMAT, MAX_FILE_SIZE)
+                res = await self._run_transform(key, "watermark", (image_bytes, selected))
+            except Exception as e:
+                print(f"Watermark Job Error: {e}")
+                return await ctx.send(embed=job_error_embed(e))
             
             if res:
-                final, resized = await resize_if_too_large(res, "PNG")
-                if final:
-                    file = discord.File(final, filename=f"wm_{os.path.splitext(attachment.filename)[0]}.png")
-                    desc = f"使用テンプレート: `{selected['name']}`{' (リサイズ済)' if resized else ''}"
-                    embed = create_embed("ウォーターマーク加工完了", desc, discord.Color.blue(), "success")
-                    embed.set_image(url=f"attachment://{file.filename}")
-                    await ctx.send(embed=embed, file=file)
-                else:
-                    await ctx.send(embed=create_embed("エラー", "画像の最終処理に失敗しました。", discord.Color.red(), "danger"))
+                data, resized, ext = res
+                file = discord.File(io.BytesIO(data), filename=f"wm_{os.path.splitext(attachment.filename)[0]}.{ext}")
+                desc = f"使用テンプレート: `{selected['name']}`{' (リサイズ済)' if resized else ''}"
+                embed = create_embed("ウォーターマーク加工完了", desc, discord.Color.blue(), "success")
+                embed.set_image(url=f"attachment://{file.filename}")
+                await ctx.send(embed=embed, file=file)
             else:
                 await ctx.send(embed=create_embed("エラー", "画像の加工に失敗しました。", discord.Color.red(), "danger"))
 
@@ -197,17 +232,22 @@ class Media(commands.Cog):
         
         attachment = ctx.message.attachments[0]
         async with ctx.typing():
-            gif_io = create_gaming_gif(await attachment.read())
-            if gif_io:
-                final, resized = await resize_if_too_large(gif_io, "GIF")
-                if final:
-                    file = discord.File(final, filename=f"gaming_{os.path.splitext(attachment.filename)[0]}.gif")
-                    desc = f"うまくいかない場合は、カラー画像を添付してください。{' (リサイズ済)' if resized else ''}"
-                    embed = create_embed("ゲーミングGIF生成完了", desc, discord.Color.purple(), "success")
-                    embed.set_image(url=f"attachment://{file.filename}")
-                    await ctx.send(embed=embed, file=file)
-                else:
-                    await ctx.send(embed=create_embed("エラー", "画像の最終処理に失敗しました。", discord.Color.red(), "danger"))
+            try:
+                image_bytes = await attachment.read()
+                digest = await asyncio.to_thread(attachment_digest, image_bytes)
+                key = transform_cache.key("gaming", digest, GAMING_FRAME_COUNT, GAMING_MAX_SIZE, MAX_FILE_SIZE)
+                res = await self._run_transform(key, "gaming", (image_bytes, GAMING_FRAME_COUNT, GAMING_MAX_SIZE))
+            except Exception as e:
+                print(f"Gaming Job Error: {e}")
+                return await ctx.send(embed=job_error_embed(e))
+
+            if res:
+                data, resized = res
+                file = discord.File(io.BytesIO(data), filename=f"gaming_{os.path.splitext(attachment.filename)[0]}.gif")
+                desc = f"うまくいかない場合は、カラー画像を添付してください。{' (リサイズ済)' if resized else ''}"
+                embed = create_embed("ゲーミングGIF生成完了", desc, discord.Color.purple(), "success")
+                embed.set_image(url=f"attachment://{file.filename}")
+                await ctx.send(embed=embed, file=file)
             else:
                 await ctx.send(embed=create_embed("エラー", "ゲーミングGIFの生成に失敗しました。", discord.Color.red(), "danger"))
 
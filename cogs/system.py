@@ -1,52 +1,85 @@
 # cogs/system.py
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
+import asyncio
 import datetime
-from core.config import JST
 from core.state import state
-from services.ai.deepseek import generate_deepseek_text_response
+from core.scheduler import scheduler
+from core.memory import memory_report
+from services.image.job_service import image_jobs
+from services.image.result_cache import text_cache, transform_cache
 from data.points_manager import points_manager
 from data.settings_manager import settings_manager
+from data.weather_cache import weather_cache
 from ui.embeds import create_embed
+from core.lazy import lazy_import
+
+# 重いモジュールは初めて使う時に読み込む
+np = lazy_import("numpy")
+deepseek = lazy_import("services.ai.deepseek")
 
 class System(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # 富豪税タスクの開始
-        if not self.wealth_tax.is_running():
-            self.wealth_tax.start()
+        # 定時ジョブの登録 (時刻は JST)
+        scheduler.add_job("wealth_tax", self.wealth_tax, hours=5)
+        scheduler.add_job("city_codes", self.refresh_city_codes, hours=4, minute=30)
+        scheduler.add_job("points_snapshot", self.snapshot_points, hours=(0, 6, 12, 18))
 
     def cog_unload(self):
-        self.wealth_tax.cancel()
+        for name in ("wealth_tax", "city_codes", "points_snapshot"):
+            scheduler.remove_job(name)
 
-    @tasks.loop(hours=24)
     async def wealth_tax(self):
         """毎日朝5時に実行される富豪税ロジック"""
-        now = datetime.datetime.now(JST)
-        if now.hour != 5:
-            return
+        await self.bot.wait_until_ready()
 
         print("[System] 富豪税を徴収します...")
-        for user_id_str, points in points_manager.game_points.items():
-            try:
-                uid = int(user_id_str)
-                if uid == self.bot.user.id:
-                    continue
-                
-                tax = 0
-                if points >= 3000: tax = -50
-                elif points >= 500: tax = -10
-                elif points >= 100: tax = -5
-                
-                if tax != 0:
-                    points_manager.update_points(uid, tax)
-            except ValueError:
-                continue
+        # 全員分の残高を配列にして1回で税額を計算する
+        uids, balances = points_manager.balance_arrays()
+        tax = np.select([balances >= 3000, balances >= 500, balances >= 100], [-50, -10, -5], 0)
+        taxed = (tax != 0) & (uids != self.bot.user.id)
+        points_manager.apply_deltas(dict(zip(uids[taxed].tolist(), tax[taxed].tolist())))
         print("[System] 徴収が完了しました。")
 
-    @wealth_tax.before_loop
-    async def before_wealth_tax(self):
-        await self.bot.wait_until_ready()
+    async def refresh_city_codes(self):
+        """天気予報用の都市コード一覧を確認し、変更があれば差し替える。失敗時は今の一覧を使い続ける"""
+        if await weather_cache.update_from_api():
+            print(f"[System] 都市コードを更新しました ({len(state.weather_city_id_map)} 件)")
+
+    async def snapshot_points(self):
+        """ポイントDBのスナップショットを保存する"""
+        path = await asyncio.to_thread(points_manager.users.snapshot)
+        print(f"[System] ポイントDBのスナップショットを保存しました: {path}")
+
+    @commands.command(name="schedule")
+    @commands.is_owner()
+    async def schedule_status(self, ctx):
+        """定時ジョブの次回実行時刻と所要時間を表示する(オーナー限定)"""
+        lines = [
+            f"`{name}` 次回: {s['next_run']} / 前回: {s['last_run'] or '-'} / "
+            f"{s['runs']}回 (エラー {s['errors']}) / 所要 {s['last_duration_ms']}ms (最大 {s['max_duration_ms']}ms)"
+            for name, s in scheduler.stats().items()
+        ]
+        await ctx.send(embed=create_embed("スケジュール", "\n".join(lines) or "登録されているジョブはありません。", discord.Color.blue(), "info"))
+
+    @commands.command(name="memory")
+    @commands.is_owner()
+    async def memory_status(self, ctx):
+        """RSS とキャッシュの件数を表示する(オーナー限定)"""
+        report = memory_report(self.bot)
+        lines = [f"`{key}`: {value}" for key, value in report.items()]
+        await ctx.send(embed=create_embed("メモリ使用状況", "\n".join(lines), discord.Color.blue(), "info"))
+
+    @commands.command(name="imagejobs")
+    @commands.is_owner()
+    async def image_jobs_status(self, ctx):
+        """画像処理ジョブの待ち件数と所要時間、結果キャッシュ (文字画像・添付画像の加工) とグリフキャッシュのヒット数を表示する(オーナー限定)"""
+        lines = [f"`{key}`: {value}" for key, value in image_jobs.stats().items()]
+        lines += [f"`font_cache.{key}`: {value}" for key, value in image_jobs.font_stats().items()]
+        lines += [f"`text_cache.{key}`: {value}" for key, value in text_cache.stats().items()]
+        lines += [f"`transform_cache.{key}`: {value}" for key, value in transform_cache.stats().items() if not key.startswith("disk")]
+        await ctx.send(embed=create_embed("画像処理ジョブ", "\n".join(lines), discord.Color.blue(), "info"))
 
     @commands.command(name="setchannel")
     @commands.has_permissions(administrator=True)
@@ -84,15 +117,15 @@ class System(commands.Cog):
             + "\n".join(history)
         )
         
-        summary = await generate_deepseek_text_response(prompt)
+        summary = await deepseek.generate_deepseek_text_response(prompt)
         embed = create_embed("今北産業 (過去30分)", summary, discord.Color.green(), "success", "DeepSeek")
         await interaction.followup.send(embed=embed, ephemeral=True)
 
     @commands.command(name="sync")
     @commands.is_owner()
     async def sync_commands(self, ctx):
-        """スラッシュコマンドを手動同期する(オーナー限定)"""
-        synced = await self.bot.tree.sync()
+        """スラッシュコマンドを手動同期する(オーナー限定)。変更の有無に関わらず同期する"""
+        synced = await self.bot.sync_command_tree(force=True)
         await ctx.send(f"{len(synced)} 個のコマンドを同期しました。")
 
 async def setup(bot):
@@ -11,6 +11,7 @@ from core.constants import USER_BADGES_EMOJI, TIMEZONE_MAP, STATUS_EMOJIS
 from core.state import state
 from ui.embeds import create_embed
 from services.network.weather_api import get_weather_forecast, get_city_id_fuzzy
+from services.network.member_resolver import LazyMember
 
 class Utility(commands.Cog):
     def __init__(self, bot):
@@ -96,7 +97,7 @@ class Utility(commands.Cog):
             await ctx.send(embed=create_embed("引数不足", "文字列を指定してください。\n例: `totusi すごい`", discord.Color.orange(), "warning"))
 
     @commands.command(name="info")
-    async def info(self, ctx, member: discord.Member = None):
+    async def info(self, ctx, member: LazyMember = None):
         target = member or ctx.author
         embed = create_embed(f"{target.display_name} の情報", "", target.color, "info")
         if target.avatar: embed.set_thumbnail(url=target.avatar.url)
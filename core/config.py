@@ -28,10 +28,21 @@ DEEPSEEK_MODEL = "deepseek-chat"
 JST = pytz.timezone("Asia/Tokyo")
 
 # --- データファイルパス ---
-SETTINGS_FILE = os.path.join(BASE_DIR, "bot_settings.json")
-POINTS_FILE = os.path.join(BASE_DIR, "game_points.json")
-LOGIN_DATA_FILE = os.path.join(BASE_DIR, "login_bonus_data.json")
-CITY_CODES_FILE = os.path.join(BASE_DIR, "weather_city_codes.json")
+# 既定はプロジェクト直下。DATA_DIR で別の場所 (計測用の一時ディレクトリ等) を指定できる
+DATA_DIR = os.getenv("DATA_DIR", BASE_DIR)
+SETTINGS_FILE = os.path.join(DATA_DIR, "bot_settings.json")
+POINTS_FILE = os.path.join(DATA_DIR, "game_points.json")
+LOGIN_DATA_FILE = os.path.join(DATA_DIR, "login_bonus_data.json")
+CITY_CODES_FILE = os.path.join(DATA_DIR, "weather_city_codes.json")
+CITY_CODES_META_FILE = os.path.join(DATA_DIR, "weather_city_codes.meta.json")
+COMMAND_SYNC_FILE = os.path.join(DATA_DIR, "command_sync_state.json")
+POINTS_DB_FILE = os.path.join(DATA_DIR, "game_points.db")
+SCHEDULER_STATE_FILE = os.path.join(DATA_DIR, "scheduler_state.json")
+BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+TEMPLATE_CACHE_DIR = os.path.join(DATA_DIR, "template_cache")
+# 展開済みテンプレートの合計の上限 (既定 512MB。全テンプレートの全段は約 5.2GB)
+TEMPLATE_CACHE_MAX_BYTES = int(os.getenv("TEMPLATE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+TEXT_CACHE_DIR = os.path.join(DATA_DIR, "text_cache")
 
 # --- アセットディレクトリ ---
 FONTS_DIR = os.path.join(BASE_DIR, "assets", "fonts")
@@ -44,6 +55,24 @@ MAX_FILE_SIZE = int(7.8 * 1024 * 1024)
 MIN_IMAGE_DIMENSION = 300
 VOICEVOX_SPEAKER_ID = 11
 
+# --- メモリ節約モード ---
+# 有効にするとメンバーキャッシュと起動時のチャンク取得を止め、メッセージキャッシュを小さくする
+MEMORY_BUDGET_MODE = os.getenv("MEMORY_BUDGET_MODE", "0") == "1"
+MAX_CACHED_MESSAGES = int(os.getenv("MAX_CACHED_MESSAGES", "100"))
+MEMBER_LRU_SIZE = int(os.getenv("MEMBER_LRU_SIZE", "512"))
+
+# --- 画像処理ジョブ (別プロセスで実行) ---
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", str(os.cpu_count() or 1)))
+IMAGE_JOB_QUEUE_SIZE = int(os.getenv("IMAGE_JOB_QUEUE_SIZE", str(IMAGE_JOB_WORKERS * 4)))
+IMAGE_JOB_TIMEOUT = float(os.getenv("IMAGE_JOB_TIMEOUT", "60"))
+# ウォーターマークの出力形式: auto (透過のない画像は JPEG) / PNG / WEBP
+WATERMARK_OUTPUT_FORMAT = os.getenv("WATERMARK_OUTPUT_FORMAT", "auto").upper()
+# 文字画像コマンドの結果キャッシュの上限 (バイト数)。0 ならその段は使わない
+TEXT_CACHE_MEMORY_BYTES = int(os.getenv("TEXT_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+TEXT_CACHE_DISK_BYTES = int(os.getenv("TEXT_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+# 添付画像の加工結果 (watermark / gaming) をメモリに残す上限 (バイト数)
+TRANSFORM_CACHE_MEMORY_BYTES = int(os.getenv("TRANSFORM_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+
 IMAKITA_RATE_LIMIT_SECONDS = 60
 IMAKITA_RATE_LIMIT_COUNT = 5
 AFK_TIMEOUT_SECONDS = 180
\ No newline at end of file
@@ -85,4 +85,11 @@ TIMEZONE_MAP = {
     "TW": "Asia/Taipei", "AU": "Australia/Sydney", "DE": "Europe/Berlin",
     "FR": "Europe/Paris", "RU": "Europe/Moscow", "BR": "America/Sao_Paulo",
     "IN": "Asia/Kolkata", "CA": "America/Toronto", "SG": "Asia/Singapore"
-}
\ No newline at end of file
+}
+
+# 2語で1つのコマンドを指すエイリアス ("othello point" -> point)
+MULTI_WORD_ALIASES = {
+    "othello leave": "leave",
+    "othello point": "point",
+    "othello points": "point",
+}
@@ -0,0 +1,79 @@
+# core/dispatcher.py
+import re
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+# 先頭の空白を飛ばして1語読む (StringView.get_word と同じ区切り)
+_WORD = re.compile(r"\s*(\S+)")
+
+class CommandDispatcher:
+    """プレフィックスなしのメッセージからコマンドを引く表
+
+    コマンド名・エイリアス (小文字) からコマンドへの辞書と、
+    「othello point」のような2語のエイリアス用の辞書を起動時に1度だけ作る。
+    メッセージは先頭の語を1回だけ読み、コマンドだった場合のみ名前の直後を指す
+    StringView を作って引数の解析を続けるので、本文の書き換えや
+    プレフィックスの再走査は不要。
+    """
+    def __init__(self, multi_word_aliases: dict | None = None):
+        self.multi_word_aliases = multi_word_aliases or {}
+        self.bot = None
+        self._routes = {}   # 単語 -> Command
+        self._phrases = {}  # 1語目 -> {2語目: Command}
+        # コマンドの追加・削除 (Cogの再読み込み等) があれば次の解決時に作り直す
+        self.stale = True
+
+    def build(self, bot: commands.Bot):
+        """登録済みのコマンドとエイリアスから表を作り直す"""
+        self.bot = bot
+        routes = {}
+        for command in bot.commands:
+            for name in (command.name, *command.aliases):
+                routes[name.lower()] = command
+
+        phrases = {}
+        for phrase, target in self.multi_word_aliases.items():
+            command = bot.get_command(target)
+            if command is None:
+                continue
+            first, second = phrase.lower().split(" ", 1)
+            phrases.setdefault(first, {})[second] = command
+
+        self._routes, self._phrases = routes, phrases
+        self.stale = False
+
+    def resolve(self, content: str):
+        """(Command, 呼び出し名, StringView) を返す。コマンドでなければ None
+
+        返す StringView はコマンド名 (2語エイリアスなら2語目) の直後を指している。
+        """
+        if self.stale and self.bot:
+            self.build(self.bot)
+        match = _WORD.match(content)
+        if match is None:
+            return None
+        invoker = match.group(1).lower()
+
+        sub_routes = self._phrases.get(invoker)
+        if sub_routes:
+            second = _WORD.match(content, match.end())
+            command = second and sub_routes.get(second.group(1).lower())
+            if command:
+                return command, second.group(1).lower(), self._view_at(content, second.end())
+
+        command = self._routes.get(invoker)
+        if command is None:
+            return None
+        return command, invoker, self._view_at(content, match.end())
+
+    @staticmethod
+    def _view_at(content: str, index: int) -> StringView:
+        view = StringView(content)
+        view.index = view.previous = index
+        return view
+
+    async def invoke(self, message, resolved: tuple):
+        """resolve() の結果を使ってコマンドを実行する"""
+        command, invoker, view = resolved
+        ctx = commands.Context(prefix="", view=view, bot=self.bot, message=message, command=command, invoked_with=invoker)
+        await self.bot.invoke(ctx)
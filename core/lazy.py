@@ -0,0 +1,51 @@
+# core/lazy.py
+import importlib
+import threading
+import time
+
+class LazyModule:
+    """最初に属性へアクセスした時点でモジュールを import する代理オブジェクト
+
+    numpy や PIL、画像処理サービスのように読み込みの重いモジュールを
+    起動時ではなく初めて使われた時に読み込むために使う。
+        np = lazy_import("numpy")
+        np.zeros(3)  # ここで初めて numpy が import される
+    """
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is not None:
+            return module
+        # スレッドプールから同時に触られても1回だけ読み込む
+        with self.__dict__["_lock"]:
+            module = self.__dict__["_module"]
+            if module is None:
+                start = time.perf_counter()
+                module = importlib.import_module(self._name)
+                self.__dict__["_module"] = module
+                print(f"[Lazy] {self._name} を読み込みました ({(time.perf_counter() - start) * 1000:.0f}ms)")
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
@@ -0,0 +1,40 @@
+# core/memory.py
+import os
+import sys
+from core.reactions import reactions
+from data.persistence import persistence
+from services.network.member_resolver import member_resolver
+from services.network.user_resolver import user_resolver
+
+def current_rss_bytes() -> int | None:
+    """現在の常駐メモリ (RSS)。取得できない環境では None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # ピーク値しか取れないので参考値。Linux は KB、macOS は byte 単位
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+def memory_report(bot) -> dict:
+    """RSS と、ゲートウェイ・Bot内キャッシュのオブジェクト数"""
+    rss = current_rss_bytes()
+    return {
+        "rss_mb": round(rss / (1024 * 1024), 1) if rss is not None else None,
+        "guilds": len(bot.guilds),
+        "cached_members": sum(len(g.members) for g in bot.guilds),
+        "cached_users": len(bot.users),
+        "cached_messages": len(bot.cached_messages),
+        "max_messages": bot._connection.max_messages,
+        "member_lru": len(member_resolver),
+        "member_lru_hits": member_resolver.hits,
+        "member_lru_misses": member_resolver.misses,
+        "user_resolver": len(user_resolver),
+        "reaction_sessions": len(reactions),
+        "persistence_pending": persistence.pending,
+    }
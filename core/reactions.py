@@ -0,0 +1,42 @@
+# core/reactions.py
+from typing import Awaitable, Callable
+import discord
+
+# handler(payload, message): message はキャッシュに依存しない PartialMessage
+ReactionHandler = Callable[[discord.RawReactionActionEvent, discord.PartialMessage], Awaitable[None]]
+
+class ReactionRegistry:
+    """リアクションで操作するゲームの、メッセージID -> 処理関数 の対応表
+
+    処理関数はゲームの種類 ("othello" など) ごとに Cog が登録し、
+    ゲーム開始時に bind でメッセージと結び付ける。on_raw_reaction_add から
+    呼ばれるので、メッセージがキャッシュから消えていても動作する。
+    """
+    def __init__(self):
+        self._kinds = {}     # ゲームの種類 -> ReactionHandler
+        self._handlers = {}  # message_id -> ReactionHandler
+
+    def register(self, kind: str, handler: ReactionHandler):
+        self._kinds[kind] = handler
+
+    def bind(self, message_id: int, kind: str):
+        self._handlers[message_id] = self._kinds[kind]
+
+    def unbind(self, message_id: int):
+        self._handlers.pop(message_id, None)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._handlers
+
+    def __len__(self):
+        return len(self._handlers)
+
+    async def dispatch(self, bot: discord.Client, payload: discord.RawReactionActionEvent):
+        handler = self._handlers.get(payload.message_id)
+        if handler is None:
+            return
+        channel = bot.get_channel(payload.channel_id) or bot.get_partial_messageable(payload.channel_id, guild_id=payload.guild_id)
+        await handler(payload, channel.get_partial_message(payload.message_id))
+
+# インスタンスのエクスポート
+reactions = ReactionRegistry()
@@ -0,0 +1,165 @@
+# core/scheduler.py
+import asyncio
+import datetime
+import json
+import os
+import time
+from core.config import JST, SCHEDULER_STATE_FILE
+from data.persistence import persistence
+
+class ScheduledJob:
+    """毎日決まった時刻 (JST) に実行するジョブ。hours に複数の時を指定すると1日に複数回実行する"""
+    def __init__(self, name: str, func, hours, minute: int = 0):
+        self.name = name
+        self.func = func
+        self.hours = tuple(sorted({hours} if isinstance(hours, int) else set(hours)))
+        self.minute = minute
+
+        self.last_run = None       # 最後に実行した予定時刻
+        self.next_run = None       # 次に実行する時刻 (取りこぼし分の実行時は現在時刻)
+        self.runs = 0
+        self.errors = 0
+        self.last_duration_ms = 0.0
+        self.max_duration_ms = 0.0
+
+    def _slots(self, day: datetime.date):
+        for hour in self.hours:
+            yield JST.localize(datetime.datetime.combine(day, datetime.time(hour, self.minute)))
+
+    def next_after(self, now: datetime.datetime) -> datetime.datetime:
+        """now より後の最初の予定時刻"""
+        for day in (now.date(), now.date() + datetime.timedelta(days=1)):
+            for slot in self._slots(day):
+                if slot > now:
+                    return slot
+
+    def latest_before(self, now: datetime.datetime) -> datetime.datetime:
+        """now 以前の最後の予定時刻"""
+        for day in (now.date(), now.date() - datetime.timedelta(days=1)):
+            for slot in reversed(list(self._slots(day))):
+                if slot <= now:
+                    return slot
+
+class Scheduler:
+    """JST の壁時計に合わせてジョブを実行するスケジューラ
+
+    一定間隔でのポーリングはせず、次に予定されているジョブの時刻まで眠る。
+    各ジョブの最終実行時刻はファイルに保存し、再起動中に予定時刻を
+    過ぎていた場合は起動後に1回だけまとめて実行する。
+    """
+    # 時計のずれやスリープ復帰に備えて、1回に眠る長さの上限 (秒)
+    MAX_SLEEP = 600
+
+    def __init__(self, state_path: str = SCHEDULER_STATE_FILE):
+        self.state_path = state_path
+        self.jobs = {}
+        self._saved = self._load_state()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def _load_state(self) -> dict:
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    return {name: datetime.datetime.fromisoformat(ts) for name, ts in json.load(f).items()}
+            except Exception as e:
+                print(f"[Scheduler] 実行履歴の読み込みに失敗しました: {e}")
+        return {}
+
+    def _save_state(self):
+        # 登録されていないジョブの履歴も残しておく (Cog の再読み込み時など)
+        self._saved.update({name: job.last_run for name, job in self.jobs.items() if job.last_run})
+        persistence.write_json(self.state_path, {name: ts.isoformat() for name, ts in self._saved.items()})
+
+    # --- ジョブ登録 ---
+    def add_job(self, name: str, func, hours, minute: int = 0) -> ScheduledJob:
+        """func は引数なしのコルーチン関数。同名のジョブは置き換える"""
+        job = ScheduledJob(name, func, hours, minute)
+        now = datetime.datetime.now(JST)
+        latest = job.latest_before(now)
+        job.last_run = self._saved.get(name)
+        self.jobs[name] = job
+        if job.last_run is None:
+            # 初回登録時は過去の分を実行せず、直近の予定時刻を実行済みとして扱う
+            job.last_run = latest
+            self._save_state()
+            job.next_run = job.next_after(now)
+        elif job.last_run < latest:
+            # 停止中に予定時刻を過ぎていた (何回分過ぎていても1回だけ実行する)
+            print(f"[Scheduler] {name} の実行を取りこぼしていたため、すぐに実行します。")
+            job.next_run = now
+        else:
+            job.next_run = job.next_after(now)
+        self._wakeup.set()
+        return job
+
+    def remove_job(self, name: str):
+        self.jobs.pop(name, None)
+        self._wakeup.set()
+
+    # --- 実行ループ ---
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(), name="scheduler")
+        print(f"[Scheduler] 開始しました ({len(self.jobs)} 件のジョブ)")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.datetime.now(JST)
+            due = [job for job in self.jobs.values() if job.next_run <= now]
+            for job in sorted(due, key=lambda j: j.next_run):
+                await self._run_job(job)
+            if due:
+                continue
+
+            if self.jobs:
+                next_run = min(job.next_run for job in self.jobs.values())
+                delay = min((next_run - now).total_seconds(), self.MAX_SLEEP)
+            else:
+                delay = self.MAX_SLEEP
+            try:
+                # ジョブの追加・削除があれば起きて予定を計算し直す
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_job(self, job: ScheduledJob):
+        now = datetime.datetime.now(JST)
+        slot = job.latest_before(now)
+        start = time.perf_counter()
+        try:
+            await job.func()
+        except Exception as e:
+            job.errors += 1
+            print(f"[Scheduler] {job.name} の実行中にエラーが発生しました: {e}")
+        elapsed = (time.perf_counter() - start) * 1000
+        job.runs += 1
+        job.last_duration_ms = elapsed
+        job.max_duration_ms = max(job.max_duration_ms, elapsed)
+        # 失敗しても同じ予定時刻では再実行しない (次の予定時刻に回す)
+        job.last_run = slot
+        job.next_run = job.next_after(max(now, datetime.datetime.now(JST)))
+        self._save_state()
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "next_run": job.next_run.strftime("%Y-%m-%d %H:%M"),
+                "last_run": job.last_run.strftime("%Y-%m-%d %H:%M") if job.last_run else None,
+                "runs": job.runs,
+                "errors": job.errors,
+                "last_duration_ms": round(job.last_duration_ms, 1),
+                "max_duration_ms": round(job.max_duration_ms, 1),
+            }
+            for name, job in self.jobs.items()
+        }
+
+# インスタンスのエクスポート
+scheduler = Scheduler()
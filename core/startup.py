@@ -0,0 +1,30 @@
+# core/startup.py
+import time
+from contextlib import contextmanager
+
+class StartupTimer:
+    """起動処理の段階ごとの所要時間を記録する"""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []  # (段階名, ms)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name: str, ms: float):
+        self.phases.append((name, ms))
+
+    def elapsed_ms(self) -> float:
+        """プロセス起動 (このモジュールの読み込み) からの経過時間"""
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> str:
+        return " / ".join(f"{name} {ms:.0f}ms" for name, ms in self.phases)
+
+# インスタンスのエクスポート
+startup_timer = StartupTimer()
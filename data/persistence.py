@@ -0,0 +1,172 @@
+# data/persistence.py
+import atexit
+import json
+import os
+import threading
+import time
+
+class PersistenceWorker:
+    """データの書き込みをイベントループ外のスレッドでまとめて行う
+
+    呼び出し側は変更を記録するだけで、シリアライズとディスク書き込みは
+    一定間隔 (interval秒) か未書き込み件数が max_pending に達した時に
+    ワーカースレッドでまとめて実行される。
+    """
+    def __init__(self, interval: float = 1.0, max_pending: int = 500):
+        self.interval = interval
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopping = False
+
+        self._writers = {}   # テーブル名 -> writer(rows: dict)
+        self._records = {}   # テーブル名 -> {record_id: row}
+        self._files = {}     # ファイルパス -> (データ, indent)
+
+        # 計測用カウンタ
+        self.flush_count = 0
+        self.records_written = 0
+        self.files_written = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    # --- 登録・変更通知 (イベントループ側から呼ぶ) ---
+    def register_table(self, name: str, writer):
+        """writer は {record_id: row} を受け取り、ワーカースレッド上で書き込む関数"""
+        self._writers[name] = writer
+        self._records.setdefault(name, {})
+
+    def mark_dirty(self, name: str, record_id, row):
+        """レコードの最新値を記録する。row は以後変更されない値 (tupleなど) を渡すこと"""
+        with self._lock:
+            self._records[name][record_id] = row
+            pending = self._pending_locked()
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def mark_many(self, name: str, rows: dict):
+        """複数レコードを1度に記録する。同じフラッシュでまとめて書き込まれる"""
+        with self._lock:
+            self._records[name].update(rows)
+            pending = self._pending_locked()
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def write_json(self, path: str, data, indent: int | None = 4):
+        """JSONファイルの書き込みを予約する。同じパスへの書き込みは最新の1回にまとめられる"""
+        with self._lock:
+            self._files[path] = (data, indent)
+        self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending_locked()
+
+    def _pending_locked(self) -> int:
+        return sum(len(r) for r in self._records.values()) + len(self._files)
+
+    # --- スレッド制御 ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="persistence-worker", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """ワーカーを止め、残っている変更を全て書き込む"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    # --- 書き込み ---
+    def flush(self):
+        """未書き込みの変更を全て書き込む (呼び出したスレッドで実行される)"""
+        with self._flush_lock:
+            with self._lock:
+                records = {name: rows for name, rows in self._records.items() if rows}
+                files = self._files
+                self._records = {name: {} for name in self._records}
+                self._files = {}
+            if not records and not files:
+                return
+
+            start = time.perf_counter()
+            for name, rows in records.items():
+                try:
+                    self._writers[name](rows)
+                    self.records_written += len(rows)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[Persistence] {name} の書き込みに失敗しました: {e}")
+                    self._requeue(name, rows)
+            for path, (data, indent) in files.items():
+                try:
+                    self._atomic_write_json(path, data, indent)
+                    self.files_written += 1
+                except OSError as e:
+                    self.errors += 1
+                    print(f"[Persistence] {path} の書き込みに失敗しました (次回やり直します): {e}")
+                    self._requeue_file(path, data, indent)
+                except Exception as e:
+                    # JSON にできないデータはやり直しても書けないので捨てる
+                    self.errors += 1
+                    print(f"[Persistence] {path} の書き込みに失敗しました: {e}")
+
+            elapsed = (time.perf_counter() - start) * 1000
+            self.flush_count += 1
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self.total_flush_ms += elapsed
+
+    def _requeue(self, name: str, rows: dict):
+        # 失敗分は次回に回す。その間に新しい値が入っていればそちらを優先する
+        with self._lock:
+            current = self._records[name]
+            for record_id, row in rows.items():
+                current.setdefault(record_id, row)
+
+    def _requeue_file(self, path: str, data, indent):
+        # 失敗したファイルも次回に回す。その間に新しい内容が予約されていればそちらを書く
+        with self._lock:
+            self._files.setdefault(path, (data, indent))
+
+    @staticmethod
+    def _atomic_write_json(path: str, data, indent):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "flush_count": self.flush_count,
+            "records_written": self.records_written,
+            "files_written": self.files_written,
+            "errors": self.errors,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flush_count, 3) if self.flush_count else 0.0,
+        }
+
+# インスタンスのエクスポート
+persistence = PersistenceWorker()
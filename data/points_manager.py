@@ -1,48 +1,64 @@
 # data/points_manager.py
-import json
-import os
-from core.config import POINTS_FILE, LOGIN_DATA_FILE
+from core.lazy import lazy_import
+from data.user_store import user_store
+from data.rank_index import RankIndex
+
+# numpy は富豪税などの一括処理で初めて必要になるまで読み込まない
+np = lazy_import("numpy")
 
 class PointsManager:
     def __init__(self):
-        self.game_points = self._load_json(POINTS_FILE)
-        self.login_bonus_data = self._load_json(LOGIN_DATA_FILE)
-
-    def _load_json(self, path):
-        if os.path.exists(path):
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        self.users = user_store
+        self.rank_index = RankIndex(dict(self.users.points_items()))
 
     def save_all(self):
-        with open(POINTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.game_points, f, indent=4, ensure_ascii=False)
-        with open(LOGIN_DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.login_bonus_data, f, indent=4, ensure_ascii=False)
+        """全ユーザーを書き込み対象にする (通常は update_points の行単位更新を使う)"""
+        self.users.save_all()
 
     def get_points(self, user_id: int) -> int:
-        return self.game_points.get(str(user_id), 0)
+        record = self.users.get(user_id)
+        return (record.points or 0) if record else 0
 
     def update_points(self, user_id: int, amount: int):
-        uid_str = str(user_id)
-        current = self.game_points.get(uid_str, 0)
-        self.game_points[uid_str] = current + amount
-        self.save_all()
+        self.apply_deltas({user_id: amount})
+
+    def apply_deltas(self, deltas: dict) -> dict:
+        """{user_id: 増減} をまとめて適用し、{user_id: 適用後のポイント} を返す
+
+        全ての変更は同じフラッシュ・同じトランザクションで書き込まれる。
+        """
+        rows, result = {}, {}
+        for user_id, amount in deltas.items():
+            uid = int(user_id)
+            record = self.users.get_or_create(uid)
+            record.points = (record.points or 0) + amount
+            rows[uid] = record.values()
+            result[uid] = record.points
+        self.rank_index.update_many(result)
+        self.users.save_rows(rows)
+        return result
+
+    def balance_arrays(self) -> tuple:
+        """ポイントを持つ全ユーザーの (user_ids, points) を numpy 配列で返す"""
+        items = list(self.users.points_items())
+        uids = np.fromiter((uid for uid, _ in items), dtype=np.int64, count=len(items))
+        points = np.fromiter((pts for _, pts in items), dtype=np.int64, count=len(items))
+        return uids, points
 
     def get_rank(self, user_id: int, bot_id: int) -> int:
-        # Botを除外したランキング計算
-        human_players = {pid: p for pid, p in self.game_points.items() if int(pid) != bot_id}
-        if str(user_id) not in human_players:
-            return -1
-        sorted_players = sorted(human_players.items(), key=lambda item: item[1], reverse=True)
-        try:
-            rank = [p[0] for p in sorted_players].index(str(user_id)) + 1
-            return rank
-        except ValueError:
-            return -1
+        # Botを除外したランキング (未登録なら -1)
+        return self.rank_index.rank(int(user_id), exclude=bot_id)
+
+    def get_poor_rank(self, user_id: int, bot_id: int) -> int:
+        return self.rank_index.rank_from_bottom(int(user_id), exclude=bot_id)
+
+    def get_top(self, k: int, bot_id: int) -> list:
+        """ポイント上位 k 件の (user_id, points)。Botは除外"""
+        return self.rank_index.top(k, exclude=bot_id)
+
+    def get_bottom(self, k: int, bot_id: int) -> list:
+        """ポイント下位 k 件の (user_id, points)。Botは除外"""
+        return self.rank_index.bottom(k, exclude=bot_id)
 
 # インスタンスのエクスポート
-points_manager = PointsManager()
\ No newline at end of file
+points_manager = PointsManager()
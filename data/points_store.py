@@ -0,0 +1,108 @@
+# data/points_store.py
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+
+class PointsStore:
+    """ポイントとログイン情報を SQLite (WAL) に1ユーザー1行で保存するストレージ
+
+    SQL文は定数文字列のみを使うので、sqlite3 の文キャッシュにより
+    prepared statement として再利用される。
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            points INTEGER,
+            last_login TEXT,
+            consecutive_days INTEGER NOT NULL DEFAULT 0,
+            gamble_date TEXT,
+            gamble_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+    SQL_UPSERT_USER = (
+        "INSERT INTO users (user_id, points, last_login, consecutive_days, gamble_date, gamble_count) VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(user_id) DO UPDATE SET points = excluded.points, last_login = excluded.last_login, "
+        "consecutive_days = excluded.consecutive_days, gamble_date = excluded.gamble_date, gamble_count = excluded.gamble_count"
+    )
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # autocommit モード。まとめて書く時だけ明示的に BEGIN する
+        self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- 読み込み ---
+    def load_users(self):
+        """(user_id, points, last_login, consecutive_days, gamble_date, gamble_count) を順に返す"""
+        return self.conn.execute("SELECT user_id, points, last_login, consecutive_days, gamble_date, gamble_count FROM users")
+
+    # --- 書き込み (変更のあった行のみ) ---
+    def set_user(self, user_id: int, values: tuple):
+        self.conn.execute(self.SQL_UPSERT_USER, (user_id, *values))
+
+    def write_users(self, rows: dict):
+        """{user_id: (points, last_login, consecutive_days, gamble_date, gamble_count)} を1トランザクションで書き込む"""
+        with self._transaction():
+            self.conn.executemany(self.SQL_UPSERT_USER, ((uid, *values) for uid, values in rows.items()))
+
+    def backup(self, dest_path: str):
+        """オンラインバックアップ API で dest_path に複製を作る。書き込み中でも一貫した内容になる"""
+        # WAL なので別接続からの読み込みは書き込みをブロックしない
+        src = sqlite3.connect(self.db_path)
+        dest = sqlite3.connect(dest_path)
+        try:
+            src.backup(dest)
+        finally:
+            dest.close()
+            src.close()
+
+    @contextmanager
+    def _transaction(self):
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        except:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    # --- 旧JSONからの移行 ---
+    def import_json_once(self, points_path: str, login_path: str) -> bool:
+        """既存の JSON ファイルを一度だけ取り込む。取り込んだ場合は True"""
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+            return False
+
+        game_points = self._read_json(points_path)
+        login_data = self._read_json(login_path)
+        rows = {}
+        for uid in {*game_points, *login_data}:
+            info = login_data.get(uid, {})
+            g_info = info.get("gamble_info") or {}
+            rows[int(uid)] = (game_points.get(uid), info.get("last_login"), info.get("consecutive_days", 0),
+                              g_info.get("date"), g_info.get("count", 0))
+        with self._transaction():
+            self.conn.executemany(self.SQL_UPSERT_USER, ((uid, *values) for uid, values in rows.items()))
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', '1')")
+        if game_points or login_data:
+            print(f"[Points] JSON から {len(game_points)} 件のポイントと {len(login_data)} 件のログイン情報を移行しました。")
+        return True
+
+    @staticmethod
+    def _read_json(path: str) -> dict:
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
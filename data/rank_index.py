@@ -0,0 +1,74 @@
+# data/rank_index.py
+from sortedcontainers import SortedList
+
+class RankIndex:
+    """ポイント降順の順位表
+
+    (-points, user_id) を SortedList で保持し、ポイント更新のたびに
+    該当ユーザーの1要素だけを入れ替える (削除・挿入とも O(log n) で、
+    list の insort のように後ろの要素をずらさない)。順位は二分探索で O(log n)、
+    上位・下位 k 件は islice で取得でき、全件ソートは初回構築時のみ。
+    同点の場合は user_id の小さい方が上位になる。
+    """
+    def __init__(self, points: dict | None = None):
+        self._points = {int(uid): pts for uid, pts in (points or {}).items()}
+        self._keys = SortedList((-pts, uid) for uid, pts in self._points.items())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, user_id: int, points: int):
+        old = self._points.get(user_id)
+        if old is not None:
+            if old == points:
+                return
+            self._keys.remove((-old, user_id))
+        self._keys.add((-points, user_id))
+        self._points[user_id] = points
+
+    def update_many(self, items: dict):
+        """{user_id: points} をまとめて反映する。件数が多い場合は作り直した方が速い"""
+        changed = {uid: pts for uid, pts in items.items() if self._points.get(uid) != pts}
+        if len(changed) * 8 < len(self._keys):
+            for uid, pts in changed.items():
+                self.update(uid, pts)
+            return
+        self._points.update(changed)
+        self._keys = SortedList((-pts, uid) for uid, pts in self._points.items())
+
+    def _position(self, user_id: int) -> int:
+        """降順リスト上の位置 (0始まり)。未登録なら -1"""
+        pts = self._points.get(user_id)
+        if pts is None:
+            return -1
+        return self._keys.bisect_left((-pts, user_id))
+
+    def rank(self, user_id: int, exclude: int | None = None) -> int:
+        """富豪ランク (1始まり)。exclude (Bot ID) は順位計算から除外する。未登録なら -1"""
+        if user_id == exclude:
+            return -1
+        pos = self._position(user_id)
+        if pos == -1:
+            return -1
+        if exclude is not None and 0 <= self._position(exclude) < pos:
+            pos -= 1
+        return pos + 1
+
+    def rank_from_bottom(self, user_id: int, exclude: int | None = None) -> int:
+        """ポイントが少ない順での順位 (1始まり)。未登録なら -1"""
+        rank = self.rank(user_id, exclude)
+        if rank == -1:
+            return -1
+        total = len(self._keys) - (1 if exclude is not None and exclude in self._points else 0)
+        return total - rank + 1
+
+    def top(self, k: int, exclude: int | None = None) -> list:
+        """ポイントの多い順に k 件の (user_id, points) を返す"""
+        return [(uid, -neg) for neg, uid in self._keys.islice(0, k + 1) if uid != exclude][:k]
+
+    def bottom(self, k: int, exclude: int | None = None) -> list:
+        """ポイントの少ない順に k 件の (user_id, points) を返す"""
+        if not k:
+            return []
+        tail = self._keys.islice(max(0, len(self._keys) - (k + 1)), reverse=True)
+        return [(uid, -neg) for neg, uid in tail if uid != exclude][:k]
@@ -3,6 +3,7 @@ import json
 import os
 from core.config import SETTINGS_FILE
 from core.state import state
+from data.persistence import persistence
 
 class SettingsManager:
     @staticmethod
@@ -23,13 +24,8 @@ class SettingsManager:
 
     @staticmethod
     def save_settings():
-        """現在のstate.allowed_channelsをJSONファイルに保存する"""
-        try:
-            data = {"allowed_channels": list(state.allowed_channels)}
-            with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            print("[Settings] 設定を JSON に保存しました。")
-        except Exception as e:
-            print(f"[Settings] 設定の保存中にエラーが発生しました: {e}")
+        """現在のstate.allowed_channelsをJSONファイルへ保存する (書き込みはワーカースレッドで行われる)"""
+        data = {"allowed_channels": list(state.allowed_channels)}
+        persistence.write_json(SETTINGS_FILE, data)
 
 settings_manager = SettingsManager()
\ No newline at end of file
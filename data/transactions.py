@@ -0,0 +1,92 @@
+# data/transactions.py
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from data.points_manager import points_manager
+
+class UserLockTable:
+    """ユーザーごとの asyncio.Lock を上限付きで保持する
+
+    使われていない (保持・待機中のタスクがない) ロックから古い順に捨てるので、
+    ユーザー数が増えてもロックの数は max_locks 程度に収まる。
+    """
+    def __init__(self, max_locks: int = 1024):
+        self.max_locks = max_locks
+        self._entries = OrderedDict()  # user_id -> [lock, 使用中のタスク数]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _checkout(self, user_id: int):
+        entry = self._entries.pop(user_id, None) or [asyncio.Lock(), 0]
+        entry[1] += 1
+        self._entries[user_id] = entry
+        self._evict()
+        return entry
+
+    def _evict(self):
+        if len(self._entries) <= self.max_locks:
+            return
+        for uid in [uid for uid, (_, users) in self._entries.items() if users == 0]:
+            del self._entries[uid]
+            if len(self._entries) <= self.max_locks:
+                break
+
+    @asynccontextmanager
+    async def hold(self, *user_ids: int):
+        """指定ユーザー全員のロックを取得する。デッドロック防止のため常にID順で取る"""
+        held = []
+        try:
+            for uid in sorted({int(u) for u in user_ids}):
+                entry = self._checkout(uid)
+                try:
+                    await entry[0].acquire()
+                except:
+                    entry[1] -= 1
+                    raise
+                held.append(entry)
+            yield
+        finally:
+            for entry in reversed(held):
+                entry[0].release()
+                entry[1] -= 1
+
+class PointsTransactions:
+    """ポイントの残高確認と増減をユーザー単位のロック内で行う"""
+    def __init__(self, manager, max_locks: int = 1024):
+        self.manager = manager
+        self.locks = UserLockTable(max_locks)
+
+    def lock(self, *user_ids: int):
+        """残高を読んでから書き込むまでの間、他のコマンドの変更を待たせる"""
+        return self.locks.hold(*user_ids)
+
+    async def try_debit(self, user_id: int, amount: int) -> bool:
+        """残高が amount 以上なら引き落として True を返す"""
+        async with self.lock(user_id):
+            if self.manager.get_points(user_id) < amount:
+                return False
+            self.manager.apply_deltas({user_id: -amount})
+            return True
+
+    async def debit_many(self, amounts: dict) -> list:
+        """全員の残高が足りる場合のみまとめて引き落とす。足りないユーザーIDのリストを返す (空なら成功)"""
+        async with self.lock(*amounts):
+            short = [uid for uid, amount in amounts.items() if self.manager.get_points(uid) < amount]
+            if not short:
+                self.manager.apply_deltas({uid: -amount for uid, amount in amounts.items()})
+            return short
+
+    async def transfer(self, sender_id: int, receiver_id: int, amount: int, fee: int = 0) -> bool:
+        """sender から amount + fee を引き、receiver に amount を渡す。残高不足なら False"""
+        async with self.lock(sender_id, receiver_id):
+            if self.manager.get_points(sender_id) < amount + fee:
+                return False
+            # 自分宛ての場合に受け取り側で送金分を上書きしないよう、同じIDの増減は足し合わせる
+            deltas = {int(sender_id): -(amount + fee)}
+            deltas[int(receiver_id)] = deltas.get(int(receiver_id), 0) + amount
+            self.manager.apply_deltas(deltas)
+            return True
+
+# インスタンスのエクスポート
+points_tx = PointsTransactions(points_manager)
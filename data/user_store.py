@@ -0,0 +1,113 @@
+# data/user_store.py
+import datetime
+import glob
+import os
+import sys
+import time
+from core.config import POINTS_FILE, LOGIN_DATA_FILE, POINTS_DB_FILE, BACKUP_DIR, JST
+from data.points_store import PointsStore
+from data.persistence import persistence
+
+class UserRecord:
+    """1ユーザー分のデータ。points が None のユーザーはランキング対象外 (ポイント未取得)"""
+    __slots__ = ("points", "last_login", "consecutive_days", "gamble_date", "gamble_count")
+
+    def __init__(self, points=None, last_login=None, consecutive_days=0, gamble_date=None, gamble_count=0):
+        self.points = points
+        self.last_login = last_login
+        self.consecutive_days = consecutive_days
+        self.gamble_date = gamble_date
+        self.gamble_count = gamble_count
+
+    def values(self) -> tuple:
+        return (self.points, self.last_login, self.consecutive_days, self.gamble_date, self.gamble_count)
+
+class UserStore:
+    """ポイント・ログイン・ギャンブル回数を1か所で持つユーザーレコードの置き場
+
+    キーは int のユーザーID。日付文字列は intern して全ユーザーで共有する。
+    """
+    def __init__(self, db_path: str = POINTS_DB_FILE):
+        start = time.perf_counter()
+        self.db = PointsStore(db_path)
+        # 旧 JSON (game_points.json / login_bonus_data.json) は初回のみ取り込む
+        self.db.import_json_once(POINTS_FILE, LOGIN_DATA_FILE)
+        intern = self._intern
+        self.records = {
+            uid: UserRecord(pts, intern(last_login), days, intern(g_date), g_count)
+            for uid, pts, last_login, days, g_date, g_count in self.db.load_users()
+        }
+        self.load_ms = (time.perf_counter() - start) * 1000
+        # 書き込みは persistence のワーカースレッドでまとめて行う
+        persistence.register_table("users", self.db.write_users)
+
+    @staticmethod
+    def _intern(value):
+        return sys.intern(value) if value is not None else None
+
+    def get(self, user_id: int) -> UserRecord | None:
+        return self.records.get(int(user_id))
+
+    def get_or_create(self, user_id: int) -> UserRecord:
+        uid = int(user_id)
+        record = self.records.get(uid)
+        if record is None:
+            record = self.records[uid] = UserRecord()
+        return record
+
+    def set_login(self, user_id: int, date_str: str, consecutive_days: int):
+        record = self.get_or_create(user_id)
+        record.last_login = sys.intern(date_str)
+        record.consecutive_days = consecutive_days
+        self.save(user_id)
+
+    def set_gamble(self, user_id: int, date_str: str, count: int):
+        record = self.get_or_create(user_id)
+        record.gamble_date = sys.intern(date_str)
+        record.gamble_count = count
+        self.save(user_id)
+
+    def save(self, user_id: int):
+        """指定ユーザーの現在の値を書き込み対象にする"""
+        uid = int(user_id)
+        persistence.mark_dirty("users", uid, self.records[uid].values())
+
+    def save_rows(self, rows: dict):
+        """{user_id: UserRecord.values()} をまとめて書き込み対象にする"""
+        persistence.mark_many("users", rows)
+
+    def save_all(self):
+        persistence.mark_many("users", {uid: r.values() for uid, r in self.records.items()})
+
+    def snapshot(self, backup_dir: str = BACKUP_DIR, keep: int = 8) -> str:
+        """未書き込み分を反映してから DB のスナップショットを保存し、古いものは keep 件まで削除する
+
+        ブロッキング処理なのでイベントループからは asyncio.to_thread で呼ぶこと。
+        """
+        os.makedirs(backup_dir, exist_ok=True)
+        persistence.flush()
+        stamp = datetime.datetime.now(JST).strftime("%Y%m%d-%H%M")
+        dest_path = os.path.join(backup_dir, f"game_points-{stamp}.db")
+        self.db.backup(dest_path)
+        for old in sorted(glob.glob(os.path.join(backup_dir, "game_points-*.db")))[:-keep]:
+            os.remove(old)
+        return dest_path
+
+    def points_items(self):
+        """ポイントを持つユーザーの (user_id, points) を返す"""
+        return ((uid, r.points) for uid, r in self.records.items() if r.points is not None)
+
+    def memory_report(self) -> dict:
+        """レコード本体・辞書・キーのおおよそのメモリ使用量"""
+        count = len(self.records)
+        total = sys.getsizeof(self.records)
+        total += sum(sys.getsizeof(uid) + sys.getsizeof(r) for uid, r in self.records.items())
+        return {
+            "users": count,
+            "total_bytes": total,
+            "bytes_per_user": round(total / count, 1) if count else 0.0,
+            "load_ms": round(self.load_ms, 2),
+        }
+
+# インスタンスのエクスポート
+user_store = UserStore()
@@ -1,11 +1,26 @@
 # data/weather_cache.py
+import asyncio
 import json
 import os
-import aiohttp
+import time
 import xml.etree.ElementTree as ET
-from core.config import CITY_CODES_FILE, PRIMARY_AREA_XML_URL
+import aiohttp
+from core.config import CITY_CODES_FILE, CITY_CODES_META_FILE, PRIMARY_AREA_XML_URL
+from core.state import state
+from data.persistence import persistence
 
 class WeatherCache:
+    """天気予報用の都市コード一覧 (地名 -> 都市ID)
+
+    起動時はローカルのスナップショットをすぐに使い、最新化は裏で行う
+    (stale-while-revalidate)。更新確認は ETag / Last-Modified を使った
+    条件付きリクエストで行い、変更があった時だけ XML を読み直す。
+    """
+    def __init__(self):
+        self._task = None
+        self.last_status = None    # 直近の更新結果 ("updated" / "not_modified" / "error")
+        self.last_refresh_ms = 0.0
+
     @staticmethod
     def load_local():
         """ローカルのJSONから都市コードを読み込む"""
@@ -18,29 +33,92 @@ class WeatherCache:
         return {}
 
     @staticmethod
-    async def update_from_api():
-        """つくもAPIのXMLから最新の都市情報を取得して保存する"""
-        temp_map = {}
+    def _load_meta() -> dict:
+        if os.path.exists(CITY_CODES_META_FILE):
+            try:
+                with open(CITY_CODES_META_FILE, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+
+    def load_into_state(self) -> int:
+        """スナップショットを state に読み込み、件数を返す"""
+        state.weather_city_id_map = self.load_local()
+        return len(state.weather_city_id_map)
+
+    async def update_from_api(self) -> bool:
+        """つくもAPIのXMLに変更があれば取り直して state を差し替える。差し替えた場合は True"""
+        start = time.perf_counter()
+        headers = {}
+        # 手元に一覧がある時だけ条件付きリクエストにする (304 でも困らないように)
+        meta = self._load_meta() if state.weather_city_id_map else {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
         try:
             async with aiohttp.ClientSession() as session:
-                async with session.get(PRIMARY_AREA_XML_URL) as response:
-                    if response.status == 200:
-                        xml_text = await response.text()
-                        root = ET.fromstring(xml_text)
-                        for pref in root.findall('.//pref'):
-                            pref_title = pref.get('title')
-                            for city in pref.findall('.//city'):
-                                city_title = city.get('title')
-                                city_id = city.get('id')
-                                if city_title and city_id:
-                                    temp_map[city_title] = city_id
-                                    if pref_title and pref_title != city_title:
-                                        temp_map[f"{pref_title}{city_title}"] = city_id
-                        
-                        # ファイルに保存
-                        with open(CITY_CODES_FILE, 'w', encoding='utf-8') as f:
-                            json.dump(temp_map, f, ensure_ascii=False, indent=2)
-                        return temp_map
+                async with session.get(PRIMARY_AREA_XML_URL, headers=headers) as response:
+                    if response.status == 304:
+                        self.last_status = "not_modified"
+                        return False
+                    if response.status != 200:
+                        self.last_status = "error"
+                        print(f"[Weather] 都市コードの取得に失敗しました: HTTP {response.status}")
+                        return False
+                    # 受信したそばから XML を読み進める
+                    parser = ET.XMLPullParser(events=("start",))
+                    temp_map, pref_title = {}, None
+                    async for chunk in response.content.iter_chunked(16 * 1024):
+                        parser.feed(chunk)
+                        pref_title = self._collect(parser, temp_map, pref_title)
+                    parser.close()
+                    self._collect(parser, temp_map, pref_title)
+                    new_meta = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
         except Exception as e:
-            print(f"Weather Update Error: {e}")
-        return temp_map
\ No newline at end of file
+            self.last_status = "error"
+            print(f"[Weather] 都市コードの更新に失敗しました: {e}")
+            return False
+        finally:
+            self.last_refresh_ms = (time.perf_counter() - start) * 1000
+
+        if not temp_map:
+            self.last_status = "error"
+            return False
+        # 読み込みが終わってから参照を1回で差し替える (途中の状態は見せない)
+        state.weather_city_id_map = temp_map
+        persistence.write_json(CITY_CODES_FILE, temp_map, indent=2)
+        persistence.write_json(CITY_CODES_META_FILE, new_meta)
+        self.last_status = "updated"
+        return True
+
+    @staticmethod
+    def _collect(parser, temp_map: dict, pref_title):
+        """パース済みのイベントから pref / city を取り出して temp_map に追加する"""
+        for _, elem in parser.read_events():
+            if elem.tag == "pref":
+                pref_title = elem.get("title")
+            elif elem.tag == "city":
+                city_title, city_id = elem.get("title"), elem.get("id")
+                if city_title and city_id:
+                    temp_map[city_title] = city_id
+                    # 「東京都東京」のように県名＋市名でも引けるようにする
+                    if pref_title and pref_title != city_title:
+                        temp_map[f"{pref_title}{city_title}"] = city_id
+        return pref_title
+
+    def refresh_in_background(self):
+        """起動を待たせずに最新化を始める"""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._refresh_and_log(), name="weather-city-codes")
+
+    async def _refresh_and_log(self):
+        updated = await self.update_from_api()
+        print(f"[Weather] 都市コードの確認: {self.last_status} ({len(state.weather_city_id_map)} 件, {self.last_refresh_ms:.0f}ms)")
+        return updated
+
+# インスタンスのエクスポート
+weather_cache = WeatherCache()
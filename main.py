@@ -1,25 +1,46 @@
 # main.py
 import sys
 import asyncio
-from bot import bot
 from core.config import DISCORD_BOT_TOKEN
-from core.state import state
-from data.settings_manager import settings_manager
-from data.points_manager import points_manager
-from services.network.weather_api import fetch_weather_city_codes
+from core.startup import startup_timer
 
 async def start_up():
     print("[System]startup")
-    
-    settings_manager.load_settings()
+    # 画像処理ワーカー (spawn) はこのファイルを __mp_main__ として読み込み直すので、
+    # Bot 本体やユーザーデータの読み込みはここで行い、ワーカーには持ち込まない
+    from bot import bot
+    from data.settings_manager import settings_manager
+    from data.points_manager import points_manager
+    from data.persistence import persistence
+    from core.scheduler import scheduler
+    from data.weather_cache import weather_cache
+    from services.image.job_service import image_jobs
 
-    p_count = len(points_manager.game_points)
+    persistence.start()
     
-    state.weather_city_id_map = await fetch_weather_city_codes()
+    # モジュール読み込み (ユーザーデータのロードを含む) までの時間
+    startup_timer.record("imports", startup_timer.elapsed_ms())
+
+    with startup_timer.phase("settings"):
+        settings_manager.load_settings()
+
+    print(f"[Points] ユーザーデータ: {points_manager.users.memory_report()}")
     
+    # 都市コードは手元のスナップショットを使い、最新化はログインと並行して行う
+    with startup_timer.phase("city_codes"):
+        count = weather_cache.load_into_state()
+    print(f"[Startup] 都市コード (ローカル) {count} 件")
+    weather_cache.refresh_in_background()
     
-    async with bot:
-        await bot.start(DISCORD_BOT_TOKEN)
+    try:
+        async with bot:
+            await bot.start(DISCORD_BOT_TOKEN)
+    finally:
+        scheduler.stop()
+        image_jobs.shutdown()
+        # 終了時に未書き込みのデータを必ず保存する
+        persistence.stop()
+        print(f"[Persistence] 終了時フラッシュ完了: {persistence.stats()}")
 
 if __name__ == "__main__":
     if not DISCORD_BOT_TOKEN:
@@ -4,69 +4,144 @@ import math
 import os
 import asyncio
 import subprocess
-from PIL import Image
-from core.config import MAX_FILE_SIZE, WAIFU2X_PATH
+from PIL import Image, ImageSequence
+from core.config import MAX_FILE_SIZE, MIN_IMAGE_DIMENSION, WAIFU2X_PATH
+from services.image.gif_encoder import GifWriter, build_palette, PALETTE_SAMPLE_FRAMES
 
-async def resize_if_too_large(image_fp: io.BytesIO, target_format: str) -> tuple[io.BytesIO, bool]:
-    """Pillowのバージョンに依存しない形式に修正"""
-    image_fp.seek(0, io.SEEK_END)
-    current_size = image_fp.tell()
+# サイズ予測用の縮小版 (プローブ) の画素数
+PROBE_PIXELS = 512 * 512
+# 予測の誤差を見込んで上限より少し小さいサイズを狙う
+TARGET_MARGIN = 0.92
+CORRECTION_MARGIN = 0.85
+
+def _gif_frames(image_fp: io.BytesIO):
+    """GIF のフレームを1枚ずつ (RGBA, 表示時間) で返す。前のフレームとの重ね合わせ (disposal) は PIL が反映する"""
     image_fp.seek(0)
-    
+    with Image.open(image_fp) as img:
+        for frame in ImageSequence.Iterator(img):
+            yield frame.convert("RGBA"), frame.info.get('duration', 100)
+
+def _decimate(frames, keep_every: int):
+    """keep_every 枚ごとに1枚だけ残し、間引いたフレームの表示時間は残したフレームに足す"""
+    kept, total = None, 0
+    for index, (frame, duration) in enumerate(frames):
+        if index % keep_every == 0:
+            if kept is not None:
+                yield kept, total
+            kept, total = frame, 0
+        total += duration
+    if kept is not None:
+        yield kept, total
+
+def _shrink(img: Image.Image, scale: float, probe: bool) -> Image.Image:
+    # プローブはサイズの見積もりにしか使わないので、整数分の1の平均縮小 (reduce) で済ませる
+    if probe:
+        return img.reduce(max(1, round(1 / scale)))
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+def _encode_gif_scaled(image_fp: io.BytesIO, palette: Image.Image | None, loop: int, scale: float, probe: bool = False, keep_every: int = 1) -> io.BytesIO:
+    """GIF を1フレームずつ読み、縮小して書き出す (フレームをまとめてメモリに載せない)"""
+    output_fp = io.BytesIO()
+    writer = GifWriter(output_fp, palette, loop)
+    for frame, duration in _decimate(_gif_frames(image_fp), keep_every):
+        writer.add(_shrink(frame, scale, probe), duration)
+    writer.close()
+    output_fp.seek(0)
+    return output_fp
+
+def _encode_still_scaled(source: Image.Image, target_format: str, scale: float, probe: bool = False) -> io.BytesIO:
+    """元画像を scale 倍に縮小してエンコードする (毎回元画像から作り直す)"""
+    output_fp = io.BytesIO()
+    resized_img = _shrink(source, scale, probe)
+    params = {'optimize': True}
+    if target_format == 'JPEG': params['quality'] = 85
+    elif target_format == 'PNG': params['compress_level'] = 7
+    resized_img.save(output_fp, format=target_format, **params)
+    return output_fp
+
+def _size_of(fp: io.BytesIO) -> int:
+    fp.seek(0, io.SEEK_END)
+    size = fp.tell()
+    fp.seek(0)
+    return size
+
+def _exponent(scale_a: float, size_a: int, scale_b: float, size_b: int) -> float:
+    """2点 (縮小率, サイズ) に size = c * scale^k を当てはめた時の k"""
+    if size_a <= 0 or size_b <= 0 or scale_a == scale_b:
+        return 2.0
+    k = math.log(size_a / size_b) / math.log(scale_a / scale_b)
+    # 縮小しても小さくならない (k が極端に小さい) 場合は画素数に比例するとみなす
+    return k if k > 0.5 else 2.0
+
+def solve_scale(scale_a: float, size_a: int, scale_b: float, size_b: int, target: float) -> float:
+    """2点 (縮小率, サイズ) から size = c * scale^k を当てはめ、target になる縮小率を求める"""
+    return scale_b * (target / max(size_b, 1)) ** (1 / _exponent(scale_a, size_a, scale_b, size_b))
+
+def predict_size(scale_a: float, size_a: int, scale_b: float, size_b: int, scale: float) -> float:
+    """同じ当てはめで、scale の時のサイズを予測する"""
+    return size_b * (scale / scale_b) ** _exponent(scale_a, size_a, scale_b, size_b)
+
+def resize_if_too_large(image_fp: io.BytesIO, target_format: str) -> tuple[io.BytesIO, bool]:
+    """MAX_FILE_SIZE を超える画像を、収まる大きさまで縮小して再エンコードする
+
+    縮小版 (プローブ) のエンコード結果と元のサイズから、縮小率とファイルサイズの
+    関係を size = c * scale^k として推定し、1回で目標サイズに収まる縮小率を求める。
+    外れた場合の補正は1回まで。縮小は常に元画像から行う。
+    GIF はフレームを1枚ずつ読んで書き出し、短辺が MIN_IMAGE_DIMENSION になるまで
+    縮めても収まらない場合はフレームを間引く (表示時間は残したフレームにまとめる)。
+    """
+    current_size = _size_of(image_fp)
     if current_size <= MAX_FILE_SIZE:
         return image_fp, False
 
-    current_fp = image_fp
-    resized = False
-    min_dim = 300
-    
-    for iteration in range(7):
-        current_fp.seek(0)
-        img = Image.open(current_fp)
-        w, h = img.width, img.height
-        if min(w, h) <= min_dim: break
-
-        current_fp.seek(0, io.SEEK_END)
-        iter_size = current_fp.tell()
-        
-        factor = 0.85
-        if iteration == 0:
-            factor = max(0.1, min(math.sqrt(MAX_FILE_SIZE / iter_size) * 0.9, 0.95))
-        
-        new_w, new_h = int(w * factor), int(h * factor)
-        output_fp = io.BytesIO()
-
-        if target_format.upper() == 'GIF':
-            frames = []
-            durations = []
-            loop = img.info.get('loop', 0)
-            try:
-                while True:
-                    frame = img.copy().convert("RGBA")
-                    # Image.LANCZOS に変更
-                    frame.thumbnail((new_w, new_h), Image.LANCZOS)
-                    frames.append(frame)
-                    durations.append(img.info.get('duration', 100))
-                    img.seek(img.tell() + 1)
-            except EOFError: pass
-            frames[0].save(output_fp, format="GIF", save_all=True, append_images=frames[1:], duration=durations, loop=loop, disposal=2, optimize=True)
-        else:
-            resized_img = img.copy()
-            # Image.LANCZOS に変更
-            resized_img.thumbnail((new_w, new_h), Image.LANCZOS)
-            params = {'optimize': True}
-            if target_format.upper() == 'JPEG': params['quality'] = 85
-            elif target_format.upper() == 'PNG': params['compress_level'] = 7
-            resized_img.save(output_fp, format=target_format.upper(), **params)
-
-        output_fp.seek(0, io.SEEK_END)
-        if output_fp.tell() <= MAX_FILE_SIZE:
-            return output_fp, True
-        
-        current_fp = output_fp
-        resized = True
+    target_format = target_format.upper()
+    is_gif = target_format == 'GIF'
+    image_fp.seek(0)
+    source = Image.open(image_fp)
+    w, h = source.size
+    if min(w, h) <= MIN_IMAGE_DIMENSION:
+        return image_fp, False
+    # 短辺が MIN_IMAGE_DIMENSION を下回るほどは縮小しない
+    min_scale = MIN_IMAGE_DIMENSION / min(w, h)
 
-    return current_fp, resized
+    if is_gif:
+        frame_count, loop = getattr(source, "n_frames", 1), source.info.get('loop', 0)
+        # パレットは元の GIF から1回だけ作り、縮小を試すたびに使い回す (None ならフレームごとのパレット)
+        step = max(1, frame_count // PALETTE_SAMPLE_FRAMES)
+        palette = build_palette((frame for index, (frame, _) in enumerate(_gif_frames(image_fp)) if index % step == 0), -(-frame_count // step))
+        encode = lambda scale, probe=False, keep_every=1: _encode_gif_scaled(image_fp, palette, loop, scale, probe, keep_every)
+    else:
+        frame_count = 1
+        source.load()
+        encode = lambda scale, probe=False, keep_every=1: _encode_still_scaled(source, target_format, scale, probe)
+
+    target = MAX_FILE_SIZE * TARGET_MARGIN
+    probe_scale = 1 / max(2, math.ceil(math.sqrt(w * h / PROBE_PIXELS)))
+    probe_size = _size_of(encode(probe_scale, probe=True))
+    scale = solve_scale(1.0, current_size, probe_scale, probe_size, target)
+    keep_every = 1
+    if scale < min_scale and frame_count > 1:
+        # 縮小だけでは収まらない分はフレームを間引く (サイズはフレーム数にほぼ比例する)
+        predicted = predict_size(1.0, current_size, probe_scale, probe_size, min_scale)
+        keep_every = min(frame_count, math.ceil(predicted / target))
+    scale = min(max(scale, min_scale), 0.95)
+
+    output_fp = encode(scale, keep_every=keep_every)
+    output_size = _size_of(output_fp)
+    if output_size <= MAX_FILE_SIZE:
+        return output_fp, True
+
+    # 補正 (1回のみ): 余裕を大きめに取る
+    if scale <= min_scale:
+        if keep_every >= frame_count:
+            return output_fp, True
+        keep_every = min(frame_count, math.ceil(keep_every * output_size / (MAX_FILE_SIZE * CORRECTION_MARGIN)))
+        return encode(scale, keep_every=keep_every), True
+    # 実測した点とプローブから推定し直す
+    corrected = solve_scale(probe_scale, probe_size, scale, output_size, MAX_FILE_SIZE * CORRECTION_MARGIN)
+    corrected = max(min(corrected, scale * 0.95), min_scale)
+    return encode(corrected, keep_every=keep_every), True
 
 async def run_waifu2x(input_path: str, output_path: str) -> bool:
     if not WAIFU2X_PATH or not os.path.exists(WAIFU2X_PATH):
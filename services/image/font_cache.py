@@ -0,0 +1,173 @@
+# services/image/font_cache.py
+"""文字画像コマンド用のフォント・グリフのキャッシュ
+
+フォントファイルは1回だけ読み込んでメモリに置き、(パス, サイズ) ごとの FreeTypeFont を
+使い回す。1文字ずつ並べる生成処理のために、文字ごとの幅・外接矩形と
+ラスタライズ済みのマスクも LRU で持ち、描画はマスクの貼り付けだけにする。
+マスクは描き始め位置の小数部分 (FreeType と同じ 1/64 px 単位) ごとに持つので、
+結果は ImageDraw.text で1文字ずつ描いた場合と画素単位で同じになる。
+キャッシュは image_jobs のワーカープロセスごとに持つ。
+"""
+import io
+import math
+import os
+from collections import OrderedDict
+from PIL import ImageColor, ImageDraw, ImageFont
+
+# グリフのマスクに使うメモリの上限 (440px の文字でも数百文字分)
+GLYPH_CACHE_BYTES = 64 * 1024 * 1024
+METRICS_CACHE_SIZE = 8192
+
+class CachedFont:
+    """FontCache.get が返すフォント。font は通常の FreeTypeFont (getbbox などに使う)"""
+    def __init__(self, cache: "FontCache", path: str, size: int, font: ImageFont.FreeTypeFont):
+        self.cache = cache
+        self.path = path
+        self.size = size
+        self.font = font
+
+    def metrics(self, char: str) -> tuple[float, tuple]:
+        """(getlength, getbbox) の結果"""
+        return self.cache._metrics_of(self, char)
+
+    def spaced_width(self, text: str, spacing: float) -> int:
+        """1文字ずつ spacing を空けて並べた時の幅"""
+        return int(sum(self.metrics(c)[0] for c in text) + max(0, len(text) - 1) * spacing)
+
+    def draw_char(self, draw: ImageDraw.ImageDraw, xy: tuple, char: str, ink: int):
+        """draw.text(xy, char, font=self.font, fill=...) と同じ結果をキャッシュしたマスクで描く"""
+        x, y = int(xy[0]), int(xy[1])
+        start = (math.modf(xy[0])[0], math.modf(xy[1])[0])
+        mask, offset = self.cache._glyph_of(self, char, start)
+        draw.draw.draw_bitmap((x + offset[0], y + offset[1]), mask, ink)
+
+    def draw_spaced(self, draw: ImageDraw.ImageDraw, xy: tuple, text: str, spacing: float, fill) -> float:
+        """各文字の左端を揃えて spacing ずつ空けて描く。描き終わりの x を返す"""
+        ink = ink_of(draw, fill)
+        curr_x, y = xy
+        for char in text:
+            length, c_bbox = self.metrics(char)
+            self.draw_char(draw, (curr_x - c_bbox[0], y), char, ink)
+            curr_x += length + spacing
+        return curr_x
+
+def ink_of(draw: ImageDraw.ImageDraw, fill) -> int:
+    """ImageDraw が描画に使う色の値 (draw.text に fill を渡した時と同じ)"""
+    if isinstance(fill, str):
+        fill = ImageColor.getcolor(fill, draw.mode)
+    return draw.draw.draw_ink(fill)
+
+class FontCache:
+    def __init__(self, max_glyph_bytes: int = GLYPH_CACHE_BYTES, max_metrics: int = METRICS_CACHE_SIZE):
+        self.max_glyph_bytes = max_glyph_bytes
+        self.max_metrics = max_metrics
+        self._files = {}                # パス -> (更新時刻, フォントファイルの中身)
+        self._fonts = {}                # (パス, サイズ) -> CachedFont
+        self._metrics = OrderedDict()   # (パス, サイズ, 文字) -> (幅, 外接矩形)
+        self._glyphs = OrderedDict()    # (パス, サイズ, 文字, 小数部分x, 小数部分y) -> (マスク, オフセット)
+        self.glyph_bytes = 0
+        self.font_hits = 0
+        self.font_misses = 0
+        self.file_loads = 0
+        self.metric_hits = 0
+        self.metric_misses = 0
+        self.glyph_hits = 0
+        self.glyph_misses = 0
+        self.glyph_evictions = 0
+        self.renders = 0
+        self.total_render_ms = 0.0
+        self.max_render_ms = 0.0
+
+    def _drop(self, path: str):
+        """フォントファイルが差し替えられたので、そのフォントのものを全部捨てる"""
+        self._files.pop(path, None)
+        for key in [k for k in self._fonts if k[0] == path]:
+            del self._fonts[key]
+        for key in [k for k in self._metrics if k[0] == path]:
+            del self._metrics[key]
+        for key in [k for k in self._glyphs if k[0] == path]:
+            mask, _ = self._glyphs.pop(key)
+            self.glyph_bytes -= mask.size[0] * mask.size[1]
+
+    def get(self, path: str, size: int) -> CachedFont:
+        mtime_ns = os.stat(path).st_mtime_ns
+        cached_file = self._files.get(path)
+        if cached_file is not None and cached_file[0] != mtime_ns:
+            self._drop(path)
+            cached_file = None
+        if cached_file is None:
+            with open(path, "rb") as f:
+                cached_file = (mtime_ns, f.read())
+            self._files[path] = cached_file
+            self.file_loads += 1
+
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            self.font_hits += 1
+            return font
+        self.font_misses += 1
+        font = CachedFont(self, path, size, ImageFont.truetype(io.BytesIO(cached_file[1]), size))
+        self._fonts[key] = font
+        return font
+
+    def _metrics_of(self, font: CachedFont, char: str) -> tuple[float, tuple]:
+        key = (font.path, font.size, char)
+        metrics = self._metrics.get(key)
+        if metrics is not None:
+            self.metric_hits += 1
+            self._metrics.move_to_end(key)
+            return metrics
+        self.metric_misses += 1
+        metrics = (font.font.getlength(char), font.font.getbbox(char))
+        self._metrics[key] = metrics
+        if len(self._metrics) > self.max_metrics:
+            self._metrics.popitem(last=False)
+        return metrics
+
+    def _glyph_of(self, font: CachedFont, char: str, start: tuple):
+        # 1文字ずつ並べる位置は getlength (1/64 px 単位) と整数の和なので、小数部分は高々64通り
+        key = (font.path, font.size, char, round(start[0] * 64), round(start[1] * 64))
+        glyph = self._glyphs.get(key)
+        if glyph is not None:
+            self.glyph_hits += 1
+            self._glyphs.move_to_end(key)
+            return glyph
+        self.glyph_misses += 1
+        glyph = font.font.getmask2(char, "L", start=start)
+        self._glyphs[key] = glyph
+        self.glyph_bytes += glyph[0].size[0] * glyph[0].size[1]
+        while self.glyph_bytes > self.max_glyph_bytes and len(self._glyphs) > 1:
+            mask, _ = self._glyphs.popitem(last=False)[1]
+            self.glyph_bytes -= mask.size[0] * mask.size[1]
+            self.glyph_evictions += 1
+        return glyph
+
+    def record_render(self, elapsed_ms: float):
+        self.renders += 1
+        self.total_render_ms += elapsed_ms
+        self.max_render_ms = max(self.max_render_ms, elapsed_ms)
+
+    def stats(self) -> dict:
+        glyph_lookups = self.glyph_hits + self.glyph_misses
+        return {
+            "fonts": len(self._fonts),
+            "font_hits": self.font_hits,
+            "font_misses": self.font_misses,
+            "file_loads": self.file_loads,
+            "metric_hits": self.metric_hits,
+            "metric_misses": self.metric_misses,
+            "glyphs": len(self._glyphs),
+            "glyph_mb": round(self.glyph_bytes / (1024 * 1024), 1),
+            "glyph_hits": self.glyph_hits,
+            "glyph_misses": self.glyph_misses,
+            "glyph_hit_rate": round(self.glyph_hits / glyph_lookups, 3) if glyph_lookups else 0.0,
+            "glyph_evictions": self.glyph_evictions,
+            "renders": self.renders,
+            "total_render_ms": round(self.total_render_ms, 1),
+            "avg_render_ms": round(self.total_render_ms / self.renders, 1) if self.renders else 0.0,
+            "max_render_ms": round(self.max_render_ms, 1),
+        }
+
+# インスタンスのエクスポート
+font_cache = FontCache()
@@ -2,25 +2,34 @@
 import io
 import numpy as np
 from PIL import Image
+from services.image.gif_encoder import encode_gif
 
-def create_gaming_gif(img_bytes: bytes, duration_ms: int = 50, max_size: tuple = (256, 256)) -> io.BytesIO | None:
+def hue_cycle_frames(img: Image.Image, frame_count: int = 36) -> list[Image.Image]:
+    """色相を1周させた frame_count 枚の RGBA フレーム
+
+    HSV への変換は1回だけ行い、(frame_count, H, W) の色相の配列をまとめて作る。
+    RGB への戻しは全フレームを縦に並べた1枚の画像として1回で行い、最後に切り分ける。
+    透過は元画像のものをそのまま使う。
+    """
+    h, s, v = (np.asarray(c) for c in img.convert("HSV").split())
+    height, width = h.shape
+    shifts = np.array([int((i * (360.0 / frame_count)) * (255.0 / 360.0)) for i in range(frame_count)], dtype=np.uint8)
+    # uint8 の足し算は 256 で折り返すので、そのまま色相の回転になる
+    hue_stack = h[None, :, :] + shifts[:, None, None]
+
+    def tall(channel: np.ndarray) -> Image.Image:
+        return Image.fromarray(np.ascontiguousarray(channel.reshape(-1, width)))
+    strip = Image.merge("HSV", (tall(hue_stack), tall(np.tile(s, (frame_count, 1))), tall(np.tile(v, (frame_count, 1))))).convert("RGB")
+    strip.putalpha(tall(np.tile(np.asarray(img.getchannel("A")), (frame_count, 1))))
+    return [strip.crop((0, i * height, width, (i + 1) * height)) for i in range(frame_count)]
+
+def create_gaming_gif(img_bytes: bytes, duration_ms: int = 50, max_size: tuple = (256, 256), frame_count: int = 36) -> io.BytesIO | None:
     try:
         img = Image.open(io.BytesIO(img_bytes)).convert("RGBA")
         # Image.LANCZOS に変更
         img.thumbnail(max_size, Image.LANCZOS)
-        
-        frames = []
-        for i in range(36):
-            h, s, v = img.convert("HSV").split()
-            h_array = np.array(h, dtype=np.int16)
-            shift_val = int((i * 10) * (255.0 / 360.0))
-            shifted_h = Image.fromarray(np.mod(h_array + shift_val, 256).astype(np.uint8), 'L')
-            frames.append(Image.merge("HSV", (shifted_h, s, v)).convert("RGBA"))
-            
-        buf = io.BytesIO()
-        frames[0].save(buf, format="GIF", save_all=True, append_images=frames[1:], duration=duration_ms, loop=0, disposal=2, optimize=True)
-        buf.seek(0)
-        return buf
+
+        return encode_gif(hue_cycle_frames(img, frame_count), duration_ms, loop=0)
     except Exception as e:
         print(f"Error: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,169 @@
+# services/image/gif_encoder.py
+import io
+from typing import Iterable
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+# 透明 (と「前のフレームから変わらない」) に使うパレット番号。色は 0〜254 に割り当てる
+TRANSPARENT_INDEX = 255
+# ファイルから読む GIF で、共通パレットを作る時に見るフレーム数 (間引いて選ぶ)
+PALETTE_SAMPLE_FRAMES = 8
+# 共通パレットを作る時に見る画素数の上限 (見るフレームで分ける)
+PALETTE_SAMPLE_PIXELS = 1 << 16
+# 共通パレットの誤差が、1フレームだけから作ったパレットの誤差の
+# PALETTE_ERROR_RATIO 倍 + PALETTE_ERROR_SLACK を超えたら、フレームごとのパレットにする
+PALETTE_ERROR_RATIO = 1.1
+PALETTE_ERROR_SLACK = 0.5
+# 画面の色を比べる時の「透明」の値 (RGB を詰めた値と重ならない)
+_CLEAR = 1 << 24
+
+def _rgb_and_opaque(frame: Image.Image) -> tuple[Image.Image, np.ndarray]:
+    if frame.mode != "RGBA":
+        frame = frame.convert("RGBA")
+    return frame.convert("RGB"), np.asarray(frame.getchannel("A")) >= 128
+
+def _sample(frame: Image.Image, budget: int) -> np.ndarray:
+    """不透明な画素から、おおよそ budget 画素を等間隔に取り出す (N, 3)"""
+    rgb, opaque = _rgb_and_opaque(frame)
+    step = max(1, int(np.sqrt(frame.width * frame.height / max(1, budget))))
+    return np.asarray(rgb)[::step, ::step][opaque[::step, ::step]]
+
+def _quantize(pixels: np.ndarray) -> Image.Image:
+    if len(pixels) == 0:
+        pixels = np.zeros((1, 3), dtype=np.uint8)
+    return Image.fromarray(pixels.reshape(-1, 1, 3), "RGB").quantize(colors=255, method=Image.Quantize.FASTOCTREE)
+
+def _mean_error(pixels: np.ndarray, palette_image: Image.Image) -> float:
+    """pixels をパレットの色に (ディザなしで) 置き換えた時の、1チャンネルあたりの平均誤差"""
+    if len(pixels) == 0:
+        return 0.0
+    mapped = Image.fromarray(pixels.reshape(-1, 1, 3), "RGB").quantize(palette=palette_image, dither=Image.Dither.NONE)
+    return float(np.abs(np.asarray(mapped.convert("RGB"), dtype=np.int16).reshape(-1, 3) - pixels).mean())
+
+def build_palette(frames: Iterable[Image.Image], frame_count: int) -> Image.Image | None:
+    """渡されたフレーム (frame_count 枚。全フレームか、全体から間引いたもの) から、全フレームで共有する 255 色のパレットを作る
+
+    色相を回したフレームのように、フレームごとに色が違うアニメーションでは 255 色に収まらないことがある。
+    真ん中のフレームだけから作ったパレットと誤差を比べ、共有すると色が大きく崩れる場合は
+    None を返す (GifWriter はフレームごとのパレットで書く)。
+    """
+    samples, reference = [], None
+    for index, frame in enumerate(frames):
+        # 透明な画素に色を割かないよう、不透明な画素だけから色を決める
+        if index == frame_count // 2:
+            reference = _sample(frame, PALETTE_SAMPLE_PIXELS)
+        samples.append(_sample(frame, PALETTE_SAMPLE_PIXELS // max(1, frame_count)))
+    palette = _quantize(np.concatenate(samples) if samples else np.zeros((0, 3), dtype=np.uint8))
+    if reference is not None:
+        shared_error = _mean_error(reference, palette)
+        own_error = _mean_error(reference, _quantize(reference))
+        if shared_error > own_error * PALETTE_ERROR_RATIO + PALETTE_ERROR_SLACK:
+            return None
+    return palette
+
+class GifWriter:
+    """共通パレットとフレーム差分でアニメーション GIF を1フレームずつ書き出す
+
+    パレットは全フレームで1つ (色相を回しただけのフレームはほとんど同じ色を使う)。
+    palette_image が None の時は、フレームごとに作ったパレットを各フレームに持たせる。
+    2枚目以降は前のフレームから (表示される色が) 変わった矩形だけを書き、その中でも
+    変わらない画素は透明にして前のフレームを透かす (disposal=1)。不透明だった画素が透明になる
+    フレームの前後だけは、全体を書いて消す (disposal=2) ことで表す。
+    そのために1フレームだけ書くのを遅らせるので、保持するのは常に3フレーム分まで。
+    """
+    def __init__(self, fp, palette_image: Image.Image | None, loop: int = 0):
+        self.fp = fp
+        self.loop = loop
+        self._shared = None if palette_image is None else self._palette_of(palette_image)
+        self._previous = None  # 書き出し済みの直前のフレーム (画面の色)
+        self._pending = None   # (番号, 画面の色, パレット, 表示時間, 新たに透明になる画素があるか)
+        self.frames = 0
+
+    @staticmethod
+    def _palette_of(palette_image: Image.Image) -> tuple[Image.Image, list, np.ndarray]:
+        """(quantize に渡すパレット画像, GIF に書くパレット, 番号 -> 画面の色)"""
+        palette = palette_image.getpalette()[:TRANSPARENT_INDEX * 3]
+        palette = palette + [0] * (768 - len(palette))
+        rgb = np.array(palette, dtype=np.uint32).reshape(256, 3)
+        colors = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+        colors[TRANSPARENT_INDEX] = _CLEAR
+        return palette_image, palette, colors
+
+    def indices(self, frame: Image.Image) -> tuple[np.ndarray, tuple]:
+        """フレームをパレットの番号にする (ディザなし: 変わらない画素が同じ番号になるように)。(番号, パレット) を返す"""
+        if frame.mode != "RGBA":
+            frame = frame.convert("RGBA")
+        opaque = np.asarray(frame.getchannel("A")) >= 128
+        if self._shared is not None:
+            palette = self._shared
+            quantized = frame.convert("RGB").quantize(palette=palette[0], dither=Image.Dither.NONE)
+        else:
+            # 透過ごと減色すると、透明な画素は (番号を1つ使うだけで) 色の割り当てに影響しない
+            quantized = frame.quantize(colors=255, method=Image.Quantize.FASTOCTREE)
+            palette = self._palette_of(quantized)
+        indices = np.array(quantized)
+        indices[~opaque] = TRANSPARENT_INDEX
+        return indices, palette
+
+    def _image(self, indices: np.ndarray, palette: list) -> Image.Image:
+        im = Image.fromarray(np.ascontiguousarray(indices), "P")
+        im.putpalette(palette)
+        return im
+
+    def add(self, frame: Image.Image, duration: int):
+        indices, palette = self.indices(frame)
+        screen = palette[2][indices]
+        if self._pending is None and self._previous is None:
+            header, _ = GifImagePlugin.getheader(self._image(indices, palette[1]), info={"loop": self.loop, "transparency": TRANSPARENT_INDEX, "background": TRANSPARENT_INDEX})
+            for chunk in header:
+                self.fp.write(chunk)
+            self._pending = (indices, screen, palette, duration, False)
+            return
+        needs_clear = bool(((screen == _CLEAR) & (self._pending[1] != _CLEAR)).any())
+        self._flush(clear_after=needs_clear)
+        self._pending = (indices, screen, palette, duration, needs_clear)
+
+    def _flush(self, clear_after: bool):
+        indices, screen, palette, duration, needs_clear = self._pending
+        offset, region = (0, 0), indices
+        # 消す側のフレームも全体を書く (disposal=2 で消えるのはそのフレームの矩形だけなので)
+        if self._previous is not None and not needs_clear and not clear_after:
+            changed = screen != self._previous
+            rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+            if len(rows) == 0:
+                # 何も変わらないフレームも表示時間のために 1x1 の透明で残す
+                rows, cols = np.array([0]), np.array([0])
+            y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+            region = np.where(changed[y0:y1, x0:x1], indices[y0:y1, x0:x1], TRANSPARENT_INDEX)
+            offset = (int(x0), int(y0))
+        disposal = 2 if clear_after else 1
+        params = {"duration": duration, "disposal": disposal, "transparency": TRANSPARENT_INDEX}
+        if self._shared is None:
+            params["include_color_table"] = True
+        for chunk in GifImagePlugin.getdata(self._image(region, palette[1]), offset=offset, **params):
+            self.fp.write(chunk)
+        # disposal=2 の後は画面が透明に戻る
+        self._previous = np.full_like(screen, _CLEAR) if clear_after else screen
+        self._pending = None
+        self.frames += 1
+
+    def close(self):
+        if self._pending is not None:
+            self._flush(clear_after=False)
+        self.fp.write(b";")
+
+def encode_gif(frames: list[Image.Image], durations, loop: int = 0) -> io.BytesIO:
+    """フレームのリストを GifWriter で書き出す。durations は全フレーム共通の値か、フレームごとのリスト
+
+    フレームは全部メモリにあるので、パレットは全フレームから作る (色相を1周させた
+    フレームでも、すべての色相がパレットに入るように)。
+    """
+    if isinstance(durations, (int, float)):
+        durations = [durations] * len(frames)
+    output = io.BytesIO()
+    writer = GifWriter(output, build_palette(frames, len(frames)), loop)
+    for frame, duration in zip(frames, durations):
+        writer.add(frame, duration)
+    writer.close()
+    output.seek(0)
+    return output
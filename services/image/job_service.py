@@ -0,0 +1,173 @@
+# services/image/job_service.py
+import asyncio
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from core.config import IMAGE_JOB_WORKERS, IMAGE_JOB_QUEUE_SIZE, IMAGE_JOB_TIMEOUT
+
+JOBS_MODULE = "services.image.jobs"
+
+def _run_job(name: str, args: tuple):
+    """ワーカープロセス側の入口。PIL / numpy はワーカーの中でだけ読み込まれる
+
+    結果と一緒に (プロセスID, そのワーカーのフォントキャッシュの統計) を返す。
+    """
+    jobs = importlib.import_module(JOBS_MODULE)
+    return getattr(jobs, name)(*args), (os.getpid(), jobs.worker_stats())
+
+def combine_font_stats(per_worker: list) -> dict:
+    """ワーカーごとの FontCache.stats() を合計する (率と平均は合計から計算し直す)"""
+    combined = {"workers": len(per_worker)}
+    for stats in per_worker:
+        for key, value in stats.items():
+            if key.startswith("max_"):
+                combined[key] = max(combined.get(key, 0), value)
+            elif not key.endswith("_rate") and not key.startswith("avg_"):
+                combined[key] = combined.get(key, 0) + value
+    lookups = combined.get("glyph_hits", 0) + combined.get("glyph_misses", 0)
+    combined["glyph_hit_rate"] = round(combined["glyph_hits"] / lookups, 3) if lookups else 0.0
+    renders = combined.get("renders", 0)
+    combined["avg_render_ms"] = round(combined["total_render_ms"] / renders, 1) if renders else 0.0
+    for key in ("glyph_mb", "total_render_ms"):
+        if key in combined:
+            combined[key] = round(combined[key], 1)
+    return combined
+
+def _warm_up():
+    importlib.import_module(JOBS_MODULE)
+
+class ImageJobQueueFull(Exception):
+    """待ち行列が一杯でジョブを受け付けられない"""
+
+class ImageJobService:
+    """画像処理をプロセスプールで実行し、イベントループを止めないようにする
+
+        data, resized = await image_jobs.run("watermark", image_bytes, template)
+
+    ジョブは services/image/jobs.py の関数名で指定する。各ワーカーのフォントキャッシュの
+    統計はジョブの結果と一緒に受け取り、font_stats() でまとめて見られる。同時に実行するのは
+    workers 件までで、それ以上は max_queue 件まで待たせ、溢れた分は
+    ImageJobQueueFull で断る。待っている間にキャンセルされたジョブは実行しない。
+    タイムアウトしたジョブは結果を捨てるが、実行中のプロセスは止められないので
+    終わるまでその枠は空かない (その間に他のジョブを詰め込みすぎないため)。
+    """
+    def __init__(self, workers: int = IMAGE_JOB_WORKERS, max_queue: int = IMAGE_JOB_QUEUE_SIZE, timeout: float = IMAGE_JOB_TIMEOUT):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._slots = None
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._worker_stats = {}  # プロセスID -> 直近のジョブを終えた時点のフォントキャッシュの統計
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # 最初のジョブが来た時に作る (起動を遅くしない)。
+        # Windows と同じ spawn で統一し、スレッドを持つ Bot プロセスを fork しない
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up,
+            )
+            print(f"[ImageJobs] プロセスプールを起動しました ({self.workers} プロセス)")
+        return self._executor
+
+    def _release(self):
+        self.running -= 1
+        self._slots.release()
+
+    async def run(self, name: str, *args, timeout: float | None = None):
+        """ジョブを実行して結果を返す。溢れたら ImageJobQueueFull、時間切れは asyncio.TimeoutError"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ImageJobQueueFull(name)
+
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._slots.acquire()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.queued -= 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._pool().submit(_run_job, name, args)
+        except Exception:
+            self._slots.release()
+            raise
+        self.running += 1
+        # 枠はプロセス側の処理が本当に終わった時に返す
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+
+        start = time.perf_counter()
+        try:
+            result, (pid, worker_stats) = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            print(f"[ImageJobs] {name} がタイムアウトしました ({timeout or self.timeout:.0f}秒)")
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except BrokenProcessPool:
+            # ワーカーが異常終了した場合は次のジョブでプールを作り直す
+            self.failed += 1
+            self.shutdown()
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self._worker_stats[pid] = worker_stats
+        self.completed += 1
+        self.total_ms += elapsed
+        self.max_ms = max(self.max_ms, elapsed)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "queue_limit": self.max_queue,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_ms / self.completed, 1) if self.completed else 0.0,
+            "max_ms": round(self.max_ms, 1),
+        }
+
+    def font_stats(self) -> dict:
+        """全ワーカーのフォント・グリフキャッシュの統計の合計 (各ワーカーが最後にジョブを終えた時点)"""
+        return combine_font_stats(list(self._worker_stats.values()))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        # ワーカーごと作り直すので、キャッシュの統計も数え直す
+        self._worker_stats.clear()
+
+# インスタンスのエクスポート
+image_jobs = ImageJobService()
@@ -0,0 +1,62 @@
+# services/image/jobs.py
+"""image_jobs のワーカープロセスで実行される画像処理ジョブ
+
+どのジョブも送信できる状態 (エンコード済み・上限サイズ以内) の
+(bytes, リサイズしたか) を返す (watermark は拡張子も返す)。失敗した場合は None。
+"""
+import io
+import time
+from services.image.base_worker import resize_if_too_large
+from services.image.text_gen import generate_styled_text_image
+from services.image.text_special import generate_text4_hd, generate_text5_gradient
+from services.image.watermark import process_and_composite_image
+from services.image.gaming_gif import create_gaming_gif
+from services.image.font_cache import font_cache
+
+def _finish(buf: io.BytesIO, target_format: str) -> tuple[bytes, bool]:
+    final, resized = resize_if_too_large(buf, target_format)
+    return final.getvalue(), resized
+
+def _finish_png(img) -> tuple[bytes, bool]:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    buf.seek(0)
+    return _finish(buf, "PNG")
+
+def _render_text(name: str, generate, *args):
+    """文字画像を生成し、生成にかかった時間とグリフキャッシュのヒット率をログに出す"""
+    hits, misses = font_cache.glyph_hits, font_cache.glyph_misses
+    start = time.perf_counter()
+    img = generate(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    font_cache.record_render(elapsed)
+    hits, misses = font_cache.glyph_hits - hits, font_cache.glyph_misses - misses
+    print(f"[FontCache] {name} {elapsed:.0f}ms (グリフ {hits}/{hits + misses} ヒット, 累計ヒット率 {font_cache.stats()['glyph_hit_rate']:.0%})")
+    return _finish_png(img)
+
+def styled_text(text: str, font_path: str, params: dict, is_square: bool):
+    return _render_text("styled_text", generate_styled_text_image, text, font_path, params, is_square)
+
+def text4(text: str, font_path: str):
+    return _render_text("text4", generate_text4_hd, text, font_path)
+
+def text5(text: str, font_path: str):
+    return _render_text("text5", generate_text5_gradient, text, font_path)
+
+def watermark(image_bytes: bytes, template: dict):
+    """(bytes, リサイズしたか, 拡張子) を返す。形式は元画像によって変わる"""
+    res = process_and_composite_image(image_bytes, template)
+    if not res:
+        return None
+    buf, fmt, shrunk = res
+    # 予測が外れて上限を超えた時だけ縮小し直す
+    data, resized = _finish(buf, fmt)
+    return data, shrunk or resized, "jpg" if fmt == "JPEG" else fmt.lower()
+
+def worker_stats() -> dict:
+    """このワーカーのフォントキャッシュの統計。image_jobs がジョブの結果と一緒に受け取る"""
+    return font_cache.stats()
+
+def gaming(image_bytes: bytes, frame_count: int = 36, max_size: tuple = (256, 256)):
+    gif_io = create_gaming_gif(image_bytes, max_size=max_size, frame_count=frame_count)
+    return _finish(gif_io, "GIF") if gif_io else None
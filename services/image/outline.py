@@ -0,0 +1,37 @@
+# services/image/outline.py
+"""文字の縁取り用の太らせ (最大値フィルタ)
+
+ImageFilter.MaxFilter(size) と同じ size x size の正方形の最大値フィルタを、
+行方向と列方向に分けた van Herk / Gil-Werman 法で計算する。
+MaxFilter は1画素あたり size^2 回比べるが、こちらは size によらず1画素あたり数回で済む。
+画像の外側は 0 とみなす (MaxFilter の端の扱いと結果は同じ)。
+"""
+import numpy as np
+from PIL import Image
+
+def _max_along_last_axis(a: np.ndarray, size: int) -> np.ndarray:
+    """最後の軸に沿って、各位置を中心とした幅 size の最大値を取る"""
+    radius = size // 2
+    n = a.shape[-1]
+    # 前後に radius ずつ足し、さらに size の倍数になるまで 0 で埋めてブロックに分ける
+    blocks = -(-(n + 2 * radius) // size)
+    padded = np.zeros(a.shape[:-1] + (blocks * size,), dtype=a.dtype)
+    padded[..., radius:radius + n] = a
+    padded = padded.reshape(a.shape[:-1] + (blocks, size))
+    # ブロックの先頭からの最大値 (g) と末尾からの最大値 (h)
+    g = np.maximum.accumulate(padded, axis=-1).reshape(a.shape[:-1] + (-1,))
+    h = np.maximum.accumulate(padded[..., ::-1], axis=-1)[..., ::-1].reshape(a.shape[:-1] + (-1,))
+    # 窓 [i, i + size) は高々2つのブロックにまたがるので、h[i] と g[i + size - 1] の大きい方
+    return np.maximum(h[..., :n], g[..., size - 1:size - 1 + n])
+
+def max_filter(img: Image.Image, size: int) -> Image.Image:
+    """img.filter(ImageFilter.MaxFilter(size)) と同じ結果 ("L" 画像、size は奇数)"""
+    if size % 2 == 0:
+        raise ValueError("size は奇数にしてください")
+    if img.mode != "L":
+        img = img.convert("L")
+    if size == 1 or img.width == 0 or img.height == 0:
+        return img.copy()
+    a = np.asarray(img)
+    rows = _max_along_last_axis(a, size)
+    return Image.fromarray(np.ascontiguousarray(_max_along_last_axis(rows.T, size).T))
@@ -0,0 +1,198 @@
+# services/image/result_cache.py
+"""画像コマンドの結果 (エンコード済みのバイト列) のキャッシュ
+
+キーは入力 (コマンド名・文字列・パラメータ・フォントの更新時刻など) のハッシュで、
+同じ入力ならワーカーに投げずに前回の結果をそのまま返す。
+メモリ上の LRU と、容量を決めたディスク上の LRU の2段。どちらも上限はバイト数で決める。
+ディスクは Bot プロセスからだけ読み書きする (ワーカープロセスは触らない)。
+イベントループ上で触るのはメモリの LRU だけで、ディスクの読み書きは asyncio.to_thread で行う。
+メモリだけの場合は、バイト列と一緒に付随する値 (拡張子など) をタプルで持てる。
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from core.config import TEXT_CACHE_DIR, TEXT_CACHE_MEMORY_BYTES, TEXT_CACHE_DISK_BYTES, TRANSFORM_CACHE_MEMORY_BYTES
+
+# 生成処理の見た目を変えたら上げる (古い結果を使わないように)
+RENDER_VERSION = 1
+
+class ResultCache:
+    def __init__(self, name: str, cache_dir: str | None, memory_bytes: int, disk_bytes: int, suffix: str = ".bin"):
+        self.name = name
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.suffix = suffix
+        self._memory = OrderedDict()  # キー -> バイト列 (か、先頭がバイト列のタプル)
+        self._disk = None             # キー -> ファイルサイズ (古い順)。最初に使う時に読む
+        self._disk_lock = threading.Lock()  # ディスク側はスレッドから触るので、索引の更新をまとめて守る
+        self.memory_used = 0
+        self.disk_used = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.memory_evictions = 0
+
+    @staticmethod
+    def key(*parts) -> str:
+        """JSON にできる値の並びからキーを作る (dict はキーの順に依らない)"""
+        raw = json.dumps([RENDER_VERSION, *parts], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def _load_index(self):
+        """ディスクにある結果を更新時刻の古い順に並べる"""
+        self._disk = OrderedDict()
+        self.disk_used = 0
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(self.suffix):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, entry.name[:-len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self.disk_used += size
+
+    @staticmethod
+    def _size(value) -> int:
+        return len(value if isinstance(value, bytes) else value[0])
+
+    def _remember(self, key: str, value):
+        if self._size(value) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self.memory_used -= self._size(old)
+        self._memory[key] = value
+        self.memory_used += self._size(value)
+        while self.memory_used > self.memory_bytes:
+            _, dropped = self._memory.popitem(last=False)
+            self.memory_used -= self._size(dropped)
+            self.memory_evictions += 1
+
+    def _uses_disk(self) -> bool:
+        return bool(self.cache_dir) and self.disk_bytes > 0
+
+    def _disk_get(self, key: str) -> bytes | None:
+        """(スレッドで実行) ディスクから読む"""
+        with self._disk_lock:
+            if self._disk is None:
+                self._load_index()
+            if key not in self._disk:
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                # 古い順に消すので、使ったものは新しくする
+                os.utime(self._path(key))
+                self._disk.move_to_end(key)
+                return data
+            except OSError:
+                self.disk_used -= self._disk.pop(key)
+                return None
+
+    def _disk_put(self, key: str, data: bytes):
+        """(スレッドで実行) ディスクに書き、上限を超えたら古い順に消す"""
+        with self._disk_lock:
+            if self._disk is None:
+                self._load_index()
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                print(f"[ResultCache] {self.name} の保存に失敗しました: {e}")
+                return
+            self.disk_used -= self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self.disk_used += len(data)
+            while self.disk_used > self.disk_bytes and len(self._disk) > 1:
+                old_key, size = self._disk.popitem(last=False)
+                self.disk_used -= size
+                self.evictions += 1
+                try: os.remove(self._path(old_key))
+                except OSError: pass
+
+    def _disk_clear(self):
+        with self._disk_lock:
+            if self._disk is None:
+                self._load_index()
+            for key in self._disk:
+                try: os.remove(self._path(key))
+                except OSError: pass
+            self._disk.clear()
+            self.disk_used = 0
+
+    async def get(self, key: str):
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return data
+
+        if self._uses_disk():
+            data = await asyncio.to_thread(self._disk_get, key)
+            if data is not None:
+                self.disk_hits += 1
+                self._remember(key, data)
+                return data
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data):
+        self.stores += 1
+        self._remember(key, data)
+        # ディスクに置くのはバイト列だけ
+        if self._uses_disk() and isinstance(data, bytes) and len(data) <= self.disk_bytes:
+            await asyncio.to_thread(self._disk_put, key, data)
+
+    async def clear(self):
+        """メモリとディスクの結果をすべて消す"""
+        self._memory.clear()
+        self.memory_used = 0
+        if self._uses_disk():
+            await asyncio.to_thread(self._disk_clear)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_mb": round(self.memory_used / (1024 * 1024), 1),
+            "disk_entries": len(self._disk) if self._disk is not None else "-",
+            "disk_mb": round(self.disk_used / (1024 * 1024), 1),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "memory_evictions": self.memory_evictions,
+            "evictions": self.evictions,
+        }
+
+def text_cache_key(command: str, text: str, is_square: bool, params: dict | None, font_path: str) -> str:
+    """文字画像コマンドのキー。フォントファイルを差し替えると (更新時刻が変わるので) 別のキーになる"""
+    try:
+        font_mtime = os.stat(font_path).st_mtime_ns
+    except OSError:
+        font_mtime = None
+    return ResultCache.key("text", command, text, is_square, params, os.path.basename(font_path), font_mtime)
+
+def attachment_digest(data: bytes) -> str:
+    """添付ファイルの中身のハッシュ (同じ画像が別のチャンネルに貼られても同じになる)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+# インスタンスのエクスポート
+text_cache = ResultCache("text", TEXT_CACHE_DIR, TEXT_CACHE_MEMORY_BYTES, TEXT_CACHE_DISK_BYTES, suffix=".png")
+# 添付画像の加工結果 (watermark / gaming)。利用者の画像なのでディスクには残さない
+transform_cache = ResultCache("transform", None, TRANSFORM_CACHE_MEMORY_BYTES, 0)
@@ -0,0 +1,244 @@
+# services/image/template_cache.py
+"""ウォーターマーク用テンプレートの事前展開キャッシュ
+
+テンプレート PNG を、合成にそのまま使える大きさの RGBA 生データとして
+TEMPLATE_CACHE_DIR に書き出しておき、合成時はそれをメモリマップして使う。
+デコードもリサイズも最初の1回だけで、展開済みのデータはページキャッシュを通じて
+image_jobs の全ワーカープロセスで共有される。
+展開済みの target_size の版があれば縮小版 (1/8 刻み) はそこから作り、無ければ PNG から直接作る。
+どちらも帯 (数百行) ごとに縮小して書き出すので、元の大きさの画像を複製しない。
+ディレクトリの合計は TEMPLATE_CACHE_MAX_BYTES までで、超えたら使われていない順に消す。
+ワーカーがマップしておくのは直近の MAPPED_TEMPLATES 件まで。
+使い方 (予測用の段の事前展開): python -m services.image.template_cache
+        (上限まで全段を展開する場合は --all)
+"""
+import math
+import mmap
+import os
+import sys
+import time
+from collections import OrderedDict
+from PIL import Image
+from core.config import TEMPLATES_DIR, TEMPLATE_CACHE_DIR, TEMPLATE_CACHE_MAX_BYTES
+from core.constants import TEMPLATES_DATA
+
+# 合成する解像度は target_size の 1/8 刻み。PROBE_STEPS はサイズ予測に必ず使う段
+SCALE_STEPS = 8
+PROBE_STEPS = (1, 2)
+# ワーカーごとにマップしておく件数 (予測用の2段と合成する段を、2テンプレート分ほど)
+MAPPED_TEMPLATES = 6
+# 書き出す時に1度に縮小する行数
+BAND_ROWS = 256
+
+def step_size(target_size: tuple, step: int) -> tuple:
+    return tuple(max(1, round(v * step / SCALE_STEPS)) for v in target_size)
+
+def _bands(source: Image.Image, size: tuple):
+    """source を size に LANCZOS で縮小した RGBA の生データを、BAND_ROWS 行ずつ返す
+
+    Image.resize は RGBA を丸ごと乗算済みアルファの画像に変換してから縮小するので、
+    元の画像の帯 (フィルタの幅だけ上下に余分に取る) を切り出して box 付きで縮小する。
+    """
+    width, height = size
+    if source.size == (width, height):
+        for top in range(0, height, BAND_ROWS):
+            yield source.crop((0, top, width, min(height, top + BAND_ROWS))).tobytes()
+        return
+    scale = source.height / height
+    margin = math.ceil(3 * max(scale, 1.0)) + 2  # LANCZOS は縮小率の3倍の幅を見る
+    for out_top in range(0, height, BAND_ROWS):
+        out_bottom = min(height, out_top + BAND_ROWS)
+        y0, y1 = out_top * scale, out_bottom * scale
+        top, bottom = max(0, math.floor(y0) - margin), min(source.height, math.ceil(y1) + margin)
+        band = source.crop((0, top, source.width, bottom))
+        yield band.resize((width, out_bottom - out_top), Image.LANCZOS, box=(0, y0 - top, source.width, y1 - top)).tobytes()
+
+class TemplateCache:
+    def __init__(self, templates_dir: str = TEMPLATES_DIR, cache_dir: str = TEMPLATE_CACHE_DIR, max_bytes: int = TEMPLATE_CACHE_MAX_BYTES,
+                 max_mapped: int = MAPPED_TEMPLATES):
+        self.templates_dir = templates_dir
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_mapped = max_mapped
+        self._overlays = OrderedDict()  # (テンプレート名, (幅, 高さ)) -> (mmap 上の RGBA 画像, mmap, パス)
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.evictions = 0
+        self.unmaps = 0
+
+    def _raw_path(self, name: str, size: tuple, mtime_ns: int) -> str:
+        # 元の PNG を差し替えたら別のファイルになるよう、更新時刻を名前に含める
+        stem = os.path.splitext(name)[0]
+        return os.path.join(self.cache_dir, f"{stem}.{size[0]}x{size[1]}.{mtime_ns}.rgba")
+
+    def _mapped_paths(self) -> set:
+        return {path for _, _, path in self._overlays.values()}
+
+    def _build(self, name: str, source_path: str, mtime_ns: int, sizes: list, base_size: tuple | None = None):
+        """sizes の RGBA の生データを書き出す。PNG をデコードするのは全部で1回まで
+
+        展開済みの base_size (target_size) の版があれば、PNG はデコードせずにそこから縮小する。
+        """
+        start = time.perf_counter()
+        source = None
+        if base_size is not None and tuple(base_size) not in sizes:
+            if os.path.exists(self._raw_path(name, tuple(base_size), mtime_ns)):
+                source = self.get(name, base_size)
+        if source is None:
+            source = Image.open(source_path)
+            source.load()
+            if source.mode != "RGBA":
+                source = source.convert("RGBA")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        written = []
+        for size in sizes:
+            raw_path = self._raw_path(name, size, mtime_ns)
+            # 他のワーカーが同時に作っても壊れないよう、一時ファイルから置き換える
+            tmp_path = f"{raw_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                for chunk in _bands(source, size):
+                    f.write(chunk)
+            os.replace(tmp_path, raw_path)
+            self.builds += 1
+            self._remove_stale(raw_path)
+            written.append(raw_path)
+        del source
+        self._enforce_limit(written)
+        sizes_text = ", ".join(f"{w}x{h}" for w, h in sizes)
+        print(f"[Template] {name} を展開しました {sizes_text} ({(time.perf_counter() - start) * 1000:.0f}ms)")
+
+    def _remove_stale(self, raw_path: str):
+        """同じテンプレート・同じ大きさの古い版を消す (このプロセスがマップ中のものは次回に回す)"""
+        prefix = os.path.basename(raw_path).rsplit(".", 2)[0] + "."
+        mapped = self._mapped_paths()
+        for entry in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, entry)
+            if entry.startswith(prefix) and entry.endswith(".rgba") and path != raw_path and path not in mapped:
+                try: os.remove(path)
+                except OSError: pass  # 他のプロセスがマップ中 (Windows) なら次回に回す
+
+    def _entries(self) -> list:
+        """展開済みのファイルの (更新時刻, サイズ, パス)"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".rgba"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def _enforce_limit(self, keep_paths: list):
+        """ディレクトリの合計が max_bytes を超えたら、更新時刻 (最後に使った時刻) の古い順に消す
+
+        マップ中のファイルは消してもディスクが空かないので消さない。
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        skip = set(keep_paths) | self._mapped_paths()
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path in skip:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                self.evictions += 1
+            except OSError:
+                pass  # Windows では他のプロセスがマップ中のファイルは消せないので次回に回す
+
+    def _map(self, key: tuple, raw_path: str) -> Image.Image:
+        with open(raw_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        overlay = Image.frombuffer("RGBA", key[1], buffer, "raw", "RGBA", 0, 1)
+        self._overlays[key] = (overlay, buffer, raw_path)
+        while len(self._overlays) > self.max_mapped:
+            old_overlay, old_buffer, _ = self._overlays.popitem(last=False)[1]
+            del old_overlay
+            try:
+                old_buffer.close()
+                self.unmaps += 1
+            except BufferError:
+                pass  # 合成中でまだ使われている。使い終わった時に解放される
+        return overlay
+
+    def get(self, name: str, size: tuple, base_size: tuple | None = None) -> Image.Image | None:
+        """size に合わせた RGBA のテンプレート。読み取り専用なので合成の入力にだけ使う
+
+        base_size (target_size) を渡すと、size の版がまだ無い時に、展開済みの
+        base_size の版があればそこから縮小して作る (無ければ PNG から直接作る)。
+        """
+        key = (name, tuple(size))
+        entry = self._overlays.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._overlays.move_to_end(key)
+            return entry[0]
+        self.misses += 1
+
+        source_path = os.path.join(self.templates_dir, name)
+        if not os.path.exists(source_path):
+            return None
+        mtime_ns = os.stat(source_path).st_mtime_ns
+        raw_path = self._raw_path(name, key[1], mtime_ns)
+        if not os.path.exists(raw_path):
+            self._build(name, source_path, mtime_ns, [key[1]], base_size)
+        else:
+            # 上限を超えた時に消す順番のため、使った時刻を残す
+            try: os.utime(raw_path)
+            except OSError: pass
+        return self._map(key, raw_path)
+
+    def prepare(self, name: str, sizes: list, base_size: tuple | None = None):
+        """sizes のうちまだ展開していないものを、まとめて (PNG のデコード1回で) 作る"""
+        source_path = os.path.join(self.templates_dir, name)
+        if not os.path.exists(source_path):
+            return
+        mtime_ns = os.stat(source_path).st_mtime_ns
+        missing = [tuple(size) for size in sizes if not os.path.exists(self._raw_path(name, tuple(size), mtime_ns))]
+        if missing:
+            self._build(name, source_path, mtime_ns, missing, base_size)
+
+    def _fits(self, name: str, sizes: list) -> bool:
+        """展開済みか、展開しても max_bytes に収まるか"""
+        source_path = os.path.join(self.templates_dir, name)
+        if not os.path.exists(source_path):
+            return True
+        mtime_ns = os.stat(source_path).st_mtime_ns
+        needed = sum(w * h * 4 for w, h in sizes if not os.path.exists(self._raw_path(name, (w, h), mtime_ns)))
+        return needed == 0 or sum(size for _, size, _ in self._entries()) + needed <= self.max_bytes
+
+    def precompute(self, templates=TEMPLATES_DATA, all_steps: bool = False) -> int:
+        """テンプレートを展開しておく。展開した件数を返す
+
+        既定では、どのリクエストでも使う予測用の段 (PROBE_STEPS) だけを全テンプレート分作る。
+        all_steps なら続けて残りの段を大きい順に、max_bytes に収まる分だけ作る
+        (収まらない段は使う時に展開する)。
+        """
+        built = self.builds
+        passes = [PROBE_STEPS]
+        if all_steps:
+            passes += [(step,) for step in range(SCALE_STEPS, 0, -1) if step not in PROBE_STEPS]
+        for steps in passes:
+            for tmpl in templates:
+                target_size = tuple(tmpl["target_size"])
+                sizes = [step_size(target_size, step) for step in steps]
+                if not self._fits(tmpl["name"], sizes):
+                    print(f"[Template] 上限 ({self.max_bytes / 1024 ** 2:.0f}MB) に達したため、残りは使う時に展開します")
+                    return self.builds - built
+                self.prepare(tmpl["name"], sizes, base_size=target_size)
+        return self.builds - built
+
+    def stats(self) -> dict:
+        return {"mapped": len(self._overlays), "hits": self.hits, "misses": self.misses, "builds": self.builds,
+                "evictions": self.evictions, "unmaps": self.unmaps}
+
+# インスタンスのエクスポート
+template_cache = TemplateCache()
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    count = template_cache.precompute(all_steps="--all" in sys.argv[1:])
+    print(f"[Template] {count} 件を展開しました ({time.perf_counter() - start:.1f}s) -> {template_cache.cache_dir}")
@@ -1,11 +1,13 @@
 # services/image/text_gen.py
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from PIL import Image, ImageDraw
 from core.config import FONTS_DIR
+from services.image.font_cache import font_cache
+from services.image.outline import max_filter
 import os
 
 def generate_styled_text_image(text_to_render: str, font_path: str, mode_params: dict, is_square: bool = False):
     font_size = 110
-    font = ImageFont.truetype(font_path, font_size)
+    font = font_cache.get(font_path, font_size)
     lines = text_to_render.split(',')
     spacing = mode_params.get('spacing', 0)
 
@@ -14,19 +16,14 @@ def generate_styled_text_image(text_to_render: str, font_path: str, mode_params:
     total_line_height = 0
     
     for line in lines:
-        line_width = int(sum(font.getlength(c) for c in line) + max(0, len(line) - 1) * spacing)
+        line_width = font.spaced_width(line, spacing)
         if line_width <= 0: continue
-        bbox = font.getbbox(line)
+        bbox = font.font.getbbox(line)
         line_height = bbox[3] - bbox[1]
         
         line_img = Image.new("L", (line_width, line_height))
-        draw = ImageDraw.Draw(line_img)
-        
-        curr_x = 0
-        for char in line:
-            char_bbox = font.getbbox(char)
-            draw.text((curr_x - char_bbox[0], -bbox[1]), char, font=font, fill=255)
-            curr_x += font.getlength(char) + spacing
+        # キャッシュした文字のマスクを並べる
+        font.draw_spaced(ImageDraw.Draw(line_img), (0, -bbox[1]), line, spacing, fill=255)
         
         line_images.append(line_img)
         max_line_width = max(max_line_width, line_img.width)
@@ -54,11 +51,12 @@ def generate_styled_text_image(text_to_render: str, font_path: str, mode_params:
     padded_mask = Image.new("L", (text_mask.width + pad*2, text_mask.height + pad*2))
     padded_mask.paste(text_mask, (pad, pad))
     
-    inner_mask = padded_mask.filter(ImageFilter.MaxFilter(inner_t * 2 + 1))
+    # 縁取りの太さによらず一定の時間で済む最大値フィルタ (MaxFilter と同じ結果)
+    inner_mask = max_filter(padded_mask, inner_t * 2 + 1)
     final_img = Image.new("RGBA", inner_mask.size, (0, 0, 0, 0))
     
     if outer_t > 0:
-        outer_mask = padded_mask.filter(ImageFilter.MaxFilter((inner_t + outer_t) * 2 + 1))
+        outer_mask = max_filter(padded_mask, (inner_t + outer_t) * 2 + 1)
         final_img.paste(Image.new("RGBA", inner_mask.size, mode_params['outer_color']), (0, 0), outer_mask)
         
     final_img.paste(Image.new("RGBA", inner_mask.size, mode_params['inner_color']), (0, 0), inner_mask)
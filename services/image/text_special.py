@@ -1,25 +1,21 @@
 # services/image/text_special.py
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageColor
+from PIL import Image, ImageDraw, ImageColor
 import numpy as np
+from services.image.font_cache import font_cache
+from services.image.outline import max_filter
 
 def generate_text4_hd(text: str, font_path: str):
     scale = 4
-    font = ImageFont.truetype(font_path, 110 * scale)
+    font = font_cache.get(font_path, 110 * scale)
     spacing = -15 * scale
     
-    text_w = int(sum(font.getlength(c) for c in text) + max(0, len(text)-1) * spacing)
-    bbox = font.getbbox(text)
+    text_w = font.spaced_width(text, spacing)
+    bbox = font.font.getbbox(text)
     text_h = bbox[3] - bbox[1]
     
     pad = text_h
     padded_img = Image.new("RGBA", (text_w + pad*2, text_h + pad*2), (0,0,0,0))
-    draw = ImageDraw.Draw(padded_img)
-    
-    curr_x = pad
-    for char in text:
-        c_bbox = font.getbbox(char)
-        draw.text((curr_x - c_bbox[0], pad - bbox[1]), char, font=font, fill="#f984f2")
-        curr_x += font.getlength(char) + spacing
+    font.draw_spaced(ImageDraw.Draw(padded_img), (pad, pad - bbox[1]), text, spacing, fill="#f984f2")
 
     # Image.BICUBIC に変更
     transformed = padded_img.transform(padded_img.size, Image.AFFINE, (1, 0.2, 0, 0, 1, 0), resample=Image.BICUBIC)
@@ -32,26 +28,21 @@ def generate_text4_hd(text: str, font_path: str):
     final = Image.new("RGBA", (500, 500), (0,0,0,0))
     final.paste(resized, ((500-resized.width)//2, (500-resized.height)//2))
     
-    mask = final.getchannel('A').filter(ImageFilter.MaxFilter(25))
+    mask = max_filter(final.getchannel('A'), 25)
     res = Image.new("RGBA", (500, 500), (0,0,0,0))
     res.paste((255,255,255,255), (0,0), mask)
     res.paste(final, (0,0), final)
     return res
 
 def generate_text5_gradient(text: str, font_path: str):
-    font = ImageFont.truetype(font_path, 110)
+    font = font_cache.get(font_path, 110)
     spacing = -15
-    text_w = int(sum(font.getlength(c) for c in text) + max(0, len(text)-1) * spacing)
-    bbox = font.getbbox(text)
+    text_w = font.spaced_width(text, spacing)
+    bbox = font.font.getbbox(text)
     text_h = bbox[3] - bbox[1]
 
     mask = Image.new("L", (text_w, text_h), 0)
-    draw_mask = ImageDraw.Draw(mask)
-    curr_x = 0
-    for char in text:
-        c_bbox = font.getbbox(char)
-        draw_mask.text((curr_x - c_bbox[0], -bbox[1]), char, font=font, fill=255)
-        curr_x += font.getlength(char) + spacing
+    font.draw_spaced(ImageDraw.Draw(mask), (0, -bbox[1]), text, spacing, fill=255)
 
     colors = ["#fd57d8", "#fb0af2", "#fa01fd", "#fd31f1", "#fc91b0", "#fdfa38", "#e8ee38",
               "#d0f457", "#6af097", "#6ee9b4", "#9ad0f2", "#9997fd", "#8d81fb", "#883cfe"]
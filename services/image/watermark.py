@@ -1,36 +1,101 @@
 # services/image/watermark.py
 import io
-import os
+import math
 from PIL import Image, ImageOps
-from core.config import TEMPLATES_DIR
+from core.config import MAX_FILE_SIZE, WATERMARK_OUTPUT_FORMAT
+from services.image.base_worker import solve_scale, TARGET_MARGIN
+from services.image.template_cache import template_cache, SCALE_STEPS, PROBE_STEPS, step_size
 
-def process_and_composite_image(img_bytes: bytes, tmpl_data: dict) -> io.BytesIO | None:
+LOSSY_QUALITY = 85
+
+def _has_alpha(img: Image.Image) -> bool:
+    """実際に透けている画素があるか (RGBA でも全面不透明なら False)"""
+    if img.mode in ("RGBA", "LA", "PA"):
+        return img.getchannel("A").getextrema()[0] < 255
+    return img.mode == "P" and "transparency" in img.info
+
+def _choose_format(base_image: Image.Image, output_format: str) -> str:
+    if output_format == "AUTO":
+        return "PNG" if _has_alpha(base_image) else "JPEG"
+    # JPEG は透過を持てないので、透過のある画像は PNG にする
+    if output_format == "JPEG" and _has_alpha(base_image):
+        return "PNG"
+    return output_format
+
+def _composite(base_image: Image.Image, name: str, target_size: tuple, step: int) -> Image.Image | None:
+    size = step_size(target_size, step)
+    # Image.LANCZOS に変更
+    processed = ImageOps.fit(base_image, size, Image.LANCZOS)
+    # 展開・リサイズ済みのテンプレートを使う (無い段はその場で作る)
+    overlay = template_cache.get(name, size, base_size=target_size)
+    if overlay is None:
+        return None
+    if processed.mode != 'RGBA':
+        processed = processed.convert('RGBA')
+    return Image.alpha_composite(processed, overlay)
+
+def _encode(img: Image.Image, fmt: str, keep_alpha: bool) -> io.BytesIO:
+    buf = io.BytesIO()
+    if fmt == "PNG":
+        img.save(buf, "PNG")
+    else:
+        (img if keep_alpha else img.convert("RGB")).save(buf, fmt, quality=LOSSY_QUALITY)
+    buf.seek(0)
+    return buf
+
+def _max_step(base_image: Image.Image, target_size: tuple) -> int:
+    """元画像の解像度を超えて大きくしても情報は増えないので、そこを上限にする"""
+    source_scale = min(base_image.width / target_size[0], base_image.height / target_size[1])
+    return min(SCALE_STEPS, max(1, math.ceil(source_scale * SCALE_STEPS - 1e-6)))
+
+def _pick_step(base_image: Image.Image, name: str, target_size: tuple, fmt: str, keep_alpha: bool, max_bytes: int, max_step: int) -> int | None:
+    """max_bytes に収まる最大の解像度 (1/8 刻みの段数) を、合成する前に決める"""
+    if max_step <= PROBE_STEPS[-1]:
+        return max_step
+    # 1/8 と 2/8 で試しにエンコードし、size = c * scale^k を当てはめて予測する
+    # (まだ展開していなければ、2つの段を PNG のデコード1回でまとめて作る)
+    template_cache.prepare(name, [step_size(target_size, step) for step in PROBE_STEPS], base_size=target_size)
+    probes = []
+    for step in PROBE_STEPS:
+        probe = _composite(base_image, name, target_size, step)
+        if probe is None:
+            return None
+        probes.append((step / SCALE_STEPS, len(_encode(probe, fmt, keep_alpha).getbuffer())))
+    scale = solve_scale(*probes[0], *probes[1], max_bytes * TARGET_MARGIN)
+    return min(max(math.floor(scale * SCALE_STEPS), 1), max_step)
+
+def process_and_composite_image(img_bytes: bytes, tmpl_data: dict, max_bytes: int | None = MAX_FILE_SIZE,
+                                output_format: str = WATERMARK_OUTPUT_FORMAT) -> tuple[io.BytesIO, str, bool] | None:
+    """テンプレートを合成して (エンコード済み画像, 形式, サイズ上限のために縮小したか) を返す
+
+    max_bytes を指定すると、target_size で合成してから縮めるのではなく、
+    max_bytes に収まる解像度を先に決めてその大きさで合成する。
+    透過のない画像は既定で JPEG にする (output_format で PNG / WEBP も指定できる)。
+    max_bytes=None なら従来どおり target_size のまま PNG で合成する。
+    """
     try:
         base_image = Image.open(io.BytesIO(img_bytes))
-        target_w, target_h = tmpl_data['target_size']
-        
-        # Image.LANCZOS に変更
-        processed = ImageOps.fit(base_image, (target_w, target_h), Image.LANCZOS)
-        
-        overlay_path = os.path.join(TEMPLATES_DIR, tmpl_data['name'])
-        if not os.path.exists(overlay_path):
+        target_size = tuple(tmpl_data['target_size'])
+
+        if max_bytes is None:
+            fmt, keep_alpha, step = "PNG", True, SCALE_STEPS
+            max_step = step
+        else:
+            # JPEG は必要な大きさまで縮小しながらデコードする (画素を読む前に指定する)
+            source_scale = min(base_image.width / target_size[0], base_image.height / target_size[1])
+            if source_scale >= 2:
+                base_image.draft(base_image.mode, (math.ceil(base_image.width / source_scale), math.ceil(base_image.height / source_scale)))
+            fmt = _choose_format(base_image, output_format.upper())
+            keep_alpha = _has_alpha(base_image)
+            max_step = _max_step(base_image, target_size)
+            step = _pick_step(base_image, tmpl_data['name'], target_size, fmt, keep_alpha, max_bytes, max_step)
+            if step is None:
+                return None
+
+        final = _composite(base_image, tmpl_data['name'], target_size, step)
+        if final is None:
             return None
-            
-        overlay = Image.open(overlay_path).convert("RGBA")
-        
-        if overlay.size != (target_w, target_h):
-            # Image.LANCZOS に変更
-            overlay = overlay.resize((target_w, target_h), Image.LANCZOS)
-            
-        if processed.mode != 'RGBA':
-            processed = processed.convert('RGBA')
-            
-        final = Image.alpha_composite(processed, overlay)
-        
-        buf = io.BytesIO()
-        final.save(buf, "PNG")
-        buf.seek(0)
-        return buf
+        return _encode(final, fmt, keep_alpha), fmt, step < max_step
     except Exception as e:
         print(f"Error: {e}")
-        return None
\ No newline at end of file
+        return None
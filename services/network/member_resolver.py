@@ -0,0 +1,80 @@
+# services/network/member_resolver.py
+import re
+import time
+from collections import OrderedDict
+from typing import Annotated
+import discord
+from discord.ext import commands
+from core.config import MEMBER_LRU_SIZE
+
+class MemberResolver:
+    """ギルドのメンバーを必要になった時だけ取得し、少数だけ LRU で覚えておく
+
+    メモリ節約モードではメンバーキャッシュを持たないので、
+    ギルドのキャッシュ → LRU → REST (fetch_member) の順に探す。
+    """
+    def __init__(self, max_entries: int = MEMBER_LRU_SIZE, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._cache = OrderedDict()  # (guild_id, user_id) -> (Member, 期限)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def remember(self, member: discord.Member):
+        key = (member.guild.id, member.id)
+        self._cache[key] = (member, time.monotonic() + self.ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def peek(self, guild_id: int, user_id: int) -> discord.Member | None:
+        """REST を使わずにキャッシュだけを見る"""
+        entry = self._cache.get((guild_id, user_id))
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._cache[(guild_id, user_id)]
+            return None
+        self._cache.move_to_end((guild_id, user_id))
+        return entry[0]
+
+    async def get(self, guild: discord.Guild, user_id: int, mentions=()) -> discord.Member | None:
+        member = guild.get_member(user_id) or self.peek(guild.id, user_id)
+        if member:
+            self.hits += 1
+            return member
+        self.misses += 1
+        # メンションされたメンバーはメッセージに含まれているので REST は不要
+        member = discord.utils.find(lambda m: m.id == user_id and isinstance(m, discord.Member), mentions)
+        if member is None:
+            try: member = await guild.fetch_member(user_id)
+            except discord.HTTPException: return None
+        self.remember(member)
+        return member
+
+class MemberLookup(commands.MemberConverter):
+    """MemberConverter の前に member_resolver を使うコンバーター
+
+    ID・メンション指定はゲートウェイへのメンバー問い合わせをせずに解決する。
+    名前での指定は通常の MemberConverter に任せる。
+    """
+    async def convert(self, ctx: commands.Context, argument: str) -> discord.Member:
+        match = self._get_id_match(argument) or re.match(r'<@!?([0-9]{15,20})>$', argument)
+        if match is None or ctx.guild is None:
+            member = await super().convert(ctx, argument)
+            if isinstance(member, discord.Member):
+                member_resolver.remember(member)
+            return member
+        member = await member_resolver.get(ctx.guild, int(match.group(1)), ctx.message.mentions)
+        if member is None:
+            raise commands.MemberNotFound(argument)
+        return member
+
+# コマンドの引数の型として使う
+LazyMember = Annotated[discord.Member, MemberLookup]
+
+# インスタンスのエクスポート
+member_resolver = MemberResolver()
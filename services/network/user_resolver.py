@@ -0,0 +1,67 @@
+# services/network/user_resolver.py
+import asyncio
+import time
+from services.network.member_resolver import member_resolver
+
+class UserResolver:
+    """ユーザーIDを表示用の文字列 (メンション) に解決する
+
+    ギルドのメンバーキャッシュ → Botのユーザーキャッシュ → REST (fetch_user) の順に探し、
+    RESTは同時実行数を制限して並列に呼ぶ。結果は TTL 付きで保持する。
+    """
+    def __init__(self, ttl: float = 600.0, miss_ttl: float = 60.0, concurrency: int = 4, max_entries: int = 2000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.miss_ttl = miss_ttl
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._cache = {}  # user_id -> (表示文字列, 期限)
+
+    def __len__(self):
+        return len(self._cache)
+
+    @staticmethod
+    def _display(user, user_id: int) -> str:
+        return user.mention if user else f"ID:{user_id}"
+
+    @staticmethod
+    def is_unresolved(display: str, user_id: int) -> bool:
+        """resolve_many の結果が取得できなかった時の代わりの表示 (ID:xxx) か"""
+        return display == f"ID:{user_id}"
+
+    def _from_gateway(self, bot, guild, user_id: int):
+        user = (guild.get_member(user_id) or member_resolver.peek(guild.id, user_id)) if guild else None
+        return user or bot.get_user(user_id)
+
+    async def _fetch(self, bot, user_id: int):
+        async with self._semaphore:
+            try: return await bot.fetch_user(user_id)
+            except: return None
+
+    async def resolve_many(self, bot, user_ids, guild=None) -> dict:
+        """{user_id: 表示文字列} を返す"""
+        now = time.monotonic()
+        if len(self._cache) > self.max_entries:
+            self._cache = {uid: v for uid, v in self._cache.items() if v[1] > now}
+        result, missing = {}, []
+        for uid in dict.fromkeys(int(u) for u in user_ids):
+            cached = self._cache.get(uid)
+            if cached and cached[1] > now:
+                result[uid] = cached[0]
+                continue
+            user = self._from_gateway(bot, guild, uid)
+            if user:
+                result[uid] = self._display(user, uid)
+                self._cache[uid] = (result[uid], now + self.ttl)
+            else:
+                missing.append(uid)
+
+        if missing:
+            users = await asyncio.gather(*(self._fetch(bot, uid) for uid in missing))
+            for uid, user in zip(missing, users):
+                result[uid] = self._display(user, uid)
+                # 取得できなかったIDも短時間だけ覚えておき、連続したRESTを避ける
+                self._cache[uid] = (result[uid], now + (self.ttl if user else self.miss_ttl))
+        return result
+
+# インスタンスのエクスポート
+user_resolver = UserResolver()
@@ -1,38 +1,10 @@
 # services/network/weather_api.py
 import aiohttp
-import xml.etree.ElementTree as ET
-import json
-import os
-from core.config import WEATHER_API_BASE_URL, PRIMARY_AREA_XML_URL, CITY_CODES_FILE
-from services.ai.deepseek import generate_deepseek_text_response
+from core.config import WEATHER_API_BASE_URL
+from core.lazy import lazy_import
 
-async def fetch_weather_city_codes():
-    """つくもAPIから日本の全都市コードを取得し、マップを作成する"""
-    temp_map = {}
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(PRIMARY_AREA_XML_URL) as response:
-                if response.status == 200:
-                    xml_text = await response.text()
-                    root = ET.fromstring(xml_text)
-                    for pref in root.findall('.//pref'):
-                        pref_title = pref.get('title')
-                        for city in pref.findall('.//city'):
-                            city_title = city.get('title')
-                            city_id = city.get('id')
-                            if city_title and city_id:
-                                temp_map[city_title] = city_id
-                                # 「東京都東京」のように県名＋市名でも引けるようにする
-                                if pref_title and pref_title != city_title:
-                                    temp_map[f"{pref_title}{city_title}"] = city_id
-                    
-                    # キャッシュ保存
-                    with open(CITY_CODES_FILE, 'w', encoding='utf-8') as f:
-                        json.dump(temp_map, f, ensure_ascii=False, indent=2)
-                        
-    except Exception as e:
-        print(f"Error fetching city codes: {e}")
-    return temp_map
+# DeepSeek は地名の推測が必要になった時だけ読み込む
+deepseek = lazy_import("services.ai.deepseek")
 
 async def get_city_id_fuzzy(city_name_query: str, city_id_map: dict) -> str | None:
     """地名からIDを取得。見つからない場合はDeepSeekに推論させる"""
@@ -51,7 +23,7 @@ async def get_city_id_fuzzy(city_name_query: str, city_id_map: dict) -> str | No
               f"リスト:\n{city_list_excerpt}\n\n"
               f"地名: {city_name_query}\nID:")
     
-    response = await generate_deepseek_text_response(prompt, temperature=0.1)
+    response = await deepseek.generate_deepseek_text_response(prompt, temperature=0.1)
     clean_id = response.strip()
     if clean_id.isdigit() and any(cid == clean_id for cid in city_id_map.values()):
         return clean_id
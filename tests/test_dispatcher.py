@@ -0,0 +1,108 @@
+# tests/test_dispatcher.py
+"""CommandDispatcher: 1語・2語のエイリアスからコマンドを引き、名前の直後から引数を解析すること"""
+import unittest
+from types import SimpleNamespace
+import discord
+from discord.ext import commands
+from core.dispatcher import CommandDispatcher
+
+ALIASES = {
+    "othello point": "point",
+    "othello leave": "leave",
+    "Janken Start": "janken",
+}
+
+def _make_bot(calls: list) -> commands.Bot:
+    bot = commands.Bot(command_prefix="", intents=discord.Intents.default(), help_command=None)
+
+    @bot.command(aliases=["pt", "ポイント"])
+    async def point(ctx, member: str = None):
+        calls.append(("point", ctx.invoked_with, member))
+
+    @bot.command()
+    async def leave(ctx):
+        calls.append(("leave", ctx.invoked_with))
+
+    @bot.command()
+    async def othello(ctx, size: int = 8, *, title: str = ""):
+        calls.append(("othello", size, title))
+
+    @bot.command(aliases=["rps"])
+    async def janken(ctx, *hands: str):
+        calls.append(("janken", hands))
+
+    return bot
+
+class DispatcherResolveTest(unittest.TestCase):
+    def setUp(self):
+        self.bot = _make_bot([])
+        self.dispatcher = CommandDispatcher(ALIASES)
+        self.dispatcher.build(self.bot)
+
+    def _resolve(self, content: str):
+        resolved = self.dispatcher.resolve(content)
+        return resolved and (resolved[0].name, resolved[1], resolved[2].read_rest())
+
+    def test_names_and_aliases_are_case_insensitive(self):
+        self.assertEqual(self._resolve("POINT"), ("point", "point", ""))
+        self.assertEqual(self._resolve("  Pt  @someone"), ("point", "pt", "  @someone"))
+        self.assertEqual(self._resolve("ポイント"), ("point", "ポイント", ""))
+
+    def test_multi_word_alias_wins_over_first_word(self):
+        self.assertEqual(self._resolve("othello point"), ("point", "point", ""))
+        self.assertEqual(self._resolve("Othello\n  LEAVE now"), ("leave", "leave", " now"))
+        self.assertEqual(self._resolve("janken start rock"), ("janken", "start", " rock"))
+
+    def test_first_word_command_when_second_word_does_not_match(self):
+        self.assertEqual(self._resolve("othello 6 big board"), ("othello", "othello", " 6 big board"))
+        self.assertEqual(self._resolve("othello"), ("othello", "othello", ""))
+        self.assertEqual(self._resolve("othello pointless"), ("othello", "othello", " pointless"))
+
+    def test_non_commands(self):
+        for content in ("", "   ", "hello point", "pointy", "!point"):
+            self.assertIsNone(self.dispatcher.resolve(content), content)
+
+    def test_aliases_to_missing_commands_are_skipped(self):
+        dispatcher = CommandDispatcher({"othello resign": "resign"})
+        dispatcher.build(self.bot)
+        self.assertEqual(dispatcher.resolve("othello resign")[0].name, "othello")
+
+    def test_rebuilds_after_commands_change(self):
+        @commands.command(name="daily")
+        async def daily(ctx):
+            pass
+
+        self.bot.add_command(daily)
+        self.assertIsNone(self.dispatcher.resolve("daily"))
+        self.dispatcher.stale = True
+        self.assertEqual(self.dispatcher.resolve("daily")[0].name, "daily")
+
+class DispatcherInvokeTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.calls = []
+        self.bot = _make_bot(self.calls)
+        self.dispatcher = CommandDispatcher(ALIASES)
+        self.dispatcher.build(self.bot)
+
+    async def _run(self, content: str):
+        message = SimpleNamespace(content=content, author=SimpleNamespace(bot=False), guild=None, channel=None, attachments=[],
+                                  _state=self.bot._connection)
+        await self.dispatcher.invoke(message, self.dispatcher.resolve(content))
+
+    async def test_arguments_after_the_name(self):
+        await self._run("othello 6 the big one")
+        await self._run("othello")
+        self.assertEqual(self.calls, [("othello", 6, "the big one"), ("othello", 8, "")])
+
+    async def test_arguments_after_a_multi_word_alias(self):
+        await self._run("othello point \"sugiyama san\"")
+        await self._run("janken start rock paper")
+        self.assertEqual(self.calls, [("point", "point", "sugiyama san"), ("janken", ("rock", "paper"))])
+
+    async def test_invoked_with_is_the_alias_used(self):
+        await self._run("PT alice")
+        await self._run("othello leave")
+        self.assertEqual(self.calls, [("point", "pt", "alice"), ("leave", "leave")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+# tests/test_gif_encoder.py
+"""encode_gif / GifWriter: 書き出した GIF を読み戻し、フレーム数と色の誤差が保たれること"""
+import io
+import unittest
+import numpy as np
+from PIL import Image, ImageDraw, ImageSequence
+from services.image.gaming_gif import hue_cycle_frames
+from services.image.gif_encoder import GifWriter, build_palette, encode_gif
+
+def _decode(buf: io.BytesIO) -> list[np.ndarray]:
+    buf.seek(0)
+    with Image.open(buf) as img:
+        return [np.asarray(frame.convert("RGBA"), dtype=np.int16) for frame in ImageSequence.Iterator(img)]
+
+def _mean_error(frames: list[Image.Image], decoded: list[np.ndarray]) -> float:
+    """不透明な画素の、1チャンネルあたりの平均誤差"""
+    errors = []
+    for frame, out in zip(frames, decoded):
+        src = np.asarray(frame.convert("RGBA"), dtype=np.int16)
+        opaque = src[..., 3] >= 128
+        errors.append(np.abs(src[..., :3][opaque] - out[..., :3][opaque]).mean())
+    return float(np.mean(errors))
+
+class HueCycleRoundTripTest(unittest.TestCase):
+    def test_flat_colours_keep_every_hue(self):
+        img = Image.new("RGBA", (96, 96), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        draw.ellipse((4, 4, 92, 92), fill=(230, 40, 40, 255))
+        draw.rectangle((28, 28, 68, 68), fill=(40, 90, 220, 255))
+        frames = hue_cycle_frames(img, 36)
+
+        decoded = _decode(encode_gif(frames, 50))
+        self.assertEqual(len(decoded), 36)
+        # 色相の違うフレームがパレットで1つにまとまらない
+        self.assertEqual(len({frame.tobytes() for frame in decoded}), 36)
+        self.assertEqual(_mean_error(frames, decoded), 0.0)
+
+    def test_gradient_is_no_worse_than_per_frame_palettes(self):
+        yy, xx = np.mgrid[0:128, 0:128]
+        rgb = np.dstack([xx * 2, yy * 2, (xx + yy)]).astype(np.uint8)
+        frames = hue_cycle_frames(Image.fromarray(rgb, "RGB").convert("RGBA"), 24)
+        # 従来の書き出し (フレームごとに PIL が減色する) を基準にする
+        baseline = io.BytesIO()
+        frames[0].save(baseline, format="GIF", save_all=True, append_images=frames[1:], duration=50, loop=0, disposal=2, optimize=True)
+
+        decoded = _decode(encode_gif(frames, 50))
+        self.assertEqual(len(decoded), 24)
+        self.assertLessEqual(_mean_error(frames, decoded), _mean_error(frames, _decode(baseline)) + 0.5)
+
+    def test_shared_palette_only_when_colours_fit(self):
+        flat = Image.new("RGBA", (32, 32), (200, 120, 20, 255))
+        self.assertIsNotNone(build_palette(hue_cycle_frames(flat, 12), 12))
+        # なめらかな階調は1フレームでも 255 色をほぼ使うので、色相を回すと共有できない
+        yy, xx = np.mgrid[0:64, 0:64]
+        ramp = np.dstack([xx * 4, yy * 4, np.full_like(xx, 90)]).astype(np.uint8)
+        self.assertIsNone(build_palette(hue_cycle_frames(Image.fromarray(ramp, "RGB").convert("RGBA"), 12), 12))
+
+class GifWriterRoundTripTest(unittest.TestCase):
+    def _frames(self) -> list[Image.Image]:
+        """背景の上を四角が動き、途中で一部が透明になって戻り、最後に同じフレームが続く"""
+        frames = []
+        for step in range(6):
+            a = np.zeros((40, 60, 4), dtype=np.uint8)
+            a[...] = (20, 160, 90, 255)
+            x = 8 * min(step, 4)
+            a[10:22, x:x + 12] = (250, 250, 0, 255)
+            if step == 2:
+                a[:, 40:] = 0
+            frames.append(Image.fromarray(a, "RGBA"))
+        return frames
+
+    def _write(self, frames: list[Image.Image], palette) -> io.BytesIO:
+        buf = io.BytesIO()
+        writer = GifWriter(buf, palette)
+        for frame in frames:
+            writer.add(frame, 40)
+        writer.close()
+        self.assertEqual(writer.frames, len(frames))
+        return buf
+
+    def test_shared_palette_differencing_is_exact(self):
+        frames = self._frames()
+        decoded = _decode(self._write(frames, build_palette(frames, len(frames))))
+        self.assertEqual(len(decoded), len(frames))
+        for frame, out in zip(frames, decoded):
+            src = np.asarray(frame, dtype=np.int16)
+            np.testing.assert_array_equal(out[..., 3] >= 128, src[..., 3] >= 128)
+            opaque = src[..., 3] >= 128
+            np.testing.assert_array_equal(out[..., :3][opaque], src[..., :3][opaque])
+
+    def test_per_frame_palettes_round_trip(self):
+        # フレームごとのパレットでも、差分は表示される色で比べるので同じ結果になる
+        frames = self._frames()
+        decoded = _decode(self._write(frames, None))
+        self.assertEqual(len(decoded), len(frames))
+        for frame, out in zip(frames, decoded):
+            np.testing.assert_array_equal(out[..., 3] >= 128, np.asarray(frame)[..., 3] >= 128)
+        self.assertEqual(_mean_error(frames, decoded), 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+# tests/test_job_service.py
+"""ImageJobService: ワーカーのフォントキャッシュの統計をジョブの結果と一緒に集めること"""
+import unittest
+from services.image.job_service import ImageJobService, combine_font_stats
+
+class CombineFontStatsTest(unittest.TestCase):
+    def test_counts_are_summed_and_rates_recomputed(self):
+        a = {"glyph_hits": 90, "glyph_misses": 10, "glyph_hit_rate": 0.9, "glyph_mb": 1.25, "renders": 2,
+             "total_render_ms": 30.0, "avg_render_ms": 15.0, "max_render_ms": 20.0}
+        b = {"glyph_hits": 10, "glyph_misses": 90, "glyph_hit_rate": 0.1, "glyph_mb": 0.5, "renders": 1,
+             "total_render_ms": 60.0, "avg_render_ms": 60.0, "max_render_ms": 60.0}
+        combined = combine_font_stats([a, b])
+        self.assertEqual(combined["workers"], 2)
+        self.assertEqual((combined["glyph_hits"], combined["glyph_misses"]), (100, 100))
+        self.assertEqual(combined["glyph_hit_rate"], 0.5)
+        self.assertEqual(combined["glyph_mb"], 1.8)
+        self.assertEqual(combined["avg_render_ms"], 30.0)
+        self.assertEqual(combined["max_render_ms"], 60.0)
+
+    def test_no_workers_yet(self):
+        self.assertEqual(combine_font_stats([]), {"workers": 0, "glyph_hit_rate": 0.0, "avg_render_ms": 0.0})
+
+class WorkerStatsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_stats_come_back_from_the_worker_process(self):
+        service = ImageJobService(workers=1, max_queue=2, timeout=60)
+        self.addCleanup(service.shutdown)
+        result = await service.run("worker_stats")
+        # ジョブの結果そのものは呼び出し側にそのまま返る
+        self.assertIn("glyph_hits", result)
+        stats = service.font_stats()
+        self.assertEqual(stats["workers"], 1)
+        self.assertEqual(stats["glyph_hits"], result["glyph_hits"])
+        service.shutdown()
+        self.assertEqual(service.font_stats()["workers"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# tests/test_media_cache.py
+"""watermark / gaming の結果キャッシュ: 同じ画像を貼り直すとジョブを実行しないこと"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+import cogs.media as media
+from services.image.result_cache import ResultCache
+
+class FakeAttachment:
+    content_type = "image/png"
+
+    def __init__(self, data: bytes, filename: str = "meme.png"):
+        self.data = data
+        self.filename = filename
+
+    async def read(self) -> bytes:
+        return self.data
+
+class FakeContext:
+    def __init__(self, data: bytes):
+        self.message = SimpleNamespace(attachments=[FakeAttachment(data)])
+        self.sent = []
+
+    def typing(self):
+        return _AsyncNull()
+
+    async def send(self, *args, **kwargs):
+        self.sent.append(kwargs)
+
+class _AsyncNull:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+class TransformCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache = ResultCache("transform", None, 1 << 20, 0)
+        self.calls = []
+
+        async def run(job, *args):
+            self.calls.append((job, args[1] if job == "watermark" else None))
+            return (b"result", False, "jpg") if job == "watermark" else (b"gif", False)
+
+        patches = [mock.patch.object(media, "transform_cache", self.cache), mock.patch.object(media.image_jobs, "run", run)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.cog = media.Media(None)
+
+    async def _post(self, command, data: bytes) -> FakeContext:
+        ctx = FakeContext(data)
+        await command.callback(self.cog, ctx)
+        return ctx
+
+    async def _watermark(self, data: bytes, template: dict) -> FakeContext:
+        # テンプレートは毎回ランダムに選ばれるので、どれが選ばれるかをテストで決める
+        with mock.patch.object(media.random, "choice", return_value=template):
+            return await self._post(media.Media.watermark, data)
+
+    async def test_watermark_repost_with_same_template_hits_cache(self):
+        template = media.TEMPLATES_DATA[0]
+        first = await self._watermark(b"same image", template)
+        second = await self._watermark(b"same image", template)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.cache.memory_hits, 1)
+        self.assertEqual(first.sent[0]["embed"].description, second.sent[0]["embed"].description)
+
+    async def test_watermark_repost_with_other_template_misses(self):
+        first = await self._watermark(b"same image", media.TEMPLATES_DATA[0])
+        second = await self._watermark(b"same image", media.TEMPLATES_DATA[1])
+        self.assertEqual([name for _, name in self.calls], [media.TEMPLATES_DATA[0], media.TEMPLATES_DATA[1]])
+        self.assertEqual(self.cache.memory_hits, 0)
+        # 選ばれたテンプレートの結果が送られる
+        self.assertIn(media.TEMPLATES_DATA[1]["name"], second.sent[0]["embed"].description)
+        self.assertNotEqual(first.sent[0]["embed"].description, second.sent[0]["embed"].description)
+
+    async def test_watermark_different_image_misses(self):
+        template = media.TEMPLATES_DATA[2]
+        await self._watermark(b"image a", template)
+        await self._watermark(b"image b", template)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.cache.memory_hits, 0)
+
+    async def test_gaming_repost_hits_cache(self):
+        await self._post(media.Media.gaming, b"same image")
+        await self._post(media.Media.gaming, b"same image")
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.cache.memory_hits, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# tests/test_persistence.py
+"""PersistenceWorker: 書き込みに失敗した変更を捨てずに次のフラッシュでやり直すこと"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import data.persistence as persistence_module
+from data.persistence import PersistenceWorker
+
+class FlakyReplace:
+    """最初の failures 回だけ OSError を出す os.replace"""
+    def __init__(self, failures: int = 1):
+        self.failures = failures
+        self.calls = 0
+        self._replace = os.replace
+
+    def __call__(self, src, dst):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError(28, "No space left on device")
+        return self._replace(src, dst)
+
+class PersistenceRetryTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "bot_settings.json")
+        self.worker = PersistenceWorker()
+
+    def _read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_failed_json_write_is_retried_on_next_flush(self):
+        replace = FlakyReplace()
+        with mock.patch.object(persistence_module.os, "replace", replace):
+            self.worker.write_json(self.path, {"prefix": "!"})
+            self.worker.flush()
+            self.assertFalse(os.path.exists(self.path))
+            self.assertEqual(self.worker.pending, 1)
+            self.assertEqual(self.worker.errors, 1)
+
+            self.worker.flush()
+        self.assertEqual(self._read(), {"prefix": "!"})
+        self.assertEqual(self.worker.pending, 0)
+        self.assertEqual(self.worker.files_written, 1)
+
+    def test_retry_writes_the_newest_payload(self):
+        with mock.patch.object(persistence_module.os, "replace", FlakyReplace()):
+            self.worker.write_json(self.path, {"login": 1})
+            self.worker.flush()
+            # やり直す前に新しい内容が予約された
+            self.worker.write_json(self.path, {"login": 2})
+            self.worker.flush()
+        self.assertEqual(self._read(), {"login": 2})
+
+    def test_unserializable_payload_is_dropped(self):
+        self.worker.write_json(self.path, {"bad": object()})
+        self.worker.flush()
+        self.assertEqual(self.worker.pending, 0)
+        self.assertEqual(self.worker.errors, 1)
+
+    def test_failed_rows_are_retried_and_newer_rows_win(self):
+        written = []
+        attempts = []
+
+        def writer(rows):
+            attempts.append(dict(rows))
+            if len(attempts) == 1:
+                raise OSError("database is locked")
+            written.append(dict(rows))
+
+        self.worker.register_table("users", writer)
+        self.worker.mark_many("users", {1: (10,), 2: (20,)})
+        self.worker.flush()
+        self.worker.mark_dirty("users", 2, (25,))
+        self.worker.flush()
+        self.assertEqual(written, [{1: (10,), 2: (25,)}])
+
+if __name__ == "__main__":
+    unittest.main()
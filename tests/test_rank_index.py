@@ -0,0 +1,56 @@
+# tests/test_rank_index.py
+"""RankIndex: ポイント降順・同点は user_id の小さい方が上位、Bot を除いた順位"""
+import random
+import unittest
+from data.rank_index import RankIndex
+
+BOT_ID = 999
+
+class RankIndexTest(unittest.TestCase):
+    def test_order_and_ties(self):
+        index = RankIndex({3: 50, 1: 50, 2: 80, 4: 10})
+        self.assertEqual(index.top(4), [(2, 80), (1, 50), (3, 50), (4, 10)])
+        self.assertEqual([index.rank(uid) for uid in (2, 1, 3, 4)], [1, 2, 3, 4])
+        self.assertEqual(index.bottom(2), [(4, 10), (3, 50)])
+
+    def test_bot_is_excluded_from_ranks_and_lists(self):
+        index = RankIndex({BOT_ID: 10_000, 1: 300, 2: 200, 3: 100})
+        self.assertEqual(index.rank(1, exclude=BOT_ID), 1)
+        self.assertEqual(index.rank(BOT_ID, exclude=BOT_ID), -1)
+        self.assertEqual(index.rank_from_bottom(3, exclude=BOT_ID), 1)
+        self.assertEqual(index.rank_from_bottom(1, exclude=BOT_ID), 3)
+        self.assertEqual(index.top(2, exclude=BOT_ID), [(1, 300), (2, 200)])
+        self.assertEqual(index.bottom(3, exclude=BOT_ID), [(3, 100), (2, 200), (1, 300)])
+
+    def test_unknown_user_and_empty_index(self):
+        index = RankIndex()
+        self.assertEqual(index.rank(1), -1)
+        self.assertEqual(index.rank_from_bottom(1), -1)
+        self.assertEqual(index.top(3), [])
+        self.assertEqual(index.bottom(0), [])
+
+    def test_updates_move_one_user(self):
+        index = RankIndex({1: 100, 2: 200, 3: 300})
+        index.update(1, 400)
+        index.update(4, 250)
+        index.update(3, 300)  # 変わらない更新
+        self.assertEqual(index.top(4), [(1, 400), (3, 300), (4, 250), (2, 200)])
+        self.assertEqual(len(index), 4)
+
+    def test_matches_full_sort_after_random_updates(self):
+        rng = random.Random(11)
+        points = {uid: rng.randint(0, 50) for uid in range(200)}
+        index = RankIndex(points)
+        for round_ in range(40):
+            # 少ない件数 (1件ずつ入れ替える) と多い件数 (作り直す) の両方を通す
+            size = 3 if round_ % 2 else 60
+            batch = {rng.randrange(260): rng.randint(0, 50) for _ in range(size)}
+            index.update_many(batch)
+            points.update(batch)
+        expected = sorted(points.items(), key=lambda item: (-item[1], item[0]))
+        self.assertEqual(index.top(len(points)), expected)
+        for position, (uid, _) in enumerate(expected, start=1):
+            self.assertEqual(index.rank(uid), position)
+
+if __name__ == "__main__":
+    unittest.main()
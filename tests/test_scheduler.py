@@ -0,0 +1,101 @@
+# tests/test_scheduler.py
+"""Scheduler: JST の予定時刻の計算 (日付・月・年をまたぐ場合) と、取りこぼした実行の扱い"""
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import core.scheduler as scheduler_module
+from core.config import JST
+from core.scheduler import ScheduledJob, Scheduler
+from data.persistence import PersistenceWorker
+
+def jst(*args) -> datetime.datetime:
+    return JST.localize(datetime.datetime(*args))
+
+async def _noop():
+    pass
+
+class ScheduledJobTest(unittest.TestCase):
+    def test_next_run_crosses_midnight(self):
+        job = ScheduledJob("snapshot", _noop, hours=(0, 6, 12, 18))
+        self.assertEqual(job.next_after(jst(2026, 3, 9, 23, 59, 59)), jst(2026, 3, 10, 0, 0))
+        self.assertEqual(job.next_after(jst(2026, 3, 10, 0, 0, 1)), jst(2026, 3, 10, 6, 0))
+
+    def test_slot_time_itself_is_not_next(self):
+        job = ScheduledJob("tax", _noop, hours=5)
+        self.assertEqual(job.next_after(jst(2026, 3, 9, 5, 0)), jst(2026, 3, 10, 5, 0))
+        self.assertEqual(job.latest_before(jst(2026, 3, 9, 5, 0)), jst(2026, 3, 9, 5, 0))
+
+    def test_month_and_year_boundaries(self):
+        job = ScheduledJob("codes", _noop, hours=4, minute=30)
+        self.assertEqual(job.next_after(jst(2026, 2, 28, 12, 0)), jst(2026, 3, 1, 4, 30))
+        self.assertEqual(job.next_after(jst(2026, 12, 31, 4, 30)), jst(2027, 1, 1, 4, 30))
+        self.assertEqual(job.latest_before(jst(2027, 1, 1, 4, 29)), jst(2026, 12, 31, 4, 30))
+
+    def test_latest_before_looks_at_yesterday_after_midnight(self):
+        job = ScheduledJob("late", _noop, hours=(21, 23))
+        self.assertEqual(job.latest_before(jst(2026, 3, 10, 0, 15)), jst(2026, 3, 9, 23, 0))
+        self.assertEqual(job.latest_before(jst(2026, 3, 10, 22, 0)), jst(2026, 3, 10, 21, 0))
+
+    def test_hours_are_sorted_and_deduplicated(self):
+        job = ScheduledJob("multi", _noop, hours=[18, 6, 6, 0])
+        self.assertEqual(job.hours, (0, 6, 18))
+        self.assertEqual(job.next_after(jst(2026, 3, 9, 7, 0)), jst(2026, 3, 9, 18, 0))
+
+class SchedulerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.state_path = os.path.join(tmp.name, "scheduler_state.json")
+        # 実行履歴は本番の persistence ではなくテスト用のワーカーに書く
+        self.worker = PersistenceWorker()
+        patcher = mock.patch.object(scheduler_module, "persistence", self.worker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write_state(self, **last_runs):
+        with open(self.state_path, "w", encoding="utf-8") as f:
+            json.dump({name: ts.isoformat() for name, ts in last_runs.items()}, f)
+
+    def test_first_registration_does_not_run_past_slots(self):
+        scheduler = Scheduler(self.state_path)
+        now = datetime.datetime.now(JST)
+        job = scheduler.add_job("snapshot", _noop, hours=(0, 6, 12, 18))
+        self.assertEqual(job.last_run, job.latest_before(now))
+        self.assertGreater(job.next_run, now)
+        self.worker.flush()
+        with open(self.state_path, encoding="utf-8") as f:
+            self.assertIn("snapshot", json.load(f))
+
+    def test_missed_slots_run_once_on_start(self):
+        self._write_state(tax=datetime.datetime.now(JST) - datetime.timedelta(days=3))
+        scheduler = Scheduler(self.state_path)
+        before = datetime.datetime.now(JST)
+        job = scheduler.add_job("tax", _noop, hours=5)
+        self.assertLessEqual(job.next_run, datetime.datetime.now(JST))
+        self.assertGreaterEqual(job.next_run, before)
+
+    def test_up_to_date_job_waits_for_next_slot(self):
+        now = datetime.datetime.now(JST)
+        job = ScheduledJob("codes", _noop, hours=4, minute=30)
+        self._write_state(codes=job.latest_before(now))
+        job = Scheduler(self.state_path).add_job("codes", _noop, hours=4, minute=30)
+        self.assertEqual(job.next_run, job.next_after(now))
+
+    async def test_failed_run_moves_on_to_the_next_slot(self):
+        async def broken():
+            raise RuntimeError("boom")
+
+        scheduler = Scheduler(self.state_path)
+        job = scheduler.add_job("broken", broken, hours=(0, 12))
+        await scheduler._run_job(job)
+        now = datetime.datetime.now(JST)
+        self.assertEqual((job.runs, job.errors), (1, 1))
+        self.assertEqual(job.last_run, job.latest_before(now))
+        self.assertGreater(job.next_run, now)
+        self.assertEqual(scheduler.stats()["broken"]["errors"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
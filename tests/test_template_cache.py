@@ -0,0 +1,66 @@
+# tests/test_template_cache.py
+"""TemplateCache: マップする件数と展開済みファイルの合計が上限を超えないこと"""
+import os
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+from services.image.template_cache import TemplateCache, step_size
+
+class TemplateCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.templates_dir = os.path.join(tmp.name, "templates")
+        self.cache_dir = os.path.join(tmp.name, "cache")
+        os.makedirs(self.templates_dir)
+        rng = np.random.default_rng(7)
+        for index in range(3):
+            pixels = rng.integers(0, 256, (80, 120, 4), dtype=np.uint8)
+            Image.fromarray(pixels, "RGBA").save(os.path.join(self.templates_dir, f"t{index}.png"))
+
+    def _files(self) -> list:
+        return [name for name in os.listdir(self.cache_dir) if name.endswith(".rgba")]
+
+    def test_smaller_steps_match_resize_of_the_png(self):
+        cache = TemplateCache(self.templates_dir, self.cache_dir, max_bytes=1 << 30)
+        size = step_size((120, 80), 3)
+        overlay = cache.get("t0.png", size, base_size=(120, 80))
+        expected = Image.open(os.path.join(self.templates_dir, "t0.png")).resize(size, Image.LANCZOS)
+        self.assertEqual(overlay.size, size)
+        diff = np.abs(np.asarray(overlay, dtype=np.int16) - np.asarray(expected, dtype=np.int16))
+        self.assertLessEqual(int(diff.max()), 2)
+        # target_size の版は作らない
+        self.assertEqual(len(self._files()), 1)
+
+    def test_prepare_builds_missing_sizes_together(self):
+        cache = TemplateCache(self.templates_dir, self.cache_dir, max_bytes=1 << 30)
+        sizes = [step_size((120, 80), 1), step_size((120, 80), 2)]
+        cache.prepare("t1.png", sizes, base_size=(120, 80))
+        cache.prepare("t1.png", sizes, base_size=(120, 80))
+        self.assertEqual(cache.builds, 2)
+        self.assertEqual(len(self._files()), 2)
+
+    def test_mapped_overlays_are_bounded_and_closed(self):
+        cache = TemplateCache(self.templates_dir, self.cache_dir, max_bytes=1 << 30, max_mapped=2)
+        for index in range(3):
+            cache.get(f"t{index}.png", (120, 80))
+        self.assertEqual(cache.stats()["mapped"], 2)
+        self.assertEqual(cache.unmaps, 1)
+        # 外したものも、もう一度使えばマップし直す
+        self.assertEqual(cache.get("t0.png", (120, 80)).size, (120, 80))
+
+    def test_limit_removes_only_unmapped_files(self):
+        full = 120 * 80 * 4
+        cache = TemplateCache(self.templates_dir, self.cache_dir, max_bytes=full * 2, max_mapped=1)
+        for index in range(3):
+            cache.get(f"t{index}.png", (120, 80))
+        total = sum(os.path.getsize(os.path.join(self.cache_dir, name)) for name in self._files())
+        self.assertLessEqual(total, full * 2)
+        self.assertGreaterEqual(cache.evictions, 1)
+        # マップ中の最後のファイルは残っている
+        self.assertEqual(cache.stats()["mapped"], 1)
+        self.assertTrue(any(name.startswith("t2.") for name in self._files()))
+
+if __name__ == "__main__":
+    unittest.main()
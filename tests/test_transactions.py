@@ -0,0 +1,124 @@
+# tests/test_transactions.py
+"""PointsTransactions: 同じユーザーへの同時の増減がロックで直列化され、残高が負にならないこと"""
+import asyncio
+import unittest
+from data.transactions import PointsTransactions, UserLockTable
+
+class FakeManager:
+    """points_manager と同じ get_points / apply_deltas を持つ辞書だけの置き換え"""
+    def __init__(self, balances: dict):
+        self.balances = dict(balances)
+        self.applied = []
+
+    def get_points(self, user_id: int) -> int:
+        return self.balances.get(int(user_id), 0)
+
+    def apply_deltas(self, deltas: dict) -> dict:
+        self.applied.append(dict(deltas))
+        for uid, amount in deltas.items():
+            self.balances[int(uid)] = self.balances.get(int(uid), 0) + amount
+        return {int(uid): self.balances[int(uid)] for uid in deltas}
+
+class UserLockTableTest(unittest.IsolatedAsyncioTestCase):
+    async def test_same_user_is_serialized(self):
+        table = UserLockTable()
+        inside, peak = 0, 0
+
+        async def critical():
+            nonlocal inside, peak
+            async with table.hold(1):
+                inside += 1
+                peak = max(peak, inside)
+                await asyncio.sleep(0)
+                inside -= 1
+
+        await asyncio.gather(*(critical() for _ in range(20)))
+        self.assertEqual(peak, 1)
+
+    async def test_opposite_order_does_not_deadlock(self):
+        table = UserLockTable()
+        order = []
+
+        async def both(first, second):
+            async with table.hold(first, second):
+                await asyncio.sleep(0)
+                order.append((first, second))
+
+        await asyncio.wait_for(asyncio.gather(*(both(1, 2) if i % 2 else both(2, 1) for i in range(10))), 5)
+        self.assertEqual(len(order), 10)
+
+    async def test_idle_locks_are_dropped_but_held_ones_stay(self):
+        table = UserLockTable(max_locks=2)
+        async with table.hold(100):
+            for uid in range(10):
+                async with table.hold(uid):
+                    pass
+            self.assertLessEqual(len(table), 3)
+            self.assertIn(100, table._entries)
+
+    async def test_cancelled_waiter_releases_its_slot(self):
+        table = UserLockTable(max_locks=1)
+        async with table.hold(1):
+            waiter = asyncio.create_task(self._enter(table, 1))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            self.assertEqual(table._entries[1][1], 1)
+        self.assertEqual(table._entries[1][1], 0)
+
+    @staticmethod
+    async def _enter(table, uid):
+        async with table.hold(uid):
+            pass
+
+class PointsTransactionsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_debits_never_overdraw(self):
+        manager = FakeManager({1: 100})
+        tx = PointsTransactions(manager)
+        results = await asyncio.gather(*(tx.try_debit(1, 30) for _ in range(5)))
+        self.assertEqual(results.count(True), 3)
+        self.assertEqual(manager.get_points(1), 10)
+
+    async def test_insufficient_funds_changes_nothing(self):
+        manager = FakeManager({1: 50, 2: 0})
+        tx = PointsTransactions(manager)
+        self.assertFalse(await tx.try_debit(1, 51))
+        self.assertFalse(await tx.transfer(1, 2, 45, fee=10))
+        self.assertEqual(manager.applied, [])
+        self.assertTrue(await tx.transfer(1, 2, 40, fee=10))
+        self.assertEqual((manager.get_points(1), manager.get_points(2)), (0, 40))
+
+    async def test_read_modify_write_inside_lock_sees_transfers(self):
+        manager = FakeManager({1: 100, 2: 100})
+        tx = PointsTransactions(manager)
+
+        async def double_or_nothing():
+            # ゲームのコマンドと同じく、残高を読んでから await を挟んで書き込む
+            async with tx.lock(1):
+                balance = manager.get_points(1)
+                await asyncio.sleep(0)
+                manager.apply_deltas({1: balance})
+
+        await asyncio.gather(double_or_nothing(), tx.transfer(2, 1, 50), tx.transfer(1, 2, 20))
+        # 送金はロックの解放を待つので、倍にした後の残高 (200) から動く
+        self.assertEqual((manager.get_points(1), manager.get_points(2)), (230, 70))
+
+    async def test_self_transfer_only_charges_the_fee(self):
+        manager = FakeManager({1: 100})
+        tx = PointsTransactions(manager)
+        self.assertTrue(await asyncio.wait_for(tx.transfer(1, 1, 60, fee=5), 5))
+        self.assertEqual(manager.get_points(1), 95)
+        self.assertFalse(await tx.transfer(1, 1, 100, fee=5))
+        self.assertEqual(manager.get_points(1), 95)
+
+    async def test_debit_many_is_all_or_nothing(self):
+        manager = FakeManager({1: 30, 2: 5, 3: 30})
+        tx = PointsTransactions(manager)
+        self.assertEqual(await tx.debit_many({1: 10, 2: 10, 3: 10}), [2])
+        self.assertEqual(manager.applied, [])
+        self.assertEqual(await tx.debit_many({1: 10, 3: 10}), [])
+        self.assertEqual((manager.get_points(1), manager.get_points(3)), (20, 20))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+# tests/test_user_store.py
+"""UserStore: __slots__ のレコードで持ち、SQLite との往復と旧 JSON の取り込みで値が崩れないこと"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import data.user_store as user_store_module
+from data.persistence import PersistenceWorker
+from data.user_store import UserRecord, UserStore
+
+class UserRecordTest(unittest.TestCase):
+    def test_slots_only(self):
+        record = UserRecord(points=5)
+        self.assertFalse(hasattr(record, "__dict__"))
+        with self.assertRaises(AttributeError):
+            record.nickname = "sugiyama"
+
+    def test_values_order_matches_the_table_columns(self):
+        record = UserRecord(120, "2026-01-02", 3, "2026-01-02", 4)
+        self.assertEqual(record.values(), (120, "2026-01-02", 3, "2026-01-02", 4))
+        self.assertEqual(UserRecord().values(), (None, None, 0, None, 0))
+
+class UserStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.db_path = os.path.join(self.dir, "game_points.db")
+        # 本番の persistence と旧 JSON には触れない
+        self.worker = PersistenceWorker()
+        for name, value in (("persistence", self.worker),
+                            ("POINTS_FILE", os.path.join(self.dir, "game_points.json")),
+                            ("LOGIN_DATA_FILE", os.path.join(self.dir, "login_bonus_data.json"))):
+            patcher = mock.patch.object(user_store_module, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _open(self) -> UserStore:
+        store = UserStore(self.db_path)
+        self.addCleanup(store.db.close)
+        return store
+
+    def test_changes_survive_a_reload(self):
+        store = self._open()
+        store.get_or_create(42).points = 300
+        store.save(42)
+        store.set_login(42, "2026-03-01", 2)
+        store.set_gamble(7, "2026-03-01", 5)
+        self.worker.flush()
+
+        reloaded = self._open()
+        self.assertEqual(reloaded.get(42).values(), (300, "2026-03-01", 2, None, 0))
+        # ギャンブルだけのユーザーはポイント未取得のままランキングに出ない
+        self.assertEqual(reloaded.get(7).values(), (None, None, 0, "2026-03-01", 5))
+        self.assertEqual(list(reloaded.points_items()), [(42, 300)])
+
+    def test_string_ids_and_shared_date_strings(self):
+        store = self._open()
+        store.set_login("1001", "".join(["2026-", "03-02"]), 1)
+        store.set_login(1002, "".join(["2026-03", "-02"]), 1)
+        self.assertIs(store.get(1001), store.get("1001"))
+        self.assertIs(store.get(1001).last_login, store.get(1002).last_login)
+        self.assertIsNone(store.get(1003))
+
+    def test_loaded_dates_are_interned(self):
+        store = self._open()
+        store.save_rows({uid: (10, "2026-03-03", 1, None, 0) for uid in (1, 2)})
+        self.worker.flush()
+        reloaded = self._open()
+        self.assertIs(reloaded.get(1).last_login, sys.intern("2026-03-03"))
+        self.assertIs(reloaded.get(1).last_login, reloaded.get(2).last_login)
+
+    def test_legacy_json_is_imported_once(self):
+        with open(os.path.join(self.dir, "game_points.json"), "w", encoding="utf-8") as f:
+            json.dump({"5": 80}, f)
+        with open(os.path.join(self.dir, "login_bonus_data.json"), "w", encoding="utf-8") as f:
+            json.dump({"5": {"last_login": "2025-12-31", "consecutive_days": 9,
+                             "gamble_info": {"date": "2025-12-31", "count": 2}},
+                       "6": {"last_login": "2025-12-30", "consecutive_days": 1}}, f)
+        store = self._open()
+        self.assertEqual(store.get(5).values(), (80, "2025-12-31", 9, "2025-12-31", 2))
+        self.assertEqual(store.get(6).values(), (None, "2025-12-30", 1, None, 0))
+
+        # 取り込み後に JSON を書き換えても DB 側の値が使われる
+        with open(os.path.join(self.dir, "game_points.json"), "w", encoding="utf-8") as f:
+            json.dump({"5": 1}, f)
+        self.assertEqual(self._open().get(5).points, 80)
+
+    def test_memory_report(self):
+        store = self._open()
+        self.assertEqual(store.memory_report()["bytes_per_user"], 0.0)
+        for uid in range(10):
+            store.get_or_create(uid).points = uid
+        report = store.memory_report()
+        self.assertEqual(report["users"], 10)
+        self.assertGreater(report["bytes_per_user"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,8 +17,6 @@ class ConfirmLeaveView(discord.ui.View):
     async def confirm(self, i: discord.Interaction, b: discord.ui.Button):
         await i.response.defer()
         
-        # 循環参照を防ぐため、ここでインポート
-        from core.state import state
         # channel_id からチャンネルを取得
         channel = i.client.get_channel(self.game_obj.channel_id)
         if not channel: return
@@ -39,11 +37,10 @@ class ConfirmLeaveView(discord.ui.View):
                 # 結果表示 (cogs/games.py の関数を呼び出す必要があるが、Viewからは呼べないので
                 # ここで直接 Embed を更新するか、簡易的なメッセージを送る)
                 # ★本来は Cog の関数を呼びたいが、ここでは処理完結させる
-                from cogs.games import send_othello_result_message_helper
+                from cogs.games import send_othello_result_message_helper, end_othello_session
                 await send_othello_result_message_helper(channel, self.game_session, board_message, "leave")
                 
-                if self.message_id in state.active_games:
-                    del state.active_games[self.message_id]
+                end_othello_session(self.message_id)
 
             elif self.game_type == "connectfour":
                 # コネクトフォーの終了処理
@@ -52,11 +49,10 @@ class ConfirmLeaveView(discord.ui.View):
                 if opponent_id:
                     self.game_obj.winner = next((token for token, pid in self.game_obj.players.items() if pid == opponent_id), None)
                 
-                from cogs.games import send_connectfour_result_message_helper
+                from cogs.games import send_connectfour_result_message_helper, end_connectfour_session
                 await send_connectfour_result_message_helper(channel, self.game_obj, board_message, "leave")
 
-                if self.message_id in state.active_connectfour_games:
-                    del state.active_connectfour_games[self.message_id]
+                end_connectfour_session(self.message_id)
 
             await i.message.delete()
             
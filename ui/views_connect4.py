@@ -4,6 +4,7 @@ import datetime
 from core.config import JST
 from core.constants import CF_EMPTY, CF_P1_TOKEN, CF_P2_TOKEN, CONNECTFOUR_MARKERS, COLS
 from core.state import state
+from core.reactions import reactions
 from engines.connect_four import ConnectFourEngine
 from ui.embeds import create_embed
 
@@ -60,6 +61,7 @@ class ConnectFourRecruitmentView(discord.ui.View):
         game.channel_id = i.channel_id
         game.message_id = i.message.id
         state.active_connectfour_games[game.message_id] = game
+        reactions.bind(game.message_id, "connectfour")
         
         embed = create_cf_board_embed(game)
         msg = await i.response.edit_message(content=None, embed=embed, view=None)
@@ -92,18 +92,19 @@ class LoginBonusView(discord.ui.View):
         # 循環参照回避のためここでインポート
         from data.points_manager import points_manager
         from data.login_manager import login_manager
+        from data.user_store import user_store
         
         await i.response.defer(ephemeral=True)
         
         current_rank = points_manager.get_rank(self.user_id, i.client.user.id)
-        user_data = points_manager.login_bonus_data.get(str(self.user_id), {})
+        record = user_store.get(self.user_id)
         
         # ロジックの完全再現
         from core.config import JST
         import datetime
         today_str = datetime.datetime.now(JST).strftime("%Y-%m-%d")
-        last_login_str = user_data.get("last_login", "")
-        consecutive_days = user_data.get("consecutive_days", 0)
+        last_login_str = record.last_login if record else ""
+        consecutive_days = record.consecutive_days if record else 0
         
         start_day = consecutive_days + 1 if last_login_str == today_str else consecutive_days
         
@@ -114,13 +115,7 @@ class LoginBonusView(discord.ui.View):
             future_consecutive = (start_day + day_offset -1) % 10 or 10
             
             # ポイント計算 (login_managerのロジックと同じものを使用)
-            base_points = 30
-            rank_bonus = 0
-            if current_rank == 1: rank_bonus = 30
-            elif 2 <= current_rank <= 3: rank_bonus = 20
-            elif 4 <= current_rank <= 10: rank_bonus = 10
-            consecutive_bonus = (future_consecutive - 1) * 10
-            points = max(30, base_points + rank_bonus + consecutive_bonus)
+            points = login_manager.calc_bonus(current_rank, future_consecutive)
             
             day_text = "明日" if day_offset == 1 else f"{day_offset}日後"
             future_text.append(f"▫️ **{day_text} ({future_consecutive}日目)**: `+{points}pt`")
@@ -144,16 +139,12 @@ class ConfirmGiveView(discord.ui.View):
         if interaction.user.id != self.author.id:
             return await interaction.response.send_message("コマンドを実行した本人のみが操作できます。", ephemeral=True)
         
-        from data.points_manager import points_manager
-        total_cost = self.amount + self.fee
-        if points_manager.get_points(self.author.id) < total_cost:
+        from data.transactions import points_tx
+        if not await points_tx.transfer(self.author.id, self.target.id, self.amount, self.fee):
             embed = create_embed("送金失敗", "ポイントが不足しています。", discord.Color.red(), "danger")
             await interaction.response.edit_message(embed=embed, view=None)
             self.is_done = True; self.stop()
             return
-
-        points_manager.update_points(self.author.id, -total_cost)
-        points_manager.update_points(self.target.id, self.amount)
         
         desc = (f"<@{self.author.id}> から <@{self.target.id}> に **`{self.amount}pt`** が送金されました。\n"
                 f"手数料として `{self.fee}pt` が引かれました。")
@@ -3,6 +3,7 @@ import discord
 import random
 from core.state import state
 from data.points_manager import points_manager
+from data.transactions import points_tx
 from ui.embeds import create_embed
 from engines.high_low import HighLowLogic
 
@@ -14,23 +15,32 @@ class HighLowRecruitmentView(discord.ui.View):
         self.opponent = opponent
         self.bet_amount = bet_amount
         self.message = None
+        # 承認の処理を始めたら True。二重押しで賭け金を2回引かないよう、最初の await より前に立てる
+        self.started = False
 
     @discord.ui.button(label="承認する", style=discord.ButtonStyle.success, emoji="✅")
     async def accept(self, i: discord.Interaction, b: discord.ui.Button):
         # 参加資格チェック
         if i.user.id != self.opponent.id:
             return await i.response.send_message("対戦相手に指名された人のみ承認できます。", ephemeral=True)
+        if self.started or self.is_finished():
+            return await i.response.send_message("この募集は既に締め切られています。", ephemeral=True)
+        self.started = True
         
-        # ポイントチェック
-        if points_manager.get_points(self.opponent.id) < self.bet_amount:
+        # ポイントチェックと先払い（賭け金没収）を両者まとめて行う
+        short = await points_tx.debit_many({self.host.id: self.bet_amount, self.opponent.id: self.bet_amount})
+        if short:
+            # 引き落としていないので、もう一度承認できるように戻す
+            self.started = False
+        if self.opponent.id in short:
             return await i.response.send_message(f"ポイントが不足しています。このゲームには`{self.bet_amount}pt`必要です。", ephemeral=True)
+        if short:
+            return await i.response.send_message(f"募集者のポイントが不足しているため開始できません。", ephemeral=True)
         
+        # 以降のボタン操作は受け付けない
+        self.stop()
         await i.response.defer()
         
-        # ポイント先払い（賭け金没収）
-        points_manager.update_points(self.host.id, -self.bet_amount)
-        points_manager.update_points(self.opponent.id, -self.bet_amount)
-        
         # ゲーム開始処理
         game = HighLowLogic(self.host.id, self.opponent.id, self.bet_amount, i.message.id)
         state.active_highlow_games[i.message.id] = game
@@ -44,16 +54,18 @@ class HighLowRecruitmentView(discord.ui.View):
         
         embed = create_embed(f"ハイアンドロー対戦！", desc, discord.Color.blue(), "pending")
         await i.message.edit(content=None, embed=embed, view=view)
-        self.stop()
 
     @discord.ui.button(label="キャンセル", style=discord.ButtonStyle.danger)
     async def cancel(self, i: discord.Interaction, b: discord.ui.Button):
         if i.user.id != self.host.id:
             return await i.response.send_message("募集者のみがキャンセルできます。", ephemeral=True)
+        # 承認の処理中 (賭け金を引いた後) に取り消すと賭け金が戻らないので断る
+        if self.started or self.is_finished():
+            return await i.response.send_message("この募集は既に締め切られています。", ephemeral=True)
+        self.stop()
         
         embed = create_embed("キャンセル", f"{self.host.mention}が募集を取り消しました。", discord.Color.red(), "danger")
         await i.response.edit_message(embed=embed, view=None)
-        self.stop()
     
     async def on_timeout(self):
         if self.message:
@@ -108,7 +120,7 @@ class HighLowChoiceView(discord.ui.View):
             desc += f"🏆 <@{winner_id}> の勝利！ `{game.bet * 2}pt` 獲得！"
         elif len(winners) == 2:
             # 引き分けは返金
-            for pid in winners: points_manager.update_points(pid, game.bet)
+            points_manager.apply_deltas({pid: game.bet for pid in winners})
             desc += "🤝 二人とも正解！ ベット分が払い戻されました。"
         else:
             desc += "💸 二人ともハズレ... ポイントは没収されました。"
@@ -6,6 +6,7 @@ import datetime
 from core.config import JST
 from core.constants import BLACK, WHITE, EMPTY, BLACK_STONE, WHITE_STONE, GREEN_SQUARE, STATUS_EMOJIS
 from core.state import state
+from core.reactions import reactions
 from engines.othello import OthelloEngine
 from data.points_manager import points_manager
 from ui.embeds import create_embed
@@ -129,6 +130,7 @@ class OthelloRecruitmentView(discord.ui.View):
         
         session = {"game": game, "players": game.players, "host_id": self.host.id}
         state.active_games[i.message.id] = session
+        reactions.bind(i.message.id, "othello")
         
         # 盤面表示
         embed = build_othello_embed(session)